@@ -1,25 +1,41 @@
 import os
 import time
 import json
+import hashlib
 import logging
 import re
-from flask import Flask, request, jsonify
+import queue
+import threading
+import uuid
+from types import SimpleNamespace
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from openai import AzureOpenAI
-import importlib
-import subprocess
-
-from cobol_chunker import chunk_cobol_code, process_chunked_code, detect_database_usage
-from prompts import (
-    create_business_requirements_prompt,
-    create_technical_requirements_prompt,
-    create_code_conversion_prompt,
-    create_unit_test_prompt,
-    create_functional_test_prompt
+
+from artifact_store import (
+    ARTIFACT_ANALYSIS,
+    ARTIFACT_CHUNKS,
+    ARTIFACT_CONVERSION,
+    ARTIFACT_DATABASE,
+    ARTIFACT_STRUCTURE,
+    create_artifact_store_from_env
 )
-from db_templates import get_db_template
-from json_extract import extract_json_from_response
+from audit_capture import create_audit_capture_from_env
+from batch_convert import load_portfolio_from_manifest, load_portfolio_from_tar, run_batch
+from cobol_parser import chunk_by_call_graph, parse_cobol
+from context_selection import select_chunk_contexts
+from continuation import complete_reply
+from dedup_index import can_remap, create_dedup_index_from_env, fragment_fingerprint, remap_result
+from deployment_pool import StreamInterrupted, create_deployment_pool_from_env
+from java_verifier import create_java_verifier_from_env, verify_and_repair
+from job_store import JobRunner, JobStore
+from llm_cache import create_cache_from_env, make_cache_key
+from llm_executor import get_chunk_code, get_chunk_type, run_concurrently, run_chunk_schedule
+from rule_translator import translate_program
+from streaming_json import StreamingJSONParser
+from token_chunker import conversion_token_budget, count_tokens, output_token_budget
+from tracing import metrics, record_cache_lookup, record_llm_usage, span, traced
+from warmup import TARGET_LANGUAGES, LazyModule, LazyObject, Warmup, use_warmup_artifact
 
 # Configure logging
 logging.basicConfig(
@@ -28,22 +44,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Install required packages at startup
-try:
-    # Check if langchain_text_splitters is installed
-    try:
-        importlib.import_module('langchain_text_splitters')
-        logger.info("langchain_text_splitters already installed")
-    except ImportError:
-        logger.info("Installing langchain_text_splitters...")
-        subprocess.check_call(['pip', 'install', '-q', 'langchain-text-splitters'])
-        logger.info("Successfully installed langchain_text_splitters")
-except Exception as e:
-    logger.error(f"Error installing dependencies: {str(e)}")
-
 # Load environment variables
 load_dotenv()
 
+# Dependencies are installed from requirements.txt when the image is built; the slower modules load on first use
+# or on the warm-up thread, so the app can start serving immediately
+cobol_chunker = LazyModule("cobol_chunker")
+prompts = LazyModule("prompts")
+db_templates = LazyModule("db_templates")
+json_extract = LazyModule("json_extract")
+
+# Pre-built tokenizer files and rendered templates (python warmup.py at build time)
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+warmup_artifact = use_warmup_artifact(os.environ.get("WARMUP_ARTIFACT_DIR", os.path.join("data", "warmup")))
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -53,18 +67,393 @@ AZURE_OPENAI_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT", "your-azure-open
 AZURE_OPENAI_API_KEY = os.environ.get("AZURE_OPENAI_API_KEY", "your-azure-openai-key")
 AZURE_OPENAI_DEPLOYMENT_NAME = os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME", "your-deployment-name")
 
-# Initialize OpenAI client
-client = AzureOpenAI(
-    api_key=AZURE_OPENAI_API_KEY,
-    api_version="2023-05-15",
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-)
+# Concurrency settings for independent LLM calls
+LLM_MAX_WORKERS = int(os.environ.get("LLM_MAX_WORKERS", 4))
+LLM_CALL_TIMEOUT = float(os.environ.get("LLM_CALL_TIMEOUT", 300))
+CHUNK_MAX_CONCURRENCY = int(os.environ.get("CHUNK_MAX_CONCURRENCY", 8))
+SSE_KEEPALIVE_INTERVAL = float(os.environ.get("SSE_KEEPALIVE_INTERVAL", 15))
+
+# Token budgeting for code conversion chunks
+LLM_CONTEXT_WINDOW = int(os.environ.get("LLM_CONTEXT_WINDOW", 128000))
+CONVERSION_MAX_TOKENS = int(os.environ.get("CONVERSION_MAX_TOKENS", 4000))
+CONVERSION_OUTPUT_EXPANSION = float(os.environ.get("CONVERSION_OUTPUT_EXPANSION", 2.0))
+CHUNK_TOKEN_BUDGET = int(os.environ.get("CHUNK_TOKEN_BUDGET", 0))  # 0 = derive from the settings above
+CHUNK_INSTRUCTION_TOKENS = 150  # chunk type instructions and position note of chunk prompts
+
+# Stream conversion replies so convertedCode arrives progressively and cut-off replies are continued
+LLM_STREAM_CONVERSIONS = os.environ.get("LLM_STREAM_CONVERSIONS", "true").lower() in ("1", "true", "yes")
+LLM_MAX_CONTINUATIONS = int(os.environ.get("LLM_MAX_CONTINUATIONS", 3))
+LLM_MAX_OUTPUT_TOKENS = int(os.environ.get("LLM_MAX_OUTPUT_TOKENS", 16384))  # model's completion limit
+CONTINUATION_CONTEXT_TOKENS = int(os.environ.get("CONTINUATION_CONTEXT_TOKENS", 2000))  # partial reply sent back
+
+# Translate the COBOL subset the rule-based translator covers without the LLM (Java and C# targets)
+RULE_TRANSLATION_ENABLED = os.environ.get("RULE_TRANSLATION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Compile converted Java and run its unit tests, then send compiler errors back for repair (rounds per conversion)
+JAVA_REPAIR_MAX_ROUNDS = int(os.environ.get("JAVA_REPAIR_MAX_ROUNDS", 2))
+
+# Batch portfolio conversion settings
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", 4))
+BATCH_DATA_DIR = os.environ.get("BATCH_DATA_DIR", os.path.join("data", "batches"))
+BATCH_SOURCE_ROOT = os.environ.get("BATCH_SOURCE_ROOT", "")
+
+# Pool of Azure OpenAI deployments (AZURE_OPENAI_DEPLOYMENTS) shared by all endpoints, with
+# per-deployment quotas, retries and circuit breaking; the settings above are the single-deployment default
+llm_client = LazyObject(lambda: create_deployment_pool_from_env({
+    "name": "default",
+    "endpoint": AZURE_OPENAI_ENDPOINT,
+    "apiKey": AZURE_OPENAI_API_KEY,
+    "deployment": AZURE_OPENAI_DEPLOYMENT_NAME
+}))
+
+# The stores below open their files on first use or on the warm-up thread, not at import.
+# Those that can be disabled load as None, so they are read with load().
+
+# Response cache shared by all endpoints (LLM_CACHE_BACKEND=memory|sqlite|none)
+response_cache = LazyObject(create_cache_from_env)
+
+# Sampled capture of raw LLM responses to rotating compressed files
+audit_capture = create_audit_capture_from_env()
+
+# Program sources and derived artifacts keyed by source hash, so later calls can send a sourceId
+artifact_store = LazyObject(create_artifact_store_from_env)
+
+# Conversions of COBOL fragments that are equivalent up to naming, reused across programs
+dedup_index = LazyObject(create_dedup_index_from_env)
+
+# Warm JVM workers that compile converted Java and run its unit tests (None without a JDK)
+java_verifier = LazyObject(create_java_verifier_from_env)
+
+def get_db_template(target_language):
+    """Return the database setup template for a language, from the warm-up artifact when it has it"""
+    template = warmup_artifact.get("dbTemplates", {}).get(target_language)
+    if template is None:
+        template = db_templates.get_db_template(target_language)
+    return template
+
+def warm_templates():
+    prompts.precompile_templates(
+        "COBOL", TARGET_LANGUAGES, {language: get_db_template(language) for language in TARGET_LANGUAGES}
+    )
+
+def warm_chunker():
+    cobol_chunker.load()
+    json_extract.load()
+
+def warm_stores():
+    response_cache.load()
+    artifact_store.load()
+    dedup_index.load()
+
+def warm_java_verifier():
+    verifier = java_verifier.load()
+    if verifier is not None:
+        verifier.start()
+
+def lookup_cached_reply(system_message, user_prompt, max_tokens, response_format, use_cache):
+    """
+    Build the response cache key of a chat completion request and look the reply up.
+
+    The key names every model the deployment pool may send the request to,
+    so a reply from one model is never served for another.
+
+    Returns:
+        tuple: (cache, cache_key, content); cache and cache_key are None when caching is off,
+        content is None on a miss or when use_cache is not set
+    """
+    cache = response_cache.load()
+    if cache is None:
+        return None, None, None
+    models = llm_client.models()
+    cache_key = make_cache_key(
+        models[0] if len(models) == 1 else models, system_message, user_prompt, max_tokens, response_format,
+        template_version=prompts.PROMPT_TEMPLATE_VERSION
+    )
+    return cache, cache_key, cache.get(cache_key) if use_cache else None
+
+def call_llm_json(system_message, user_prompt, max_tokens, label, use_cache=True):
+    """Send a chat completion request and parse the JSON content of the reply"""
+    response_format = {"type": "json_object"}
+    cache, cache_key, content = lookup_cached_reply(system_message, user_prompt, max_tokens, response_format, use_cache)
+    
+    with span("llm_call", call=label) as call_span:
+        if cache_key is not None:
+            record_cache_lookup(content is not None)
+        if content is not None:
+            logger.info(f"Cache hit for {label} request")
+        else:
+            messages = [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_prompt}
+            ]
+            # A continuation is plain text that completes the JSON, so it is sent without response_format
+            content, finish_reason, continuations = complete_reply(
+                lambda request_messages, is_continuation, on_text: request_llm_content(
+                    request_messages,
+                    max_tokens,
+                    f"{label} continuation" if is_continuation else label,
+                    None if is_continuation else response_format
+                ),
+                messages,
+                max_continuations=LLM_MAX_CONTINUATIONS,
+                context_tokens=CONTINUATION_CONTEXT_TOKENS,
+                label=label
+            )
+            call_span.set("continuations", continuations)
+            content = content.strip()
+            if cache_key is not None and finish_reason != "length":
+                cache.set(cache_key, content)
+    
+    with span("json_parse", call=label) as parse_span:
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            logger.warning(f"Failed to parse {label} JSON directly")
+            parse_span.set("fallback", True)
+            metrics.inc("cobol_json_fallback_total")
+            return json_extract.extract_json_from_response(content)
+
+def request_llm_content(messages, max_tokens, label, response_format):
+    """
+    Send a chat completion request.
+
+    Returns:
+        tuple: (content, finish_reason) of the reply
+    """
+    request_args = {
+        "messages": messages,
+        "temperature": 0.1,
+        "max_tokens": max_tokens,
+        "timeout": LLM_CALL_TIMEOUT
+    }
+    if response_format is not None:
+        request_args["response_format"] = response_format
+    response = llm_client.create_chat_completion(**request_args)
+    
+    record_llm_usage(label, getattr(response, "usage", None))
+    
+    # Raw responses are sampled and written off the request thread (LLM_AUDIT_SAMPLE_RATE)
+    audit_capture.record(label, response)
+    
+    choice = response.choices[0]
+    return choice.message.content or "", choice.finish_reason
+
+def stream_llm_json(system_message, user_prompt, max_tokens, label, use_cache=True, on_delta=None):
+    """
+    Stream a JSON chat completion, reporting string fields as they arrive.
+
+    A reply cut off by max_tokens (finish_reason 'length') or whose stream broke
+    off ('interrupted') is continued with follow-up requests, up to
+    LLM_MAX_CONTINUATIONS times, as call_llm_json does.
+
+    Args:
+        system_message (str): The system message
+        user_prompt (str): The user prompt
+        max_tokens (int): Completion token limit of each request
+        label (str): Call label for logs and metrics
+        use_cache (bool): Whether the reply may be served from the cache
+        on_delta (callable): Optional callback, called as on_delta(key, text) as string fields stream in
+
+    Returns:
+        dict: The parsed reply
+    """
+    response_format = {"type": "json_object"}
+    parser = StreamingJSONParser(on_delta)
+    cache, cache_key, content = lookup_cached_reply(system_message, user_prompt, max_tokens, response_format, use_cache)
+    finish_reason = None
+    
+    with span("llm_call", call=label, streamed=True) as call_span:
+        if cache_key is not None:
+            record_cache_lookup(content is not None)
+        if content is not None:
+            logger.info(f"Cache hit for {label} request")
+            parser.feed(content)
+        else:
+            messages = [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_prompt}
+            ]
+            # A continuation is plain text that completes the JSON, so it is sent without response_format
+            content, finish_reason, continuations = complete_reply(
+                lambda request_messages, is_continuation, on_text: stream_llm_content(
+                    request_messages,
+                    max_tokens,
+                    f"{label} continuation" if is_continuation else label,
+                    None if is_continuation else response_format,
+                    on_text
+                ),
+                messages,
+                max_continuations=LLM_MAX_CONTINUATIONS,
+                context_tokens=CONTINUATION_CONTEXT_TOKENS,
+                on_text=parser.feed,
+                label=label
+            )
+            call_span.set("continuations", continuations)
+            if parser.complete and cache_key is not None:
+                cache.set(cache_key, content)
+    
+    if not parser.complete:
+        logger.error(f"{label} reply is not complete JSON (finish_reason={finish_reason})")
+        with span("json_parse", call=label, fallback=True):
+            metrics.inc("cobol_json_fallback_total")
+            return dict(json_extract.extract_json_from_response(content) or {}, **parser.result())
+    return parser.result()
+
+def stream_llm_content(messages, max_tokens, label, response_format, on_text):
+    """
+    Send a streamed chat completion request, passing text to on_text as it arrives.
+
+    Returns:
+        tuple: (content, finish_reason)
+    """
+    request_args = {
+        "messages": messages,
+        "temperature": 0.1,
+        "max_tokens": max_tokens,
+        "timeout": LLM_CALL_TIMEOUT,
+        "stream": True
+    }
+    if response_format is not None:
+        request_args["response_format"] = response_format
+    
+    pieces = []
+    finish_reason = None
+    try:
+        for chunk in llm_client.create_chat_completion(**request_args):
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            text = choice.delta.content if choice.delta is not None else None
+            if text:
+                pieces.append(text)
+                on_text(text)
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+    except StreamInterrupted as e:
+        # The callers continue a reply that stopped early the same way as one cut off by max_tokens
+        logger.warning(f"{label} stream interrupted after {len(pieces)} pieces: {e.error}")
+        finish_reason = "interrupted"
+    content = "".join(pieces)
+    
+    # Streamed replies carry no usage, so record local token counts instead
+    record_llm_usage(label, SimpleNamespace(
+        prompt_tokens=sum(count_tokens(message["content"]) + 4 for message in messages),
+        completion_tokens=count_tokens(content)
+    ))
+    audit_capture.record(label, {"streamed": True, "finishReason": finish_reason, "content": content})
+    return content, finish_reason
 
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """Simple health check endpoint"""
     return jsonify({"status": "healthy", "timestamp": time.time()})
 
+@app.route("/api/ready", methods=["GET"])
+def readiness_check():
+    """Readiness check: 503 until the warm-up has finished, so traffic only reaches warm replicas"""
+    status = warmup.stats()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@traced("analysis")
+def run_analysis(source_language, target_language, source_code, vsam_definition="", use_cache=True):
+    """
+    Runs the business and technical requirements analysis concurrently.
+
+    Args:
+        source_language (str): The programming language of the source code
+        target_language (str): The target programming language for conversion
+        source_code (str): The source code to analyze
+        vsam_definition (str): Optional VSAM file definition
+        use_cache (bool): Whether LLM responses may be served from the cache
+
+    Returns:
+        dict: The analysis result returned by /api/analyze-requirements
+    """
+    source_id = artifact_store.put_source(source_language, source_code, vsam_definition)
+    analysis_name = f"{ARTIFACT_ANALYSIS}:{(target_language or '').upper()}"
+    if use_cache:
+        stored = artifact_store.get(source_id, analysis_name)
+        if stored is not None:
+            logger.info(f"Reusing stored analysis for source {source_id[:12]}")
+            return stored
+    
+    with span("prompt_build"):
+        business_prompt = prompts.create_business_requirements_prompt(source_language, source_code, vsam_definition)
+        technical_prompt = prompts.create_technical_requirements_prompt(source_language, target_language, source_code, vsam_definition)
+    
+    business_system_message = prompts.create_business_requirements_system_message(source_language)
+    technical_system_message = prompts.create_technical_requirements_system_message(source_language, target_language)
+    
+    # The two analyses are independent, so send both requests at once
+    results, errors = run_concurrently(
+        {
+            "businessRequirements": lambda: call_llm_json(
+                business_system_message, business_prompt, 2000, "business requirements", use_cache=use_cache
+            ),
+            "technicalRequirements": lambda: call_llm_json(
+                technical_system_message, technical_prompt, 2000, "technical requirements", use_cache=use_cache
+            ),
+        },
+        max_workers=LLM_MAX_WORKERS,
+        timeout=LLM_CALL_TIMEOUT
+    )
+    
+    if len(errors) == 2:
+        raise errors["businessRequirements"]
+    
+    business_json = results.get("businessRequirements")
+    technical_json = results.get("technicalRequirements")
+    
+    result = {
+        "businessRequirements": business_json,
+        "technicalRequirements": technical_json,
+        "sourceLanguage": source_language,
+        "targetLanguage": target_language,
+        "sourceId": source_id
+    }
+    if errors:
+        # Partial failure: return what succeeded and report what didn't
+        result["errors"] = {name: str(error) for name, error in errors.items()}
+    else:
+        artifact_store.set(source_id, analysis_name, result)
+    
+    return result
+
+def resolve_program_inputs(data):
+    """
+    Fills in the program and requirements of a request from the artifact store.
+
+    A request may send the sourceId returned by an earlier call instead of the
+    source code, and leave out the requirements to use the stored analysis for
+    its target language.
+
+    Args:
+        data (dict): The request body
+
+    Returns:
+        dict: A copy of the request body with the stored fields filled in
+
+    Raises:
+        KeyError: If the sourceId is not in the artifact store
+    """
+    data = dict(data)
+    source_id = data.get("sourceId")
+    if not source_id:
+        return data
+    
+    if not data.get("sourceCode"):
+        stored = artifact_store.get_source(source_id)
+        if stored is None:
+            raise KeyError(f"Unknown sourceId: {source_id}")
+        data.update(stored)
+    
+    if not data.get("businessRequirements") and not data.get("technicalRequirements") and data.get("targetLanguage"):
+        analysis = artifact_store.get(source_id, f"{ARTIFACT_ANALYSIS}:{data['targetLanguage'].upper()}")
+        if analysis is not None:
+            data["businessRequirements"] = json.dumps(analysis["businessRequirements"] or {}, indent=2)
+            data["technicalRequirements"] = json.dumps(analysis["technicalRequirements"] or {}, indent=2)
+    return data
+
 @app.route("/api/analyze-requirements", methods=["POST"])
 def analyze_requirements():
     """Endpoint to analyze COBOL code and extract business and technical requirements"""
@@ -72,115 +461,571 @@ def analyze_requirements():
     if not data:
         return jsonify({"error": "No data provided"}), 400
     
+    try:
+        data = resolve_program_inputs(data)
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+    
     source_language = data.get("sourceLanguage")
     target_language = data.get("targetLanguage")
     source_code = data.get("sourceCode")
     vsam_definition = data.get("vsamDefinition", "")
+    use_cache = not data.get("bypassCache", False)
     
     if not all([source_language, source_code]):
         return jsonify({"error": "Missing required fields"}), 400
     
     try:
-        business_prompt = create_business_requirements_prompt(source_language, source_code, vsam_definition)
-        technical_prompt = create_technical_requirements_prompt(source_language, target_language, source_code, vsam_definition)
+        return jsonify(run_analysis(source_language, target_language, source_code, vsam_definition, use_cache=use_cache))
         
-        business_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        f"You are an expert in analyzing legacy code to extract business requirements. "
-                        f"You understand {source_language} deeply and can identify business rules and processes in the code. "
-                        f"Output your analysis in JSON format with the following structure:\n\n"
-                        f"{{\n"
-                        f'  "Overview": {{\n'
-                        f'    "Purpose of the System": "Describe the system\'s primary function and how it fits into the business.",\n'
-                        f'    "Context and Business Impact": "Explain the operational context and value the system provides."\n'
-                        f'  }},\n'
-                        f'  "Objectives": {{\n'
-                        f'    "Primary Objective": "Clearly state the system\'s main goal.",\n'
-                        f'    "Key Outcomes": "Outline expected results (e.g., improved processing speed, customer satisfaction)."\n'
-                        f'  }},\n'
-                        f'  "Business Rules & Requirements": {{\n'
-                        f'    "Business Purpose": "Explain the business objective behind this specific module or logic.",\n'
-                        f'    "Business Rules": "List the inferred rules/conditions the system enforces.",\n'
-                        f'    "Impact on System": "Describe how this part affects the system\'s overall operation.",\n'
-                        f'    "Constraints": "Note any business limitations or operational restrictions."\n'
-                        f'  }},\n'
-                        f'  "Assumptions & Recommendations": {{\n'
-                        f'    "Assumptions": "Describe what is presumed about data, processes, or environment.",\n'
-                        f'    "Recommendations": "Suggest enhancements or modernization directions."\n'
-                        f'  }},\n'
-                        f'  "Expected Output": {{\n'
-                        f'    "Output": "Describe the main outputs (e.g., reports, logs, updates).",\n'
-                        f'    "Business Significance": "Explain why these outputs matter for business processes."\n'
-                        f'  }}\n'
-                        f"}}"
-                    )
-                },
-                {"role": "user", "content": business_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=2000,
-            response_format={"type": "json_object"}
+    except Exception as e:
+        logger.error(f"Error in requirements analysis: {str(e)}")
+        return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
+
+def generate_unit_tests(target_language, converted_code, business_requirements, technical_requirements, use_cache=True):
+    """Generate unit tests for the converted code"""
+    unit_test_prompt = prompts.create_unit_test_prompt(
+        target_language,
+        converted_code,
+        business_requirements,
+        technical_requirements
+    )
+    system_message = prompts.create_unit_test_system_message(target_language)
+    return call_llm_json(system_message, unit_test_prompt, 3000, "unit test", use_cache=use_cache)
+
+def generate_functional_tests(target_language, converted_code, business_requirements, technical_requirements, use_cache=True):
+    """Generate functional test scenarios for the converted code"""
+    functional_test_prompt = prompts.create_functional_test_prompt(
+        target_language,
+        converted_code,
+        business_requirements
+    )
+    system_message = prompts.create_functional_test_system_message(target_language)
+    return call_llm_json(system_message, functional_test_prompt, 3000, "functional test", use_cache=use_cache)
+
+def repair_code(target_language, code, compiler_errors, label, original_code="", original_language="",
+                reference_code="", use_cache=True):
+    """Ask the LLM to fix the compiler errors of one piece of converted code"""
+    repair_prompt = prompts.create_code_repair_prompt(
+        target_language,
+        code,
+        compiler_errors,
+        original_code,
+        original_language,
+        reference_code
+    )
+    system_message = prompts.create_code_repair_system_message(target_language)
+    # The repaired code is about as long as the code sent
+    max_tokens = output_token_budget(count_tokens(code), 1.0, maximum=LLM_MAX_OUTPUT_TOKENS)
+    return call_llm_json(system_message, repair_prompt, max_tokens, label, use_cache=use_cache)
+
+def chunk_fingerprint(target_language, chunk, context):
+    """Hash everything a chunk's conversion prompt depends on except its position in the program"""
+    payload = json.dumps([
+        prompts.PROMPT_TEMPLATE_VERSION,
+        target_language.upper(),
+        get_chunk_type(chunk),
+        get_chunk_code(chunk),
+        chunk.get("dataContext", "") if isinstance(chunk, dict) else "",
+        context
+    ], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Post-conversion test generators, keyed by the response field that holds their output.
+# Every generator receives (target_language, converted_code, business_requirements, technical_requirements,
+# use_cache=...) and all of them run concurrently once the code has been converted.
+TEST_GENERATORS = {
+    "unitTestDetails": generate_unit_tests,
+    "functionalTests": generate_functional_tests,
+}
+
+@traced("conversion")
+def run_conversion(
+    source_language,
+    target_language,
+    source_code,
+    vsam_definition="",
+    business_requirements="",
+    technical_requirements="",
+    use_cache=True,
+    emit=None,
+    generate_tests=True,
+    previous_source_id=None,
+    verify=True
+):
+    """
+    Runs the conversion pipeline: chunking, code conversion, test generation and verification.
+
+    Args:
+        source_language (str): The programming language of the source code
+        target_language (str): The target programming language for conversion
+        source_code (str): The source code to convert
+        vsam_definition (str): Optional VSAM file definition
+        business_requirements (str): The business requirements extracted from analysis
+        technical_requirements (str): The technical requirements extracted from analysis
+        use_cache (bool): Whether LLM responses may be served from the cache
+        emit (callable): Optional progress callback, called as emit(event, payload)
+        generate_tests (bool): Whether to run the post-conversion test generators
+        previous_source_id (str): Optional sourceId of an earlier version of the program; chunks
+            that did not change since its conversion reuse their converted output
+        verify (bool): Whether to compile converted Java with its unit tests, run the tests and
+            repair the chunks that do not compile
+
+    Returns:
+        dict: The conversion result returned by /api/convert
+    """
+    if emit is None:
+        emit = lambda event, payload: None
+    
+    logger.info(f"Processing conversion request: {source_language} to {target_language}")
+    logger.info(f"Source code size: {len(source_code)} characters")
+    
+    fragment_index = dedup_index.load()
+    source_id = artifact_store.put_source(source_language, source_code, vsam_definition)
+    has_database = artifact_store.get_or_compute(
+        source_id, ARTIFACT_DATABASE, lambda: cobol_chunker.detect_database_usage(source_code, source_language)
+    )
+    
+    if has_database:
+        logger.info(f"Database operations detected in {source_language} code. Including DB setup in conversion.")
+        db_setup_template = get_db_template(target_language)
+    else:
+        logger.info(f"No database operations detected in {source_language} code. Skipping DB setup.")
+        db_setup_template = ""
+    
+    conversion_system_message = prompts.create_code_conversion_system_message(source_language, target_language)
+    
+    conversion_name = f"{ARTIFACT_CONVERSION}:{target_language.upper()}"
+    previous = None
+    if previous_source_id and use_cache:
+        previous = artifact_store.get(previous_source_id, conversion_name)
+        if previous is None:
+            logger.info(f"No stored conversion of source {previous_source_id[:12]}, converting every chunk")
+    
+    parsed = {}
+    
+    def parse_program():
+        if "index" not in parsed:
+            parsed["index"] = parse_cobol(source_code)
+            artifact_store.set(source_id, ARTIFACT_STRUCTURE, parsed["index"].summary())
+        return parsed["index"]
+    
+    def chunk_program(token_budget, anchors=None):
+        return chunk_by_call_graph(parse_program(), token_budget, anchors)
+    
+    translation = None
+    if RULE_TRANSLATION_ENABLED and source_language.upper() == "COBOL" and not has_database:
+        with span("rule_translation"):
+            translation = translate_program(parse_program(), target_language)
+        if translation is not None:
+            coverage = translation.coverage()
+            metrics.inc("cobol_rule_translations_total", mode=coverage["mode"])
+            metrics.inc("cobol_rule_statements_total", coverage["translatedStatements"], path="rules")
+            metrics.inc("cobol_rule_statements_total", coverage["statements"] - coverage["translatedStatements"],
+                        path="llm")
+    
+    code_chunks = []
+    if translation is not None and translation.complete:
+        logger.info("Program is entirely inside the rule-based subset - skipping LLM conversion")
+    elif source_language.upper() == "COBOL":
+        # Size chunks by what actually fits next to the prompt template and the requirements
+        prompt_overhead = count_tokens(conversion_system_message) + count_tokens(prompts.create_code_conversion_prompt(
+            source_language,
+            target_language,
+            "",
+            business_requirements,
+            technical_requirements,
+            db_setup_template,
+            vsam_definition
+        )) + CHUNK_INSTRUCTION_TOKENS
+        token_budget = CHUNK_TOKEN_BUDGET or conversion_token_budget(
+            LLM_CONTEXT_WINDOW,
+            CONVERSION_MAX_TOKENS,
+            prompt_overhead,
+            CONVERSION_OUTPUT_EXPANSION
         )
+        source_tokens = count_tokens(source_code)
+        logger.info(f"Source code size: {source_tokens} tokens, chunk budget: {token_budget} tokens")
+        hybrid = translation is not None and translation.hybrid
+        if source_tokens > token_budget or hybrid:
+            logger.info("Large COBOL file detected - applying code chunking" if not hybrid else
+                        "Part of the program is inside the rule-based subset - chunking it apart from the rest")
+            # Paragraphs shared with other programs get chunks of their own so their conversion can be reused
+            shared_anchors = set()
+            if hybrid:
+                # Rule-translated and LLM paragraphs never share a chunk
+                shared_anchors |= translation.boundary_anchors()
+            if fragment_index is not None and use_cache:
+                # Only worth cutting for when the stored conversions may be looked up
+                shared_anchors |= fragment_index.isolation_anchors(
+                    parse_program(), target_language, source_id, prompts.PROMPT_TEMPLATE_VERSION
+                )
+            if previous is not None:
+                # Cut at the previous version's boundaries so an edit only touches the chunks that contain it
+                code_chunks = chunk_program(token_budget, set(previous["anchors"]) | shared_anchors)
+            else:
+                chunks_name = f"{ARTIFACT_CHUNKS}:{token_budget}"
+                if shared_anchors:
+                    chunks_name += ":" + hashlib.sha256(json.dumps(sorted(shared_anchors)).encode("utf-8")).hexdigest()[:16]
+                code_chunks = artifact_store.get_or_compute(
+                    source_id, chunks_name, lambda: chunk_program(token_budget, shared_anchors or None)
+                )
+    
+    emit("chunking", {
+        "chunkedProcessing": len(code_chunks) > 0,
+        "totalChunks": len(code_chunks),
+        "databaseDetected": has_database
+    })
+    
+    context_report = None
+    incremental_report = None
+    dedup_report = None
+    chunk_results = None
+    if translation is not None and translation.complete:
+        conversion_json = translation.result()
+    elif code_chunks:
+        logger.info(f"Processing {len(code_chunks)} code chunks")
         
-        logger.info("=== RAW BUSINESS REQUIREMENTS RESPONSE ===")
-        logger.info(json.dumps(business_response.model_dump(), indent=2))
-        
-        technical_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert in {source_language} to {target_language} migration. "
-                              f"You deeply understand both languages and can identify technical challenges and requirements for migration. "
-                              f"Output your analysis in JSON format with the following structure:\n"
-                              f"{{\n"
-                              f'  "technicalRequirements": [\n'
-                              f'    {{"id": "TR1", "description": "First technical requirement", "complexity": "High/Medium/Low"}},\n'
-                              f'    {{"id": "TR2", "description": "Second technical requirement", "complexity": "High/Medium/Low"}}\n'
-                              f'  ]\n'
-                              f"}}"
-                },
-                {"role": "user", "content": technical_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=2000,
-            response_format={"type": "json_object"}
+        # Send each chunk only the requirements and definitions that concern it
+        chunk_contexts, context_report = select_chunk_contexts(
+            code_chunks,
+            business_requirements,
+            technical_requirements,
+            db_setup_template,
+            vsam_definition
         )
+        fingerprints = [
+            chunk_fingerprint(target_language, chunk, context) for chunk, context in zip(code_chunks, chunk_contexts)
+        ]
         
-        logger.info("=== RAW TECHNICAL REQUIREMENTS RESPONSE ===")
-        logger.info(json.dumps(technical_response.model_dump(), indent=2))
-        
-        business_content = business_response.choices[0].message.content.strip()
-        technical_content = technical_response.choices[0].message.content.strip()
+        reused = {}
+        if previous is not None:
+            previous_results = {entry["fingerprint"]: entry["result"] for entry in previous["chunks"]}
+            reused = {i: previous_results[fingerprint] for i, fingerprint in enumerate(fingerprints)
+                      if fingerprint in previous_results}
+            incremental_report = {
+                "previousSourceId": previous_source_id,
+                "reusedChunks": sorted(reused),
+                "convertedChunks": [i for i in range(len(code_chunks)) if i not in reused]
+            }
+            logger.info(f"Incremental conversion: reusing {len(reused)} of {len(code_chunks)} chunks")
         
-        try:
-            business_json = json.loads(business_content)
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse business requirements JSON directly")
-            business_json = extract_json_from_response(business_content)
+        deduplicated = set()
+        # Equivalent chunks of this program are converted once: the first converts, the others wait and remap
+        converting = {}
+        converting_lock = threading.Lock()
+        rule_translated = set()
+        first_declarations = next(
+            (i for i, chunk in enumerate(code_chunks) if get_chunk_type(chunk) == "declarations"), None
+        )
+    
+        def process_code_chunk(code_chunk, is_chunk=False, chunk_index=0, total_chunks=1, declarations=""):
+            logger.info(f"Processing chunk {chunk_index+1}/{total_chunks}, size: {len(code_chunk)} characters")
             
-        try:
-            technical_json = json.loads(technical_content)
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse technical requirements JSON directly")
-            technical_json = extract_json_from_response(technical_content)
+            if translation is not None and translation.hybrid:
+                chunk_result = translation.chunk_result(code_chunks[chunk_index], chunk_index == first_declarations)
+                if chunk_result is not None:
+                    logger.info(f"Chunk {chunk_index+1} translated by rules")
+                    rule_translated.add(chunk_index)
+                    return chunk_result
+            
+            fragment = None
+            first = None
+            if fragment_index is not None:
+                chunk = code_chunks[chunk_index]
+                fragment = fragment_fingerprint(
+                    code_chunk,
+                    chunk.get("dataContext", "") if isinstance(chunk, dict) else "",
+                    get_chunk_type(chunk),
+                    target_language,
+                    prompts.PROMPT_TEMPLATE_VERSION
+                )
+                if use_cache:
+                    stored = fragment_index.lookup(*fragment)
+                    if stored is not None:
+                        logger.info(f"Chunk {chunk_index+1} is equivalent to a converted fragment, reusing it")
+                        deduplicated.add(chunk_index)
+                        return stored
+                with converting_lock:
+                    first = converting.setdefault(fragment[0], {
+                        "chunkIndex": chunk_index, "identifiers": fragment[1], "done": threading.Event()
+                    })
+                if first["chunkIndex"] != chunk_index:
+                    first["done"].wait()
+                    if first.get("result") is not None and can_remap(first["identifiers"], fragment[1]):
+                        logger.info(f"Chunk {chunk_index+1} is equivalent to chunk {first['chunkIndex']+1}, reusing it")
+                        deduplicated.add(chunk_index)
+                        return remap_result(first["result"], first["identifiers"], fragment[1])
+                    first = None
+            
+            try:
+                chunk_result = convert_code_chunk(code_chunk, is_chunk, chunk_index, total_chunks, declarations)
+                if fragment is not None and chunk_result.get("convertedCode"):
+                    # A conversion asked for with bypassCache is not offered to later requests either
+                    if use_cache:
+                        fragment_index.store(*fragment, chunk_result)
+                    if first is not None:
+                        first["result"] = chunk_result
+                return chunk_result
+            finally:
+                if first is not None:
+                    first["done"].set()
+    
+        def convert_code_chunk(code_chunk, is_chunk, chunk_index, total_chunks, declarations=""):
+            # Size the completion budget by the chunk instead of reserving the maximum for every chunk
+            max_tokens = output_token_budget(
+                count_tokens(code_chunk), CONVERSION_OUTPUT_EXPANSION, maximum=LLM_MAX_OUTPUT_TOKENS
+            )
+            with span("prompt_build", chunk=chunk_index):
+                chunk = code_chunks[chunk_index]
+                context = chunk_contexts[chunk_index]
+                
+                def build_prompt(converted_declarations):
+                    return prompts.create_code_conversion_prompt(
+                        source_language,
+                        target_language,
+                        code_chunk,
+                        context["businessRequirements"],
+                        context["technicalRequirements"],
+                        context["dbSetupTemplate"],
+                        context["vsamDefinition"],
+                        is_chunk=is_chunk,
+                        chunk_type=get_chunk_type(chunk),
+                        data_context=chunk.get("dataContext", "") if isinstance(chunk, dict) else "",
+                        chunk_index=chunk_index,
+                        total_chunks=total_chunks,
+                        converted_declarations=converted_declarations
+                    )
+                
+                prompt = build_prompt(declarations)
+                # Chunks are sized without the converted declarations; leave them out when they do not fit
+                if declarations and count_tokens(conversion_system_message) + count_tokens(prompt) + max_tokens \
+                        > LLM_CONTEXT_WINDOW:
+                    logger.info(f"Converted declarations do not fit next to chunk {chunk_index+1}, leaving them out")
+                    prompt = build_prompt("")
+            if LLM_STREAM_CONVERSIONS:
+                return stream_llm_json(
+                    conversion_system_message,
+                    prompt,
+                    max_tokens,
+                    f"code conversion chunk {chunk_index+1}",
+                    use_cache=use_cache,
+                    on_delta=lambda key, text: emit("chunkDelta", {
+                        "chunkIndex": chunk_index,
+                        "convertedCode": text
+                    }) if key == "convertedCode" else None
+                )
+            return call_llm_json(
+                conversion_system_message,
+                prompt,
+                max_tokens,
+                f"code conversion chunk {chunk_index+1}",
+                use_cache=use_cache
+            )
+    
+        chunk_results = run_chunk_schedule(
+            code_chunks,
+            process_code_chunk,
+            max_workers=CHUNK_MAX_CONCURRENCY,
+            timeout=LLM_CALL_TIMEOUT,
+            on_result=lambda chunk_index, chunk_result: emit("chunk", {
+                "chunkIndex": chunk_index,
+                "totalChunks": len(code_chunks),
+                "convertedCode": chunk_result.get("convertedCode", ""),
+                "reused": chunk_index in reused or chunk_index in deduplicated,
+                "ruleTranslated": chunk_index in rule_translated
+            }),
+            completed=reused
+        )
+    
+        def merge_chunks():
+            # Merge the precomputed results in chunk order
+            with span("chunk_merge", chunks=len(code_chunks)):
+                return cobol_chunker.process_chunked_code(
+                    [get_chunk_code(chunk) for chunk in code_chunks],
+                    lambda code_chunk, is_chunk=False, chunk_index=0, total_chunks=1: chunk_results[chunk_index]
+                )
         
-        result = {
-            "businessRequirements": business_json,
-            "technicalRequirements": technical_json,
-            "sourceLanguage": source_language,
-            "targetLanguage": target_language
-        }
+        def save_chunk_results():
+            # Keep the per-chunk output so the next version of this program only converts what changed
+            artifact_store.set(source_id, conversion_name, {
+                "anchors": sorted({chunk["paragraphs"][0] for chunk in code_chunks
+                                   if isinstance(chunk, dict) and chunk.get("paragraphs")}),
+                "chunks": [
+                    {"fingerprint": fingerprint, "result": chunk_result}
+                    for fingerprint, chunk_result in zip(fingerprints, chunk_results)
+                ]
+            })
+    
+        conversion_json = merge_chunks()
+        logger.info("All chunks processed and combined")
+        if fragment_index is not None:
+            dedup_report = {"reusedChunks": sorted(deduplicated)}
+        save_chunk_results()
+    
+    else:
+        logger.info("Processing code as a single unit")
+    
+        with span("prompt_build"):
+            prompt = prompts.create_code_conversion_prompt(
+                source_language,
+                target_language,
+                source_code,
+                business_requirements,
+                technical_requirements,
+                db_setup_template,
+                vsam_definition
+            )
+    
+        max_tokens = output_token_budget(
+            count_tokens(source_code), CONVERSION_OUTPUT_EXPANSION, maximum=LLM_MAX_OUTPUT_TOKENS
+        )
+        if LLM_STREAM_CONVERSIONS:
+            conversion_json = stream_llm_json(
+                conversion_system_message,
+                prompt,
+                max_tokens,
+                "code conversion",
+                use_cache=use_cache,
+                on_delta=lambda key, text: emit("conversionDelta", {"convertedCode": text})
+                if key == "convertedCode" else None
+            )
+        else:
+            conversion_json = call_llm_json(
+                conversion_system_message,
+                prompt,
+                max_tokens,
+                "code conversion",
+                use_cache=use_cache
+            )
+    
+    converted_code = conversion_json.get("convertedCode", "")
+    conversion_notes = conversion_json.get("conversionNotes", "")
+    database_used = conversion_json.get("databaseUsed", False)
+    emit("conversion", {
+        "convertedCode": converted_code,
+        "conversionNotes": conversion_notes,
+        "databaseUsed": database_used
+    })
+    
+    def run_test_generator(name, generator):
+        with span("test_generation", generator=name):
+            test_result = generator(
+                target_language,
+                converted_code,
+                business_requirements,
+                technical_requirements,
+                use_cache=use_cache
+            )
+        emit("tests", {"name": name, "result": test_result})
+        return test_result
+    
+    # Both test generators only need the converted code, so run them side by side
+    logger.info(f"Generating tests: {', '.join(TEST_GENERATORS)}")
+    test_results, test_errors = run_concurrently(
+        {
+            name: (lambda name=name, generator=generator: run_test_generator(name, generator))
+            for name, generator in TEST_GENERATORS.items()
+            if generate_tests
+        },
+        max_workers=LLM_MAX_WORKERS,
+        timeout=LLM_CALL_TIMEOUT
+    )
+    
+    unit_test_json = test_results.get("unitTestDetails", {})
+    functional_test_json = test_results.get("functionalTests", {})
+    unit_test_code = unit_test_json.get("unitTestCode", "")
+    
+    verification_report = None
+    verifier = java_verifier.load() if verify and target_language.upper() == "JAVA" else None
+    if verifier is not None and converted_code:
+        def repair(target, code, errors, program):
+            if target == "program":
+                repair_json = repair_code(
+                    target_language, code, errors, "code repair", source_code, source_language, use_cache=use_cache
+                )
+            elif target == "unitTests":
+                repair_json = repair_code(
+                    target_language, code, errors, "unit test repair", reference_code=program, use_cache=use_cache
+                )
+            else:
+                declarations = "\n\n".join(
+                    chunk_results[i].get("convertedCode", "")
+                    for i, chunk in enumerate(code_chunks)
+                    if get_chunk_type(chunk) == "declarations"
+                )
+                repair_json = repair_code(
+                    target_language,
+                    code,
+                    errors,
+                    f"code repair chunk {target+1}",
+                    get_chunk_code(code_chunks[target]),
+                    source_language,
+                    declarations if get_chunk_type(code_chunks[target]) != "declarations" else "",
+                    use_cache=use_cache
+                )
+            return repair_json.get("repairedCode")
         
-        return jsonify(result)
+        def merge_repaired(chunk_codes):
+            for chunk_index, chunk_code in enumerate(chunk_codes):
+                if chunk_code != chunk_results[chunk_index].get("convertedCode", ""):
+                    chunk_results[chunk_index] = dict(chunk_results[chunk_index], convertedCode=chunk_code)
+            save_chunk_results()
+            return merge_chunks().get("convertedCode", "")
         
-    except Exception as e:
-        logger.error(f"Error in requirements analysis: {str(e)}")
-        return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
+        verification = verify_and_repair(
+            verifier,
+            converted_code,
+            unit_test_code,
+            repair,
+            max_rounds=JAVA_REPAIR_MAX_ROUNDS,
+            chunk_codes=[chunk_result.get("convertedCode", "") for chunk_result in chunk_results]
+            if chunk_results is not None else None,
+            merge=merge_repaired if chunk_results is not None else None,
+            max_workers=CHUNK_MAX_CONCURRENCY,
+            timeout=LLM_CALL_TIMEOUT,
+            emit=emit
+        )
+        converted_code = verification["code"]
+        verification_report = verification["report"]
+        if verification_report["repairedUnitTests"]:
+            unit_test_code = verification["unitTestCode"]
+            unit_test_json = dict(unit_test_json, unitTestCode=unit_test_code)
+            test_results["unitTestDetails"] = unit_test_json
+    
+    logger.info("Building final response")
+    result = {
+        "convertedCode": converted_code,
+        "conversionNotes": conversion_notes,
+        "unitTests": unit_test_code,
+        "unitTestDetails": unit_test_json,
+        "functionalTests": functional_test_json,
+        "sourceLanguage": source_language,
+        "targetLanguage": target_language,
+        "databaseUsed": database_used,
+        "chunkedProcessing": len(code_chunks) > 0,
+        "sourceId": source_id
+    }
+    if translation is not None:
+        coverage = translation.coverage()
+        if code_chunks:
+            coverage["ruleTranslatedChunks"] = sorted(rule_translated)
+        result["ruleTranslation"] = coverage
+    if context_report is not None:
+        result["contextPruning"] = context_report
+    if incremental_report is not None:
+        result["incremental"] = incremental_report
+    if dedup_report is not None:
+        result["deduplication"] = dedup_report
+    if verification_report is not None:
+        result["verification"] = verification_report
+    # Merge in the output of any additional generators
+    for name, test_result in test_results.items():
+        result.setdefault(name, test_result)
+    if test_errors:
+        result["testGenerationErrors"] = {name: str(error) for name, error in test_errors.items()}
+    
+    return result
 
 @app.route("/api/convert", methods=["POST"])
 def convert_code():
@@ -189,239 +1034,313 @@ def convert_code():
     if not data:
         return jsonify({"error": "No data provided"}), 400
 
+    try:
+        data = resolve_program_inputs(data)
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+
     source_language = data.get("sourceLanguage")
     target_language = data.get("targetLanguage")
     source_code = data.get("sourceCode")
     vsam_definition = data.get("vsamDefinition", "")
     business_requirements = data.get("businessRequirements", "")
     technical_requirements = data.get("technicalRequirements", "")
+    previous_source_id = data.get("previousSourceId")
+    use_cache = not data.get("bypassCache", False)
+    verify = data.get("verify", True)
 
     if not all([source_language, target_language, source_code]):
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        logger.info(f"Processing conversion request: {source_language} to {target_language}")
-        logger.info(f"Source code size: {len(source_code)} characters")
-        
-        code_chunks = []
-        if source_language.upper() == "COBOL" and len(source_code) > 3000:
-            logger.info("Large COBOL file detected - applying code chunking")
-            code_chunks = chunk_cobol_code(source_code)
-        
-        has_database = detect_database_usage(source_code, source_language)
-        
-        if has_database:
-            logger.info(f"Database operations detected in {source_language} code. Including DB setup in conversion.")
-            db_setup_template = get_db_template(target_language)
-        else:
-            logger.info(f"No database operations detected in {source_language} code. Skipping DB setup.")
-            db_setup_template = ""
-        
-        if code_chunks:
-            logger.info(f"Processing {len(code_chunks)} code chunks")
-            
-            def process_code_chunk(code_chunk, is_chunk=False, chunk_index=0, total_chunks=1):
-                logger.info(f"Processing chunk {chunk_index+1}/{total_chunks}, size: {len(code_chunk)} characters")
-                
-                chunk_info = ""
-                if is_chunk:
-                    chunk_info = f"\n\nIMPORTANT: This is chunk {chunk_index+1} of {total_chunks} from a larger COBOL program. " \
-                                 f"Only convert this specific portion while maintaining awareness that it's part of a larger system."
-                
-                prompt = create_code_conversion_prompt(
-                    source_language,
-                    target_language,
-                    code_chunk,
-                    business_requirements,
-                    technical_requirements,
-                    db_setup_template,
-                    vsam_definition
-                ) + chunk_info
-                
-                prompt += f"\n\nIMPORTANT: Only include database initialization code if the source {source_language} code contains database or SQL operations. If the code is a simple algorithm (like sorting, calculation, etc.) without any database interaction, do NOT include any database setup code in the converted {target_language} code."
-
-                response = client.chat.completions.create(
-                    model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"You are an expert code converter assistant specializing in {source_language} to {target_language} migration. "
-                                      f"You convert legacy code to modern, idiomatic code while maintaining all business logic. "
-                                      f"Only include database setup/initialization if the original code uses databases or SQL. "
-                                      f"For simple algorithms or calculations without database operations, don't add any database code. "
-                                      f"Return your response in JSON format always with the following structure:\n"
-                                      f"{{\n"
-                                      f'  "convertedCode": "The complete converted code here",\n'
-                                      f'  "conversionNotes": "Notes about the conversion process",\n'
-                                      f'  "potentialIssues": ["List of any potential issues or limitations"],\n'
-                                      f'  "databaseUsed": true/false\n'
-                                      f"}}"
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=4000,
-                    response_format={"type": "json_object"}
-                )
+        return jsonify(run_conversion(
+            source_language,
+            target_language,
+            source_code,
+            vsam_definition,
+            business_requirements,
+            technical_requirements,
+            use_cache=use_cache,
+            previous_source_id=previous_source_id,
+            verify=verify
+        ))
 
-                conversion_content = response.choices[0].message.content.strip()
-                try:
-                    conversion_json = json.loads(conversion_content)
-                except json.JSONDecodeError:
-                    logger.warning(f"Failed to parse code conversion JSON for chunk {chunk_index+1}")
-                    conversion_json = extract_json_from_response(conversion_content)
-                
-                return conversion_json
-            
-            conversion_json = process_chunked_code(code_chunks, process_code_chunk)
-            
-            logger.info("All chunks processed and combined")
-            
-        else:
-            logger.info("Processing code as a single unit")
-            
-            prompt = create_code_conversion_prompt(
+    except Exception as e:
+        logger.error(f"Error in code conversion or test generation: {str(e)}")
+        return jsonify({"error": f"Conversion failed: {str(e)}"}), 500
+
+@app.route("/api/convert/stream", methods=["POST"])
+def convert_code_stream():
+    """Streaming variant of /api/convert that reports progress as Server-Sent Events"""
+    data = request.json
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    try:
+        data = resolve_program_inputs(data)
+    except KeyError as e:
+        return jsonify({"error": str(e.args[0])}), 404
+
+    source_language = data.get("sourceLanguage")
+    target_language = data.get("targetLanguage")
+    source_code = data.get("sourceCode")
+    vsam_definition = data.get("vsamDefinition", "")
+    business_requirements = data.get("businessRequirements", "")
+    technical_requirements = data.get("technicalRequirements", "")
+    previous_source_id = data.get("previousSourceId")
+    use_cache = not data.get("bypassCache", False)
+    verify = data.get("verify", True)
+
+    if not all([source_language, target_language, source_code]):
+        return jsonify({"error": "Missing required fields"}), 400
+
+    events = queue.Queue()
+
+    def emit(event, payload):
+        events.put((event, payload))
+
+    def run():
+        try:
+            emit("result", run_conversion(
                 source_language,
                 target_language,
                 source_code,
+                vsam_definition,
                 business_requirements,
                 technical_requirements,
-                db_setup_template,
-                vsam_definition
-            )
-
-            prompt += f"\n\nIMPORTANT: Only include database initialization code if the source {source_language} code contains database or SQL operations. If the code is a simple algorithm (like sorting, calculation, etc.) without any database interaction, do NOT include any database setup code in the converted {target_language} code."
-
-            response = client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are an expert code converter assistant specializing in {source_language} to {target_language} migration. "
-                                  f"You convert legacy code to modern, idiomatic code while maintaining all business logic. "
-                                  f"Only include database setup/initialization if the original code uses databases or SQL. "
-                                  f"For simple algorithms or calculations without database operations, don't add any database code. "
-                                  f"Return your response in JSON format always with the following structure:\n"
-                                  f"{{\n"
-                                  f'  "convertedCode": "The complete converted code here",\n'
-                                  f'  "conversionNotes": "Notes about the conversion process",\n'
-                                  f'  "potentialIssues": ["List of any potential issues or limitations"],\n'
-                                  f'  "databaseUsed": true/false\n'
-                                  f"}}"
-                        },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=4000,
-                response_format={"type": "json_object"}
-            )
+                use_cache=use_cache,
+                emit=emit,
+                previous_source_id=previous_source_id,
+                verify=verify
+            ))
+        except Exception as e:
+            logger.error(f"Error in streaming code conversion: {str(e)}")
+            emit("error", {"error": f"Conversion failed: {str(e)}"})
+        finally:
+            events.put(None)
 
-            logger.info("=== RAW CODE CONVERSION RESPONSE ===")
-            logger.info(json.dumps(response.model_dump(), indent=2))
+    threading.Thread(target=run, daemon=True).start()
 
-            conversion_content = response.choices[0].message.content.strip()
+    def generate():
+        while True:
             try:
-                conversion_json = json.loads(conversion_content)
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse code conversion JSON directly")
-                conversion_json = extract_json_from_response(conversion_content)
-        
-        converted_code = conversion_json.get("convertedCode", "")
-        conversion_notes = conversion_json.get("conversionNotes", "")
-        database_used = conversion_json.get("databaseUsed", False)
-        
-        logger.info("Generating unit tests")
-        unit_test_prompt = create_unit_test_prompt(
-            target_language,
-            converted_code,
-            business_requirements,
-            technical_requirements
-        )
-        
-        unit_test_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert test engineer specializing in writing unit tests for {target_language}. "
-                              f"You create comprehensive unit tests that verify all business logic and edge cases. "
-                              f"Return your response in JSON format with the following structure:\n"
-                              f"{{\n"
-                              f'  "unitTestCode": "The complete unit test code here",\n'
-                              f'  "testDescription": "Description of the test strategy",\n'
-                              f'  "coverage": ["List of functionalities covered by the tests"]\n'
-                              f"}}"
-                },
-                {"role": "user", "content": unit_test_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=3000,
-            response_format={"type": "json_object"}
-        )
-        
-        unit_test_content = unit_test_response.choices[0].message.content.strip()
-        try:
-            unit_test_json = json.loads(unit_test_content)
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse unit test JSON directly")
-            unit_test_json = extract_json_from_response(unit_test_content)
-        
-        unit_test_code = unit_test_json.get("unitTestCode", "")
-        
-        logger.info("Generating functional tests")
-        functional_test_prompt = create_functional_test_prompt(
+                item = events.get(timeout=SSE_KEEPALIVE_INTERVAL)
+            except queue.Empty:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                break
+            event, payload = item
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def run_batch_pipeline(payload, on_stage):
+    """Convert every program of an uploaded portfolio into an output archive"""
+    target_language = payload["targetLanguage"]
+    use_cache = not payload.get("bypassCache", False)
+    
+    on_stage("loading")
+    if payload.get("archivePath"):
+        programs, copybooks = load_portfolio_from_tar(payload["archivePath"])
+    else:
+        programs, copybooks = load_portfolio_from_manifest(payload["manifest"], BATCH_SOURCE_ROOT)
+    logger.info(f"Batch contains {len(programs)} programs and {len(copybooks)} copybooks")
+    
+    on_stage("conversion")
+    summary = run_batch(
+        programs,
+        copybooks,
+        lambda source_code: run_conversion(
+            "COBOL",
             target_language,
-            converted_code,
-            business_requirements
-        )
-        
-        functional_test_response = client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert QA engineer specializing in creating functional tests for {target_language} applications. "
-                              f"You create comprehensive test scenarios that verify the application meets all business requirements. "
-                              f"Focus on user journey tests and acceptance criteria. "
-                              f"Return your response in JSON format with the following structure:\n"
-                              f"{{\n"
-                              f'  "functionalTests": [\n'
-                              f'    {{"id": "FT1", "title": "Test scenario title", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}},\n'
-                              f'    {{"id": "FT2", "title": "Another test scenario", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}}\n'
-                              f'  ],\n'
-                              f'  "testStrategy": "Description of the overall testing approach"\n'
-                              f"}}"
-                },
-                {"role": "user", "content": functional_test_prompt}
-            ],
-            temperature=0.1,
-            max_tokens=3000,
-            response_format={"type": "json_object"}
-        )
-        
-        functional_test_content = functional_test_response.choices[0].message.content.strip()
-        try:
-            functional_test_json = json.loads(functional_test_content)
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse functional test JSON directly")
-            functional_test_json = extract_json_from_response(functional_test_content)
-        
-        logger.info("Building final response")
-        return jsonify({
-            "convertedCode": converted_code,
-            "conversionNotes": conversion_notes,
-            "unitTests": unit_test_code,
-            "unitTestDetails": unit_test_json,
-            "functionalTests": functional_test_json,
-            "sourceLanguage": source_language,
+            source_code,
+            payload.get("vsamDefinition", ""),
+            use_cache=use_cache,
+            generate_tests=payload.get("generateTests", False),
+            verify=payload.get("verify", False)
+        ),
+        payload["outputPath"],
+        target_language,
+        max_workers=BATCH_MAX_WORKERS
+    )
+    return {"outputPath": payload["outputPath"], **summary}
+
+def run_job_pipeline(payload, on_stage):
+    """Run the analysis and conversion pipeline for a queued job"""
+    if payload.get("kind") == "batch":
+        return run_batch_pipeline(payload, on_stage)
+    
+    payload = resolve_program_inputs(payload)
+    source_language = payload["sourceLanguage"]
+    target_language = payload["targetLanguage"]
+    source_code = payload["sourceCode"]
+    vsam_definition = payload.get("vsamDefinition", "")
+    business_requirements = payload.get("businessRequirements", "")
+    technical_requirements = payload.get("technicalRequirements", "")
+    use_cache = not payload.get("bypassCache", False)
+    
+    analysis = None
+    if not business_requirements and not technical_requirements:
+        on_stage("analysis")
+        analysis = run_analysis(source_language, target_language, source_code, vsam_definition, use_cache=use_cache)
+        business_requirements = json.dumps(analysis["businessRequirements"] or {}, indent=2)
+        technical_requirements = json.dumps(analysis["technicalRequirements"] or {}, indent=2)
+    
+    def emit(event, event_payload):
+        if event == "chunking":
+            on_stage("conversion")
+        elif event == "conversion":
+            on_stage("testGeneration")
+        elif event == "verification" and event_payload["round"] == 0:
+            on_stage("verification")
+    
+    on_stage("preprocessing")
+    result = run_conversion(
+        source_language,
+        target_language,
+        source_code,
+        vsam_definition,
+        business_requirements,
+        technical_requirements,
+        use_cache=use_cache,
+        emit=emit,
+        previous_source_id=payload.get("previousSourceId"),
+        verify=payload.get("verify", True)
+    )
+    if analysis is not None:
+        result["analysis"] = analysis
+    return result
+
+job_runner = LazyObject(lambda: JobRunner(
+    JobStore(os.environ.get("JOB_STORE_PATH", os.path.join("data", "jobs.sqlite3"))),
+    run_job_pipeline,
+    max_workers=int(os.environ.get("JOB_MAX_WORKERS", 4))
+))
+
+@app.route("/api/jobs", methods=["POST"])
+def create_job():
+    """Queue a conversion job and return its id immediately"""
+    data = request.json
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    
+    if data.get("sourceId") and not data.get("sourceCode"):
+        # The job references a stored program and resolves it when it runs
+        if artifact_store.describe(data["sourceId"]) is None:
+            return jsonify({"error": f"Unknown sourceId: {data['sourceId']}"}), 404
+        if not data.get("targetLanguage"):
+            return jsonify({"error": "Missing required fields"}), 400
+    elif not all([data.get("sourceLanguage"), data.get("targetLanguage"), data.get("sourceCode")]):
+        return jsonify({"error": "Missing required fields"}), 400
+    
+    job_id = job_runner.submit(data)
+    logger.info(f"Queued conversion job {job_id}")
+    return jsonify({"jobId": job_id, "status": "queued"}), 202
+
+@app.route("/api/batch", methods=["POST"])
+def create_batch():
+    """Queue a portfolio conversion from an uploaded tarball or a directory manifest"""
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(BATCH_DATA_DIR, batch_id)
+    
+    if "archive" in request.files:
+        target_language = request.form.get("targetLanguage")
+        if not target_language:
+            return jsonify({"error": "Missing required fields"}), 400
+        os.makedirs(batch_dir, exist_ok=True)
+        archive_path = os.path.join(batch_dir, "input.tar")
+        request.files["archive"].save(archive_path)
+        payload = {
+            "kind": "batch",
+            "archivePath": archive_path,
             "targetLanguage": target_language,
-            "databaseUsed": database_used,
-            "chunkedProcessing": len(code_chunks) > 0
-        })
+            "generateTests": request.form.get("generateTests", "false").lower() == "true"
+        }
+    else:
+        data = request.json
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+        if not all([data.get("targetLanguage"), data.get("manifest")]):
+            return jsonify({"error": "Missing required fields"}), 400
+        if not BATCH_SOURCE_ROOT:
+            return jsonify({"error": "Directory manifests require BATCH_SOURCE_ROOT to be configured"}), 400
+        payload = {
+            "kind": "batch",
+            "manifest": data["manifest"],
+            "targetLanguage": data["targetLanguage"],
+            "vsamDefinition": data.get("vsamDefinition", ""),
+            "generateTests": data.get("generateTests", False),
+            "bypassCache": data.get("bypassCache", False)
+        }
+    
+    payload["outputPath"] = os.path.join(batch_dir, "output.zip")
+    job_id = job_runner.submit(payload)
+    logger.info(f"Queued batch conversion job {job_id}")
+    return jsonify({"jobId": job_id, "status": "queued"}), 202
 
-    except Exception as e:
-        logger.error(f"Error in code conversion or test generation: {str(e)}")
-        return jsonify({"error": f"Conversion failed: {str(e)}"}), 500
+@app.route("/api/batch/<job_id>/archive", methods=["GET"])
+def get_batch_archive(job_id):
+    """Download the output archive of a completed batch conversion"""
+    job = job_runner.store.get(job_id)
+    if job is None or not job["result"] or "outputPath" not in job["result"]:
+        return jsonify({"error": "Batch output not found"}), 404
+    return send_file(os.path.abspath(job["result"]["outputPath"]), as_attachment=True, download_name=f"{job_id}.zip")
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Return status, stage timings and result of a conversion job"""
+    job = job_runner.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/api/artifacts/<source_id>", methods=["GET"])
+def get_artifacts(source_id):
+    """Return a stored program's metadata and the names of its artifacts"""
+    description = artifact_store.describe(source_id)
+    if description is None:
+        return jsonify({"error": "Source not found"}), 404
+    return jsonify(description)
+
+@app.route("/api/artifacts/<source_id>/<name>", methods=["GET"])
+def get_artifact(source_id, name):
+    """Return one stored artifact, such as 'structure' or 'analysis:JAVA'"""
+    artifact = artifact_store.get(source_id, name)
+    if artifact is None:
+        return jsonify({"error": "Artifact not found"}), 404
+    return jsonify(artifact)
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    """Return hit/miss counters for the LLM response cache"""
+    cache = response_cache.load()
+    if cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **cache.stats()})
+
+@app.route("/api/llm/stats", methods=["GET"])
+def llm_stats():
+    """Return failover, circuit, retry, throttling and concurrency counters for each LLM deployment"""
+    fragment_index = dedup_index.load()
+    verifier = java_verifier.load()
+    return jsonify(dict(
+        llm_client.stats(),
+        audit=audit_capture.stats(),
+        prompts=prompts.template_stats() if prompts.loaded else None,
+        deduplication=fragment_index.stats() if fragment_index is not None else None,
+        javaVerifier=verifier.stats() if verifier is not None else None
+    ))
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Expose stage latency, token, retry and cache metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/api/languages", methods=["GET"])
 def get_languages():
@@ -433,10 +1352,27 @@ def get_languages():
     ]
     return jsonify({"languages": languages})
 
+# Load modules, tokenizer, stores and LLM client in the background; /api/ready reports when this
+# is done. Defined after everything the steps use, since the thread starts straight away.
+warmup = Warmup()
+if WARMUP_ENABLED:
+    warmup.add("tokenizer", lambda: count_tokens("IDENTIFICATION DIVISION."))
+    warmup.add("templates", warm_templates)
+    warmup.add("chunker", warm_chunker)
+    warmup.add("stores", warm_stores)
+    warmup.add("llmClient", llm_client.load)
+    # A verifier that fails to start only affects verification; conversions are still served
+    warmup.add("javaVerifier", warm_java_verifier, required=False)
+# Jobs left unfinished by a stopped process are picked up off the import path, warm-up or not.
+# Resuming is safe to repeat (each job is claimed once) and a miss is retried by the next process.
+warmup.add("jobs", lambda: job_runner.resume(), required=False, attempts=3)
+warmup.start()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     debug = os.environ.get("FLASK_DEBUG", "False").lower() == "true"
     logger.info(f"Starting Flask app on port {port}, debug mode: {debug}")
+    logger.warning("This is the development server; run 'python serve.py' to serve in production")
     app.run(
         host="0.0.0.0",
         port=port,
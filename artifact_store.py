@@ -0,0 +1,170 @@
+"""
+Module for keeping per-program artifacts on the server so later calls can reference them by id.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_ANALYSIS = "analysis"
+ARTIFACT_STRUCTURE = "structure"
+ARTIFACT_CHUNKS = "chunks"
+ARTIFACT_DATABASE = "database"
+ARTIFACT_CONVERSION = "conversion"
+
+
+def make_source_id(source_language, source_code, vsam_definition=""):
+    """
+    Builds the content-addressed id of a program.
+
+    Args:
+        source_language (str): The programming language of the source code
+        source_code (str): The source code
+        vsam_definition (str): Optional VSAM file definition
+
+    Returns:
+        str: A SHA-256 hex digest identifying the program
+    """
+    payload = json.dumps([source_language.upper(), source_code, vsam_definition or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Stores program sources and derived artifacts in SQLite, keyed by source hash.
+
+    Artifacts are JSON values stored under a name such as 'analysis:JAVA' or
+    'chunks:6000', so results that depend on a setting are kept apart.
+    """
+
+    def __init__(self, path, ttl=None):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+            ttl (float): Seconds a program is kept after its last use, None to keep it forever
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "id TEXT PRIMARY KEY, language TEXT NOT NULL, source TEXT NOT NULL, vsam TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "source_id TEXT NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (source_id, name))"
+        )
+        self._conn.commit()
+
+    def put_source(self, source_language, source_code, vsam_definition=""):
+        """Stores a program if it is new and returns its id"""
+        source_id = make_source_id(source_language, source_code, vsam_definition)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sources (id, language, source, vsam, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET accessed_at = excluded.accessed_at",
+                (source_id, source_language, source_code, vsam_definition or "", now, now)
+            )
+            self._conn.commit()
+        self.prune()
+        return source_id
+
+    def get_source(self, source_id):
+        """Returns {'sourceLanguage', 'sourceCode', 'vsamDefinition'} for a stored program, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT language, source, vsam FROM sources WHERE id = ?", (source_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE sources SET accessed_at = ? WHERE id = ?", (time.time(), source_id))
+            self._conn.commit()
+        return {"sourceLanguage": row[0], "sourceCode": row[1], "vsamDefinition": row[2]}
+
+    def get(self, source_id, name):
+        """Returns a stored artifact, or None if it has not been computed"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM artifacts WHERE source_id = ? AND name = ?", (source_id, name)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, source_id, name, value):
+        """Stores or replaces an artifact of a program"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (source_id, name, value, created_at) VALUES (?, ?, ?, ?)",
+                (source_id, name, json.dumps(value), time.time())
+            )
+            self._conn.commit()
+
+    def get_or_compute(self, source_id, name, compute):
+        """Returns a stored artifact, computing and storing it first if it is missing"""
+        value = self.get(source_id, name)
+        if value is None:
+            value = compute()
+            self.set(source_id, name, value)
+        return value
+
+    def describe(self, source_id):
+        """Returns a program's metadata and the names of its artifacts, or None if it is unknown"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT language, length(source), created_at, accessed_at FROM sources WHERE id = ?", (source_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            names = [name for (name,) in self._conn.execute(
+                "SELECT name FROM artifacts WHERE source_id = ? ORDER BY name", (source_id,)
+            )]
+        return {
+            "sourceId": source_id,
+            "sourceLanguage": row[0],
+            "sourceSize": row[1],
+            "createdAt": row[2],
+            "accessedAt": row[3],
+            "artifacts": names
+        }
+
+    def prune(self):
+        """Removes programs, and their artifacts, that have not been used within the TTL"""
+        if self.ttl is None:
+            return 0
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM artifacts WHERE source_id IN (SELECT id FROM sources WHERE accessed_at < ?)", (cutoff,)
+            )
+            removed = self._conn.execute("DELETE FROM sources WHERE accessed_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        if removed:
+            logger.info(f"Pruned {removed} expired programs from the artifact store")
+        return removed
+
+
+def create_artifact_store_from_env():
+    """
+    Creates the artifact store configured by environment variables.
+
+    ARTIFACT_STORE_PATH sets the database file and ARTIFACT_TTL the number of
+    seconds an unused program is kept (0 keeps programs forever).
+
+    Returns:
+        ArtifactStore: The configured store
+    """
+    ttl = float(os.environ.get("ARTIFACT_TTL", 7 * 24 * 3600))
+    return ArtifactStore(
+        os.environ.get("ARTIFACT_STORE_PATH", os.path.join("data", "artifacts.sqlite3")),
+        ttl=ttl or None
+    )
@@ -0,0 +1,197 @@
+"""
+Module for sampled, asynchronous capture of raw LLM responses for auditing.
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Queued after the last record to make the writer thread close its file and stop
+_STOP = object()
+
+
+class AuditCapture:
+    """
+    Writes a sample of raw LLM responses to rotating gzip-compressed JSON-lines files.
+
+    The request thread only draws the sample and enqueues the response object;
+    serialisation, compression and file I/O happen on a background thread. When
+    the queue is full, records are dropped rather than slowing requests down.
+    """
+
+    def __init__(self, directory, sample_rate=0.0, max_file_bytes=50 * 1024 * 1024, max_files=20,
+                 retention_days=None, queue_size=1000, rotate_seconds=3600):
+        """
+        Args:
+            directory (str): Directory the audit files are written to
+            sample_rate (float): Share of responses captured, between 0 and 1
+            max_file_bytes (int): Uncompressed bytes written to a file before it is rotated
+            max_files (int): Number of files kept; the oldest are deleted first
+            retention_days (float): Optional age after which files are deleted
+            queue_size (int): Maximum number of records waiting to be written
+            rotate_seconds (float): Age after which a file is closed and the next record starts a new one
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.retention_days = retention_days
+        self.rotate_seconds = rotate_seconds
+        self.captured = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._handle = None
+        self._opened = 0.0
+        self._written = 0
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def record(self, label, response):
+        """
+        Queues a response for capture if it is sampled.
+
+        Args:
+            label (str): The call label, such as 'code conversion chunk 3'
+            response: The chat completion response object
+        """
+        if not self.enabled or self._closed or random.random() >= self.sample_rate:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((time.time(), label, response))
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="audit-capture", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._handle is not None and self.rotate_seconds:
+                timeout = max(0.0, self._opened + self.rotate_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # Finish an idle file once it is old enough so it can be read to the end
+                self._close_file()
+                continue
+            if item is _STOP:
+                self._close_file()
+                return
+            try:
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"Failed to write audit record: {str(e)}")
+            if self._queue.empty() and self._handle is not None:
+                self._handle.flush()
+
+    def close(self, timeout=10.0):
+        """Write the queued records and close the current file; later records are not captured"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Audit queue is still full at shutdown, dropping queued records")
+            return
+        thread.join(timeout)
+
+    def _write(self, timestamp, label, response):
+        payload = response.model_dump() if hasattr(response, "model_dump") else response
+        line = json.dumps({"timestamp": timestamp, "label": label, "response": payload}, default=str) + "\n"
+        data = line.encode("utf-8")
+        if self._handle is None or self._written + len(data) > self.max_file_bytes or (
+                self.rotate_seconds and time.monotonic() - self._opened >= self.rotate_seconds):
+            self._rotate()
+        self._handle.write(data)
+        self._written += len(data)
+        self.captured += 1
+
+    def _close_file(self):
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except OSError as e:
+                logger.error(f"Failed to close audit file: {str(e)}")
+            self._handle = None
+
+    def _rotate(self):
+        self._close_file()
+        name = f"audit-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{int(time.time() * 1000) % 1000:03d}.jsonl.gz"
+        self._handle = gzip.open(os.path.join(self.directory, name), "ab")
+        self._opened = time.monotonic()
+        self._written = 0
+        self._apply_retention()
+
+    def _apply_retention(self):
+        """Delete files beyond max_files or older than retention_days"""
+        files = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory)
+             if name.startswith("audit-") and name.endswith(".jsonl.gz")),
+            key=os.path.getmtime
+        )
+        current = self._handle.name if self._handle is not None else None
+        expired = files[:-self.max_files] if self.max_files and len(files) > self.max_files else []
+        if self.retention_days:
+            cutoff = time.time() - self.retention_days * 86400
+            expired += [path for path in files if os.path.getmtime(path) < cutoff and path not in expired]
+        for path in expired:
+            if path != current:
+                os.remove(path)
+
+    def stats(self):
+        return {
+            "sampleRate": self.sample_rate,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize()
+        }
+
+
+def create_audit_capture_from_env():
+    """
+    Creates the audit capture configured by environment variables.
+
+    LLM_AUDIT_SAMPLE_RATE sets the captured share of responses (0 disables
+    capture), LLM_AUDIT_DIR the directory, LLM_AUDIT_MAX_FILE_MB and
+    LLM_AUDIT_MAX_FILES the rotation by size, LLM_AUDIT_ROTATE_MINUTES the rotation by
+    time, and LLM_AUDIT_RETENTION_DAYS the maximum age.
+
+    Returns:
+        AuditCapture: The configured capture
+    """
+    retention_days = float(os.environ.get("LLM_AUDIT_RETENTION_DAYS", 7))
+    return AuditCapture(
+        os.environ.get("LLM_AUDIT_DIR", os.path.join("data", "audit")),
+        sample_rate=float(os.environ.get("LLM_AUDIT_SAMPLE_RATE", 0.0)),
+        max_file_bytes=int(float(os.environ.get("LLM_AUDIT_MAX_FILE_MB", 50)) * 1024 * 1024),
+        max_files=int(os.environ.get("LLM_AUDIT_MAX_FILES", 20)),
+        retention_days=retention_days or None,
+        queue_size=int(os.environ.get("LLM_AUDIT_QUEUE_SIZE", 1000)),
+        rotate_seconds=float(os.environ.get("LLM_AUDIT_ROTATE_MINUTES", 60)) * 60
+    )
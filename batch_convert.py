@@ -0,0 +1,350 @@
+"""
+Module for converting a whole COBOL portfolio in one batch, with copybook resolution.
+"""
+import json
+import logging
+import os
+import re
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+PROGRAM_EXTENSIONS = (".cbl", ".cob", ".cobol")
+COPYBOOK_EXTENSIONS = (".cpy", ".copy", ".cpb")
+
+# The start of a COPY statement; its clauses run on, possibly over several lines, up to a separator period
+COPY_STATEMENT = re.compile(
+    r"^(?P<indent>[^\n*'\"]*?)\bCOPY\s+(?P<quote>['\"]?)(?P<name>[A-Z0-9][A-Z0-9_-]*)(?P=quote)(?![A-Z0-9_-])",
+    re.IGNORECASE | re.MULTILINE
+)
+# Whitespace between clauses, including the sequence numbers of continued fixed-format lines
+COPY_SEPARATOR = re.compile(r"(?:\s|(?<=\n)\d{6}(?= ))*")
+COPY_CLAUSE = re.compile(r"==[\s\S]*?==|'[^'\n]*'|\"[^\"\n]*\"|\.(?=\s|$)|(?:[^\s.'\"=]|\.(?=\S)|=(?!=))+")
+# Characters that continue a COBOL word, so a replaced word is not matched inside a longer one
+WORD_CHARACTER = "A-Za-z0-9_-"
+
+TARGET_EXTENSIONS = {"JAVA": ".java", "C#": ".cs"}
+
+
+def _member_name(path):
+    """Return the upper-case member name of a program or copybook path"""
+    return os.path.splitext(os.path.basename(path))[0].upper()
+
+
+def _add_member(members, kind, path, text, paths):
+    """Add a program or copybook under its member name, rejecting a second one of the same name"""
+    name = _member_name(path)
+    if name in members:
+        raise ValueError(f"Duplicate {kind} {name}: {paths[(kind, name)]} and {path}")
+    members[name] = text
+    paths[(kind, name)] = path
+
+
+def _add_source(path, text, programs, copybooks, paths):
+    lower = path.lower()
+    if lower.endswith(PROGRAM_EXTENSIONS):
+        _add_member(programs, "program", path, text, paths)
+    elif lower.endswith(COPYBOOK_EXTENSIONS):
+        _add_member(copybooks, "copybook", path, text, paths)
+
+
+def load_portfolio_from_tar(archive_path):
+    """
+    Reads COBOL programs and copybooks from a tarball.
+
+    Args:
+        archive_path (str): Path to a (optionally compressed) tar archive
+
+    Returns:
+        tuple: (programs, copybooks) dicts mapping member name to source text
+
+    Raises:
+        ValueError: If two programs or two copybooks have the same member name
+    """
+    programs = {}
+    copybooks = {}
+    paths = {}
+    with tarfile.open(archive_path, "r:*") as archive:
+        for member in archive.getmembers():
+            if not member.isfile():
+                continue
+            handle = archive.extractfile(member)
+            if handle is None:
+                continue
+            text = handle.read().decode("utf-8", errors="replace")
+            _add_source(member.name, text, programs, copybooks, paths)
+    return programs, copybooks
+
+
+def load_portfolio_from_manifest(manifest, root):
+    """
+    Reads COBOL programs and copybooks listed in a directory manifest.
+
+    Args:
+        manifest (dict): {"programs": [paths], "copybooks": [paths or directories]}
+        root (str): Directory that every manifest path must stay inside
+
+    Returns:
+        tuple: (programs, copybooks) dicts mapping member name to source text
+
+    Raises:
+        ValueError: If a path escapes the root directory, or two programs or two copybooks have the same member name
+    """
+    root = os.path.realpath(root)
+    programs = {}
+    copybooks = {}
+    paths = {}
+
+    def resolve(path):
+        full_path = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, full_path]) != root:
+            raise ValueError(f"Path outside batch source root: {path}")
+        return full_path
+
+    def read(path):
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            return handle.read()
+
+    for path in manifest.get("programs", []):
+        _add_member(programs, "program", path, read(resolve(path)), paths)
+    for path in manifest.get("copybooks", []):
+        full_path = resolve(path)
+        if os.path.isdir(full_path):
+            for name in sorted(os.listdir(full_path)):
+                if name.lower().endswith(COPYBOOK_EXTENSIONS):
+                    _add_member(copybooks, "copybook", os.path.join(path, name),
+                                read(os.path.join(full_path, name)), paths)
+        else:
+            _add_member(copybooks, "copybook", path, read(full_path), paths)
+    return programs, copybooks
+
+
+def copy_statements(source):
+    """
+    Finds the COPY statements of a program or copybook.
+
+    Returns:
+        list: (match, end, clauses) per statement: the COPY_STATEMENT match, the offset just after the
+        statement's period and the clause tokens between the copybook name and the period
+    """
+    statements = []
+    position = 0
+    while True:
+        match = COPY_STATEMENT.search(source, position)
+        if match is None:
+            return statements
+        clauses = []
+        end = None
+        scan = match.end()
+        while True:
+            scan = COPY_SEPARATOR.match(source, scan).end()
+            token = COPY_CLAUSE.match(source, scan)
+            if token is None:
+                break
+            scan = token.end()
+            if token.group(0) == ".":
+                end = scan
+                break
+            clauses.append(token.group(0))
+        if end is None:
+            position = match.end()
+            continue
+        statements.append((match, end, clauses))
+        position = end
+
+
+def _replacing_operand(token):
+    if token.startswith("==") and token.endswith("=="):
+        return token[2:-2].strip()
+    return token
+
+
+def parse_replacing(clauses):
+    """
+    Reads the REPLACING phrase of a COPY statement's clauses.
+
+    Returns:
+        list: (text, replacement, mode) per operand pair, mode being None, 'LEADING' or 'TRAILING'
+
+    Raises:
+        ValueError: For clauses other than OF/IN library and REPLACING, or a malformed REPLACING phrase
+    """
+    position = 0
+    if clauses and clauses[0].upper() in ("OF", "IN"):
+        position = 2
+    if position >= len(clauses):
+        return []
+    if clauses[position].upper() != "REPLACING":
+        raise ValueError(f"{clauses[position].upper()} phrase")
+    position += 1
+    replacements = []
+    while position < len(clauses):
+        mode = clauses[position].upper() if clauses[position].upper() in ("LEADING", "TRAILING") else None
+        if mode:
+            position += 1
+        if len(clauses) - position < 3 or clauses[position + 1].upper() != "BY":
+            raise ValueError("malformed REPLACING phrase")
+        text = _replacing_operand(clauses[position])
+        if not text:
+            raise ValueError("empty REPLACING operand")
+        replacements.append((text, _replacing_operand(clauses[position + 2]), mode))
+        position += 3
+    if not replacements:
+        raise ValueError("malformed REPLACING phrase")
+    return replacements
+
+
+def apply_replacing(text, replacements):
+    """Apply REPLACING operand pairs to copybook text, leftmost match first and in the order they are listed"""
+    if not replacements:
+        return text
+    patterns = []
+    for text_operand, _, mode in replacements:
+        words = text_operand.split()
+        pattern = r"\s+".join(re.escape(word) for word in words)
+        if mode != "TRAILING" and re.match(f"[{WORD_CHARACTER}]", words[0][0]):
+            pattern = f"(?<![{WORD_CHARACTER}])" + pattern
+        if mode != "LEADING" and re.match(f"[{WORD_CHARACTER}]", words[-1][-1]):
+            pattern += f"(?![{WORD_CHARACTER}])"
+        patterns.append(f"({pattern})")
+    combined = re.compile("|".join(patterns), re.IGNORECASE)
+    return combined.sub(lambda match: replacements[match.lastindex - 1][1], text)
+
+
+class CopybookResolver:
+    """Expands COPY statements, resolving each shared copybook only once across programs."""
+
+    def __init__(self, copybooks):
+        self.copybooks = copybooks
+        self._expanded = {}
+        self._nested = {}
+        self._unsupported = {}
+        self._lock = threading.Lock()
+        self.usage = {}
+
+    def expand_copybook(self, name, stack=()):
+        """Return the fully expanded text of a copybook, or None if it is missing"""
+        with self._lock:
+            if name in self._expanded:
+                return self._expanded[name]
+        if name not in self.copybooks:
+            return None
+        if name in stack:
+            raise ValueError(f"Recursive COPY of {name}: {' -> '.join(stack + (name,))}")
+        nested = set()
+        unsupported = []
+        text = self._expand(self.copybooks[name], stack + (name,), nested, unsupported)
+        with self._lock:
+            self._expanded[name] = text
+            self._nested[name] = nested
+            self._unsupported[name] = unsupported
+        return text
+
+    def _expand(self, source, stack, used, unsupported):
+        pieces = []
+        position = 0
+        for match, end, clauses in copy_statements(source):
+            name = match.group("name").upper()
+            try:
+                replacements = parse_replacing(clauses)
+            except ValueError as e:
+                # Left unexpanded rather than expanded without the phrase the program depends on
+                unsupported.append(f"COPY {name}: {str(e)}")
+                continue
+            expanded = self.expand_copybook(name, stack)
+            if expanded is None:
+                continue
+            used.add(name)
+            used.update(self._nested.get(name, ()))
+            unsupported.extend(self._unsupported.get(name, ()))
+            pieces.append(source[position:match.start()])
+            pieces.append(f"{match.group('indent')}*> COPY {name}\n{apply_replacing(expanded.rstrip(), replacements)}")
+            position = end
+        pieces.append(source[position:])
+        return "".join(pieces)
+
+    def resolve_program(self, program_name, source):
+        """
+        Expands every COPY statement in a program.
+
+        Returns:
+            tuple: (expanded source, sorted list of copybooks used, sorted list of missing copybooks,
+            list of COPY statements left unexpanded because a phrase is not supported)
+        """
+        used = set()
+        unsupported = []
+        expanded = self._expand(source, (), used, unsupported)
+        missing = sorted({
+            match.group("name").upper()
+            for match, _, _ in copy_statements(source)
+            if match.group("name").upper() not in self.copybooks
+        })
+        with self._lock:
+            for name in used:
+                self.usage.setdefault(name, []).append(program_name)
+        return expanded, sorted(used), missing, sorted(set(unsupported))
+
+
+def run_batch(programs, copybooks, convert_program, output_path, target_language, max_workers=4):
+    """
+    Converts every program of a portfolio and streams the results into a zip archive.
+
+    Args:
+        programs (dict): Program name to COBOL source
+        copybooks (dict): Copybook name to COBOL source
+        convert_program (callable): Called as convert_program(expanded_source) and returns the conversion result
+        output_path (str): Path of the zip archive to write
+        target_language (str): The target programming language, used for file extensions
+        max_workers (int): Maximum number of programs converted at the same time
+
+    Returns:
+        dict: Summary with per-program status and copybook sharing statistics
+    """
+    resolver = CopybookResolver(copybooks)
+    extension = TARGET_EXTENSIONS.get(target_language.upper(), ".txt")
+    summary = {"programs": {}, "copybooks": {}}
+    archive_lock = threading.Lock()
+
+    def convert(name):
+        expanded, used, missing, unsupported = resolver.resolve_program(name, programs[name])
+        if missing:
+            logger.warning(f"Program {name} references missing copybooks: {', '.join(missing)}")
+        if unsupported:
+            logger.warning(f"Program {name} has COPY statements that were not expanded: {'; '.join(unsupported)}")
+        result = convert_program(expanded)
+        return {"copybooks": used, "missingCopybooks": missing, "unsupportedCopies": unsupported, "result": result}
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+            futures = {executor.submit(convert, name): name for name in sorted(programs)}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    converted = future.result()
+                except Exception as e:
+                    logger.error(f"Batch conversion of {name} failed: {str(e)}")
+                    summary["programs"][name] = {"status": "failed", "error": str(e)}
+                    continue
+                result = converted["result"]
+                # Write each program as soon as it is done so partial batches are still usable
+                with archive_lock:
+                    archive.writestr(f"converted/{name}{extension}", result.get("convertedCode", ""))
+                    archive.writestr(f"details/{name}.json", json.dumps(result, indent=2))
+                summary["programs"][name] = {
+                    "status": "completed",
+                    "copybooks": converted["copybooks"],
+                    "missingCopybooks": converted["missingCopybooks"],
+                    "unsupportedCopies": converted["unsupportedCopies"]
+                }
+                logger.info(f"Batch: converted {name} ({len(summary['programs'])}/{len(programs)})")
+
+        summary["copybooks"] = {
+            name: {"usedBy": sorted(users)} for name, users in sorted(resolver.usage.items())
+        }
+        archive.writestr("summary.json", json.dumps(summary, indent=2))
+
+    return summary
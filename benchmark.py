@@ -0,0 +1,292 @@
+"""
+Offline benchmark of the analysis and conversion endpoints against a fake LLM backend.
+
+Replays a corpus of COBOL programs of graded sizes through
+/api/analyze-requirements and /api/convert, with the Azure OpenAI client
+pointed at a local fake chat-completions server, and reports latency
+percentiles, throughput, LLM calls per request and tokens per request.
+
+Example:
+    python benchmark.py --sizes small,medium,large --requests 8 --concurrency 4 --output bench.json
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_llm_server import FakeLLMBehaviour, FakeLLMServer
+
+logger = logging.getLogger(__name__)
+
+# Paragraph counts of the synthetic programs
+PROGRAM_SIZES = {"small": 5, "medium": 40, "large": 200}
+
+ENDPOINTS = {
+    "analyze": "/api/analyze-requirements",
+    "convert": "/api/convert",
+}
+
+# Modules app.py needs to serve a conversion. cobol_chunker, db_templates and json_extract
+# are not part of this repository and must be installed next to it.
+APP_DEPENDENCIES = ["flask", "flask_cors", "dotenv", "openai", "httpx", "cobol_chunker", "db_templates", "json_extract"]
+
+
+def missing_app_dependencies(extra=()):
+    """Return the modules the app needs that cannot be imported here"""
+    return [name for name in list(APP_DEPENDENCIES) + list(extra) if importlib.util.find_spec(name) is None]
+
+
+def check_app_dependencies(extra=()):
+    """
+    Stops before a run whose every request would fail on a missing module.
+
+    Raises:
+        RuntimeError: Naming the modules that cannot be imported
+    """
+    missing = missing_app_dependencies(extra)
+    if missing:
+        raise RuntimeError(
+            f"Cannot benchmark the app, these modules are not importable: {', '.join(missing)}. "
+            f"Install requirements.txt and put cobol_chunker, db_templates and "
+            f"json_extract on PYTHONPATH."
+        )
+
+
+def generate_program(name, paragraphs, statements=8, with_sql=False):
+    """
+    Generates a deterministic synthetic COBOL program.
+
+    Args:
+        name (str): The PROGRAM-ID
+        paragraphs (int): Number of procedure paragraphs, each performing the next one
+        statements (int): Statements per paragraph
+        with_sql (bool): Whether to include embedded SQL
+
+    Returns:
+        str: The COBOL source in fixed format
+    """
+    lines = [
+        "IDENTIFICATION DIVISION.",
+        f"PROGRAM-ID. {name}.",
+        "DATA DIVISION.",
+        "WORKING-STORAGE SECTION.",
+    ]
+    for i in range(paragraphs):
+        lines.append(f"01  WS-REC-{i:03d}.")
+        lines.append(f"    05 WS-AMT-{i:03d}     PIC S9(7)V99 COMP-3.")
+        lines.append(f"    05 WS-CNT-{i:03d}     PIC 9(4) VALUE ZERO.")
+    if with_sql:
+        lines.append("    EXEC SQL INCLUDE SQLCA END-EXEC.")
+    lines.append("PROCEDURE DIVISION.")
+    lines.append("MAIN-PARA.")
+    lines.append("    PERFORM PARA-000.")
+    lines.append("    STOP RUN.")
+    for i in range(paragraphs):
+        lines.append(f"PARA-{i:03d}.")
+        for j in range(statements):
+            lines.append(f"    ADD {j + 1} TO WS-AMT-{i:03d}.")
+        lines.append(f"    ADD 1 TO WS-CNT-{i:03d}.")
+        if with_sql and i % 10 == 0:
+            lines.append(f"    EXEC SQL SELECT BAL INTO :WS-AMT-{i:03d} FROM ACCOUNTS END-EXEC.")
+        if i + 1 < paragraphs:
+            lines.append(f"    PERFORM PARA-{i + 1:03d}.")
+    return "".join(f"{(n + 1) * 100:06d} {line}\n" for n, line in enumerate(lines))
+
+
+def load_corpus(sizes, corpus_dir=None):
+    """Return {program name: source} from a directory of .cbl files or the synthetic generator"""
+    if corpus_dir:
+        corpus = {}
+        for file_name in sorted(os.listdir(corpus_dir)):
+            if file_name.lower().endswith((".cbl", ".cob", ".cobol")):
+                with open(os.path.join(corpus_dir, file_name), encoding="utf-8", errors="replace") as handle:
+                    corpus[os.path.splitext(file_name)[0]] = handle.read()
+        return corpus
+    return {
+        size: generate_program(f"BENCH{size[:3].upper()}", PROGRAM_SIZES[size], with_sql=(size != "small"))
+        for size in sizes
+    }
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_scenario(test_client, behaviour, path, payload, requests, concurrency):
+    """
+    Sends the same request repeatedly and measures it.
+
+    Args:
+        test_client: Flask test client of the app
+        behaviour (FakeLLMBehaviour): The fake server's counters
+        path (str): Endpoint path
+        payload (dict): JSON body
+        requests (int): Number of requests to send
+        concurrency (int): Number of requests in flight at the same time
+
+    Returns:
+        dict: Latency percentiles, throughput, failures and per-request LLM calls and tokens
+    """
+    before = behaviour.snapshot()
+
+    def send(_):
+        started = time.perf_counter()
+        response = test_client.post(path, json=payload)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(send, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    after = behaviour.snapshot()
+    latencies = [latency for latency, status in outcomes if status == 200]
+    return {
+        "requests": requests,
+        "failed": sum(1 for _, status in outcomes if status != 200),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "throughputPerSecond": requests / elapsed if elapsed else None,
+        "llmCallsPerRequest": (after["requests"] - before["requests"]) / requests,
+        "llmErrorsPerRequest": (after["errors"] + after["throttled"] - before["errors"] - before["throttled"]) / requests,
+        "promptTokensPerRequest": (after["promptTokens"] - before["promptTokens"]) / requests,
+        "completionTokensPerRequest": (after["completionTokens"] - before["completionTokens"]) / requests
+    }
+
+
+def run_benchmark(corpus, endpoints, behaviour, requests=8, concurrency=4, target_language="Java", warm=False):
+    """
+    Runs every endpoint against every program of the corpus.
+
+    The app is imported only after its environment points at the fake server,
+    with the response cache disabled and its stores in a temporary directory.
+
+    Returns:
+        dict: Results keyed by endpoint, then by program
+
+    Raises:
+        RuntimeError: If a module the app needs is missing
+    """
+    check_app_dependencies()
+    server = FakeLLMServer(behaviour).start()
+    data_dir = tempfile.mkdtemp(prefix="cobol-bench-")
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": server.url,
+        "AZURE_OPENAI_API_KEY": "benchmark",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "benchmark",
+        "LLM_CACHE_BACKEND": "memory" if warm else "none",
+        # The synthetic programs are inside the rule-based subset; measure the LLM path
+        "RULE_TRANSLATION_ENABLED": "false",
+        # The fake backend's code does not compile, so do not measure repair rounds
+        "JAVA_VERIFY_ENABLED": "false",
+        # Fresh stores per run, so fragments or chunks converted by an earlier run are never reused
+        "ARTIFACT_STORE_PATH": os.path.join(data_dir, "artifacts.sqlite3"),
+        "JOB_STORE_PATH": os.path.join(data_dir, "jobs.sqlite3"),
+        "DEDUP_INDEX_PATH": os.path.join(data_dir, "dedup.sqlite3"),
+    })
+    os.environ.pop("AZURE_OPENAI_DEPLOYMENTS", None)
+    from app import app
+
+    results = {}
+    try:
+        # A plain test client (not a context manager) is safe to share between threads
+        test_client = app.test_client()
+        for endpoint in endpoints:
+            for name, source_code in corpus.items():
+                payload = {
+                    "sourceLanguage": "COBOL",
+                    "targetLanguage": target_language,
+                    "sourceCode": source_code,
+                    "bypassCache": not warm
+                }
+                logger.info(f"Benchmarking {endpoint} with {name} ({len(source_code)} characters)")
+                results.setdefault(endpoint, {})[name] = run_scenario(
+                    test_client, behaviour, ENDPOINTS[endpoint], payload, requests, concurrency
+                )
+    finally:
+        server.stop()
+    return results
+
+
+def format_report(results):
+    """Render benchmark results as a text table"""
+    header = f"{'endpoint':<10} {'program':<12} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'req/s':>7} " \
+             f"{'calls':>6} {'prompt tok':>11} {'compl tok':>10} {'failed':>6}"
+    rows = [header, "-" * len(header)]
+    for endpoint, programs in results.items():
+        for name, stats in programs.items():
+            def seconds(value):
+                return f"{value:8.3f}" if value is not None else f"{'-':>8}"
+            rows.append(
+                f"{endpoint:<10} {name:<12} {seconds(stats['p50'])} {seconds(stats['p95'])} {seconds(stats['p99'])} "
+                f"{stats['throughputPerSecond']:7.2f} {stats['llmCallsPerRequest']:6.1f} "
+                f"{stats['promptTokensPerRequest']:11.0f} {stats['completionTokensPerRequest']:10.0f} "
+                f"{stats['failed']:6d}"
+            )
+    return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the conversion pipeline against a fake LLM backend")
+    parser.add_argument("--sizes", default="small,medium,large", help="Synthetic program sizes to run")
+    parser.add_argument("--corpus", help="Directory of .cbl files to use instead of synthetic programs")
+    parser.add_argument("--endpoints", default="analyze,convert")
+    parser.add_argument("--requests", type=int, default=8, help="Requests per endpoint and program")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--target-language", default="Java")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--per-token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm", action="store_true", help="Allow cached responses and stored analyses")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    try:
+        check_app_dependencies()
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+
+    behaviour = FakeLLMBehaviour(
+        latency=args.latency,
+        jitter=args.jitter,
+        per_token_latency=args.per_token_latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed
+    )
+    corpus = load_corpus([size for size in args.sizes.split(",") if size], args.corpus)
+    results = run_benchmark(
+        corpus,
+        [endpoint for endpoint in args.endpoints.split(",") if endpoint],
+        behaviour,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        target_language=args.target_language,
+        warm=args.warm
+    )
+
+    print(format_report(results))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump({"settings": vars(args), "results": results}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
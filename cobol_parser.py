@@ -0,0 +1,530 @@
+"""
+Module for building a structural index of COBOL programs and chunking them along call-graph boundaries.
+"""
+import logging
+import re
+
+from token_chunker import count_tokens, pack_units, split_oversized_unit, split_units
+
+logger = logging.getLogger(__name__)
+
+DIVISION_HEADER = re.compile(r"^(IDENTIFICATION|ID|ENVIRONMENT|DATA|PROCEDURE)\s+DIVISION\b", re.IGNORECASE)
+SECTION_HEADER = re.compile(r"^([A-Z0-9][A-Z0-9-]*)\s+SECTION\b(?:\s+\d+)?\s*\.", re.IGNORECASE)
+PARAGRAPH_HEADER = re.compile(r"^([A-Z0-9][A-Z0-9-]*)\s*\.(?:\s|$)", re.IGNORECASE)
+DATA_ENTRY = re.compile(r"^(\d{1,2})(?:\s+([A-Z0-9][A-Z0-9-]*))?", re.IGNORECASE)
+FILE_DESCRIPTOR = re.compile(r"^(FD|SD)\s+([A-Z0-9][A-Z0-9-]*)", re.IGNORECASE)
+SELECT_CLAUSE = re.compile(r"\bSELECT\s+(?:OPTIONAL\s+)?([A-Z0-9][A-Z0-9-]*)", re.IGNORECASE)
+ORGANIZATION_CLAUSE = re.compile(r"\bORGANIZATION\s+(?:IS\s+)?(INDEXED|RELATIVE|SEQUENTIAL|LINE\s+SEQUENTIAL)", re.IGNORECASE)
+REDEFINES_CLAUSE = re.compile(r"\bREDEFINES\s+([A-Z0-9][A-Z0-9-]*)", re.IGNORECASE)
+OCCURS_CLAUSE = re.compile(
+    r"\bOCCURS\s+(\d+)(?:\s+TO\s+(\d+))?(?:\s+TIMES)?(?:\s+DEPENDING\s+ON\s+([A-Z0-9][A-Z0-9-]*))?",
+    re.IGNORECASE
+)
+PICTURE_CLAUSE = re.compile(r"\bPIC(?:TURE)?\s+(?:IS\s+)?(\S+?)\.?(?=\s|$)", re.IGNORECASE)
+VALUE_CLAUSE = re.compile(r"\bVALUES?\s+(?:IS\s+|ARE\s+)?(.*?)\s*\.?\s*$", re.IGNORECASE)
+ASSIGN_CLAUSE = re.compile(r"\bASSIGN\s+(?:TO\s+)?('[^']*'|\"[^\"]*\"|[A-Z0-9][A-Z0-9-]*)", re.IGNORECASE)
+USAGE_CLAUSE = re.compile(r"\b(COMP(?:UTATIONAL)?(?:-[1-5])?|BINARY|PACKED-DECIMAL|DISPLAY|INDEX)\b", re.IGNORECASE)
+PERFORM_TARGET = re.compile(
+    r"\bPERFORM\s+([A-Z0-9][A-Z0-9-]*)(?:\s+(?:THRU|THROUGH)\s+([A-Z0-9][A-Z0-9-]*))?",
+    re.IGNORECASE
+)
+GO_TO_TARGETS = re.compile(r"\bGO\s+TO\s+((?:[A-Z0-9][A-Z0-9-]*\s*)+?)(?=\bDEPENDING\b|\.|$)", re.IGNORECASE | re.MULTILINE)
+EXEC_SQL_START = re.compile(r"\bEXEC\s+SQL\b", re.IGNORECASE)
+EXEC_END = re.compile(r"\bEND-EXEC\b", re.IGNORECASE)
+SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN|TABLE)\s+([A-Z_][A-Z0-9_.]*)", re.IGNORECASE)
+COPY_STATEMENT = re.compile(r"\bCOPY\s+['\"]?([A-Z0-9][A-Z0-9_-]*)", re.IGNORECASE)
+WORD = re.compile(r"[A-Z0-9][A-Z0-9-]*", re.IGNORECASE)
+
+# Words that can follow PERFORM without naming a paragraph (inline PERFORM)
+INLINE_PERFORM_WORDS = {"UNTIL", "VARYING", "WITH", "TEST", "FOREVER"}
+
+# Statements that can stand alone on a line but never name a paragraph
+NON_PARAGRAPH_WORDS = {
+    "EXIT", "GOBACK", "CONTINUE", "END-IF", "END-PERFORM", "END-EVALUATE", "END-READ",
+    "END-WRITE", "END-COMPUTE", "END-SEARCH", "END-CALL", "END-EXEC", "ELSE", "STOP", "RUN",
+}
+
+
+def is_fixed_format(lines):
+    """Guess whether a program uses fixed-format reference columns"""
+    sample = [line for line in lines if line.strip()][:200]
+    if not sample:
+        return False
+    fixed = sum(
+        1 for line in sample
+        if len(line) > 6 and (line[:6].isdigit() or not line[:6].strip()) and line[6] in " *-/Dd"
+    )
+    return fixed >= 0.9 * len(sample)
+
+
+class CobolIndex:
+    """Structural index of a COBOL program produced by CobolParser."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.divisions = {}
+        self.sections = []
+        self.paragraphs = []
+        self.data_items = []
+        self.files = {}
+        self.exec_sql = []
+        self.copybooks = []
+        self.procedure_start = None
+
+    def paragraph_names(self):
+        return [paragraph["name"] for paragraph in self.paragraphs]
+
+    def text(self, start, end):
+        """Return the original source lines start..end (exclusive)"""
+        return "".join(self.lines[start:end])
+
+    def call_graph(self):
+        """
+        Returns the paragraph call graph.
+
+        PERFORM A THRU B adds an edge to every paragraph from A to B, and
+        PERFORM of a section adds an edge to every paragraph in it, since
+        control falls through all of them.
+
+        Returns:
+            dict: Paragraph name to the sorted list of paragraphs it transfers control to
+        """
+        names = self.paragraph_names()
+        positions = {name: i for i, name in enumerate(names)}
+        section_members = {}
+        for paragraph in self.paragraphs:
+            if paragraph["section"]:
+                section_members.setdefault(paragraph["section"], []).append(paragraph["name"])
+        graph = {}
+        for paragraph in self.paragraphs:
+            targets = set(paragraph["gotos"])
+            for start, end in paragraph["performs"]:
+                if end and start in positions and end in positions:
+                    targets.update(names[positions[start]:positions[end] + 1])
+                else:
+                    targets.add(start)
+                for target in (start, end):
+                    targets.update(section_members.get(target, []) if target else [])
+            graph[paragraph["name"]] = sorted(name for name in targets if name in positions)
+        return graph
+
+    def records(self):
+        """Return the top-level (01/77) data items in program order"""
+        return [item for item in self.data_items if item["level"] in (1, 77)]
+
+    def record_of(self, item):
+        """Return the top-level record that contains a data item"""
+        while item["parent"] is not None:
+            item = self.data_items[item["parent"]]
+        return item
+
+    def referenced_records(self, text):
+        """Return the names of the top-level records whose items are referenced in text"""
+        words = {word.upper() for word in WORD.findall(text)}
+        names = set()
+        for item in self.data_items:
+            if item["name"] and item["name"] in words:
+                names.add(self.record_of(item)["name"])
+        return names
+
+    def record_text(self, name):
+        """Return the source text of a top-level record and all of its subordinate items"""
+        for item in self.records():
+            if item["name"] == name:
+                return self.text(item["start"], item["end"])
+        return ""
+
+    def data_context(self, names):
+        """Return (record names in program order, their source text) for a set of record names"""
+        ordered = [item["name"] for item in self.records() if item["name"] in names]
+        return ordered, "".join(self.record_text(name) for name in ordered)
+
+    def uses_database(self):
+        return bool(self.exec_sql)
+
+    def summary(self):
+        """Return a JSON-serialisable overview of the index"""
+        return {
+            "divisions": sorted(self.divisions),
+            "sections": [section["name"] for section in self.sections],
+            "paragraphs": self.paragraph_names(),
+            "callGraph": self.call_graph(),
+            "dataItems": len(self.data_items),
+            "records": [item["name"] for item in self.records()],
+            "redefines": {item["name"]: item["redefines"] for item in self.data_items if item["redefines"]},
+            "occurs": {item["name"]: item["occurs"] for item in self.data_items if item["occurs"]},
+            "files": self.files,
+            "execSql": [{"line": block["start"] + 1, "tables": block["tables"]} for block in self.exec_sql],
+            "copybooks": self.copybooks
+        }
+
+
+class CobolParser:
+    """
+    Single-pass, line-by-line COBOL parser.
+
+    Lines are fed one at a time so large programs never need to be tokenised
+    as a whole. Fixed-format sequence numbers, indicator column, comment and
+    continuation lines are handled.
+    """
+
+    def __init__(self, fixed_format=True):
+        self.fixed_format = fixed_format
+        self.index = CobolIndex([])
+        self._division = None
+        self._section = None
+        self._paragraph = None
+        self._sql = None
+        self._entry = None
+        self._level_stack = []
+        self._current_file = None
+        self._select = None
+
+    def _split(self, line):
+        """Return (indicator, starts_in_area_a, code text) for a source line"""
+        if self.fixed_format:
+            body = line.rstrip("\r\n")
+            indicator = body[6] if len(body) > 6 else " "
+            code = body[7:72] if len(body) > 7 else ""
+            area_a = bool(code[:4].strip()) and not code[:1].isspace()
+            return indicator, area_a, code
+        stripped = line.strip()
+        if stripped.startswith("*>"):
+            return "*", False, ""
+        return " ", True, line.rstrip("\r\n")
+
+    def feed(self, line):
+        """Parse the next source line"""
+        line_number = len(self.index.lines)
+        self.index.lines.append(line)
+        indicator, area_a, code = self._split(line)
+        if indicator in "*/" or not code.strip():
+            return
+        # Drop inline comments before analysing the statement
+        code = code.split("*>", 1)[0]
+        text = code.strip()
+        if not text:
+            return
+
+        for match in COPY_STATEMENT.finditer(text):
+            self.index.copybooks.append(match.group(1).upper())
+
+        if self._sql is not None or EXEC_SQL_START.search(text):
+            if self._sql is None and self._division == "DATA":
+                self._finish_entry(line_number)
+            self._feed_sql(text, line_number)
+            if self._sql is not None or self._division == "DATA":
+                return
+
+        division = DIVISION_HEADER.match(text)
+        if division:
+            self._finish_entry(line_number)
+            self._close_paragraph(line_number)
+            self._division = "IDENTIFICATION" if division.group(1).upper() == "ID" else division.group(1).upper()
+            self.index.divisions[self._division] = line_number
+            if self._division == "PROCEDURE":
+                self.index.procedure_start = line_number
+            return
+
+        if self._division == "PROCEDURE":
+            self._feed_procedure(text, area_a, line_number)
+        elif self._division == "DATA":
+            self._feed_data(text, line_number)
+        elif self._division == "ENVIRONMENT":
+            self._feed_environment(text)
+
+    def _feed_sql(self, text, line_number):
+        if self._sql is None:
+            self._sql = {"start": line_number, "text": [], "paragraph": self._paragraph["name"] if self._paragraph else None}
+        self._sql["text"].append(text)
+        if EXEC_END.search(text):
+            sql_text = " ".join(self._sql["text"])
+            self._sql["end"] = line_number + 1
+            self._sql["text"] = sql_text
+            self._sql["tables"] = sorted({table.upper() for table in SQL_TABLE.findall(sql_text)
+                                          if not table.startswith(":")})
+            self.index.exec_sql.append(self._sql)
+            self._sql = None
+
+    def _feed_environment(self, text):
+        select = SELECT_CLAUSE.search(text)
+        if select:
+            self._select = select.group(1).upper()
+            self.index.files.setdefault(self._select, {"organization": "SEQUENTIAL", "records": []})
+        assign = ASSIGN_CLAUSE.search(text)
+        if assign and self._select:
+            self.index.files[self._select]["assign"] = assign.group(1).strip("'\"")
+        organization = ORGANIZATION_CLAUSE.search(text)
+        if organization and self._select:
+            self.index.files[self._select]["organization"] = " ".join(organization.group(1).upper().split())
+
+    def _feed_data(self, text, line_number):
+        section = SECTION_HEADER.match(text)
+        if section:
+            self._finish_entry(line_number)
+            self._current_file = None
+            self._level_stack = []
+            self._section = section.group(1).upper()
+            self.index.sections.append({"name": self._section, "division": "DATA", "start": line_number})
+            return
+
+        descriptor = FILE_DESCRIPTOR.match(text)
+        if descriptor:
+            self._finish_entry(line_number)
+            self._current_file = descriptor.group(2).upper()
+            self.index.files.setdefault(self._current_file, {"organization": "SEQUENTIAL", "records": []})
+            self.index.files[self._current_file]["descriptor"] = descriptor.group(1).upper()
+            return
+
+        if DATA_ENTRY.match(text) and (self._entry is None or self._entry["complete"]):
+            self._finish_entry(line_number)
+            self._entry = {"text": text, "start": line_number, "complete": text.rstrip().endswith(".")}
+        elif self._entry is not None:
+            self._entry["text"] += " " + text
+            self._entry["complete"] = text.rstrip().endswith(".")
+
+    def _finish_entry(self, line_number):
+        """Turn the accumulated data description entry into a data item"""
+        entry, self._entry = self._entry, None
+        if entry is None:
+            return
+        match = DATA_ENTRY.match(entry["text"])
+        level = int(match.group(1))
+        name = (match.group(2) or "FILLER").upper()
+        if name in ("REDEFINES", "PIC", "PICTURE", "OCCURS", "VALUE", "USAGE"):
+            name = "FILLER"
+
+        if level in (1, 77):
+            self._level_stack = []
+        while self._level_stack and (
+            (level != 88 and self.index.data_items[self._level_stack[-1]]["level"] >= level)
+            or self.index.data_items[self._level_stack[-1]]["level"] == 88
+        ):
+            self._level_stack.pop()
+        parent = self._level_stack[-1] if self._level_stack and level not in (1, 77) else None
+
+        redefines = REDEFINES_CLAUSE.search(entry["text"])
+        occurs = OCCURS_CLAUSE.search(entry["text"])
+        picture = PICTURE_CLAUSE.search(entry["text"])
+        usage = USAGE_CLAUSE.search(entry["text"])
+        value = VALUE_CLAUSE.search(entry["text"])
+        item = {
+            "level": level,
+            "name": name if name != "FILLER" else None,
+            "parent": parent,
+            "section": self._section,
+            "file": self._current_file if level in (1, 77) or parent is not None else None,
+            "picture": picture.group(1).upper() if picture else None,
+            "usage": usage.group(1).upper() if usage else None,
+            "redefines": redefines.group(1).upper() if redefines else None,
+            "value": value.group(1) if value else None,
+            "occurs": {
+                "min": int(occurs.group(1)),
+                "max": int(occurs.group(2) or occurs.group(1)),
+                "dependingOn": occurs.group(3).upper() if occurs.group(3) else None
+            } if occurs else None,
+            "start": entry["start"],
+            "end": line_number
+        }
+        self.index.data_items.append(item)
+        position = len(self.index.data_items) - 1
+        self._level_stack.append(position)
+
+        # Widen every enclosing item so record text spans its children
+        ancestor = parent
+        while ancestor is not None:
+            self.index.data_items[ancestor]["end"] = line_number
+            ancestor = self.index.data_items[ancestor]["parent"]
+        if level == 1 and self._current_file and item["name"]:
+            self.index.files[self._current_file]["records"].append(item["name"])
+
+    def _feed_procedure(self, text, area_a, line_number):
+        section = SECTION_HEADER.match(text)
+        paragraph = PARAGRAPH_HEADER.match(text)
+        if section and (area_a or not self.fixed_format):
+            self._close_paragraph(line_number)
+            self._section = section.group(1).upper()
+            self.index.sections.append({"name": self._section, "division": "PROCEDURE", "start": line_number})
+            self._open_paragraph(self._section, line_number, is_section=True)
+            return
+        if (paragraph and paragraph.group(1).upper() not in NON_PARAGRAPH_WORDS
+                and (area_a if self.fixed_format else text.rstrip() == paragraph.group(0).rstrip())):
+            self._close_paragraph(line_number)
+            self._open_paragraph(paragraph.group(1).upper(), line_number)
+            text = text[paragraph.end():]
+
+        if self._paragraph is None:
+            # Statements directly after the PROCEDURE DIVISION header
+            self._open_paragraph("(PROCEDURE-ENTRY)", line_number)
+        for match in PERFORM_TARGET.finditer(text):
+            target = match.group(1).upper()
+            if target in INLINE_PERFORM_WORDS or target.isdigit():
+                continue
+            end = match.group(2).upper() if match.group(2) else None
+            self._paragraph["performs"].append((target, end))
+        for match in GO_TO_TARGETS.finditer(text):
+            self._paragraph["gotos"].extend(name.upper() for name in match.group(1).split())
+
+    def _open_paragraph(self, name, line_number, is_section=False):
+        self._paragraph = {
+            "name": name,
+            "section": self._section,
+            "isSection": is_section,
+            "start": line_number,
+            "end": None,
+            "performs": [],
+            "gotos": []
+        }
+        self.index.paragraphs.append(self._paragraph)
+
+    def _close_paragraph(self, line_number):
+        if self._paragraph is not None:
+            self._paragraph["end"] = line_number
+            self._paragraph = None
+
+    def finish(self):
+        """Finish parsing and return the index"""
+        end = len(self.index.lines)
+        self._finish_entry(end)
+        self._close_paragraph(end)
+        return self.index
+
+
+def parse_cobol(source_code):
+    """
+    Parses a COBOL program into a structural index.
+
+    Args:
+        source_code (str): The COBOL program
+
+    Returns:
+        CobolIndex: Divisions, sections, paragraphs with PERFORM/GO TO edges,
+        data items, file descriptors and EXEC SQL blocks
+    """
+    lines = source_code.splitlines(keepends=True)
+    parser = CobolParser(fixed_format=is_fixed_format(lines))
+    for line in lines:
+        parser.feed(line)
+    return parser.finish()
+
+
+def _crossing_edges(index):
+    """Count the call-graph edges that cross each boundary between consecutive paragraphs"""
+    positions = {name: i for i, name in enumerate(index.paragraph_names())}
+    crossing = [0] * len(index.paragraphs)
+    for source, targets in index.call_graph().items():
+        for target in targets:
+            low, high = sorted((positions[source], positions[target]))
+            for boundary in range(low, high):
+                crossing[boundary] += 1
+    for i, paragraph in enumerate(index.paragraphs):
+        # Never separate a section header from the paragraphs that follow it
+        if paragraph["isSection"] and not index.text(paragraph["start"] + 1, paragraph["end"]).strip():
+            crossing[i] += len(index.paragraphs)
+    return crossing
+
+
+def chunk_by_call_graph(index, token_budget, anchors=None):
+    """
+    Splits a parsed program into chunks cut along call-graph boundaries.
+
+    Paragraphs stay in program order. When a chunk is full, the cut goes at the
+    boundary crossed by the fewest PERFORM/GO TO edges in its second half. Each
+    procedure chunk carries only the records its paragraphs reference.
+
+    Anchors keep the chunk boundaries of an earlier version of the program: a
+    chunk always starts at an anchor paragraph, so an edit only changes the
+    chunks that contain it.
+
+    Args:
+        index (CobolIndex): The parsed program
+        token_budget (int): Maximum tokens per chunk, including its data context
+        anchors (set): Optional names of paragraphs that must start a chunk
+
+    Returns:
+        list: Chunk dicts with 'type', 'content', 'tokens' and, for procedures,
+        'paragraphs', 'dataItems' and 'dataContext'
+    """
+    procedure_start = index.procedure_start if index.procedure_start is not None else len(index.lines)
+    chunks = []
+    declarations = index.text(0, procedure_start)
+    if declarations.strip():
+        chunks.extend(pack_units(split_units(declarations, False), token_budget, "declarations"))
+
+    paragraphs = list(index.paragraphs)
+    if not paragraphs:
+        procedures = index.text(procedure_start, len(index.lines))
+        if procedures.strip():
+            chunks.extend(pack_units(split_units(procedures, True), token_budget, "procedures"))
+        return chunks
+
+    # Keep the PROCEDURE DIVISION header (and USING clause) with the first paragraph
+    paragraphs[0] = dict(paragraphs[0], start=min(paragraphs[0]["start"], procedure_start))
+    texts = [index.text(paragraph["start"], paragraph["end"]) for paragraph in paragraphs]
+    tokens = [count_tokens(text) for text in texts]
+    records = [index.referenced_records(text) for text in texts]
+    record_tokens = {}
+    crossing = _crossing_edges(index)
+
+    def context_tokens(names):
+        total = 0
+        for name in names:
+            if name not in record_tokens:
+                record_tokens[name] = count_tokens(index.record_text(name))
+            total += record_tokens[name]
+        return total
+
+    def make_chunk(start, end):
+        ordered, context = index.data_context(set().union(*records[start:end]))
+        content = "".join(texts[start:end])
+        return {
+            "type": "procedures",
+            "content": content,
+            "paragraphs": [paragraph["name"] for paragraph in paragraphs[start:end]],
+            "dataItems": ordered,
+            "dataContext": context,
+            "tokens": count_tokens(content) + count_tokens(context)
+        }
+
+    start = 0
+    while start < len(paragraphs):
+        end = start
+        names = set()
+        size = 0
+        anchored = False
+        while end < len(paragraphs):
+            if end > start and anchors and paragraphs[end]["name"] in anchors:
+                anchored = True
+                break
+            candidate_names = names | records[end]
+            candidate_size = size + tokens[end]
+            if end > start and candidate_size + context_tokens(candidate_names) > token_budget:
+                break
+            names, size = candidate_names, candidate_size
+            end += 1
+
+        if end == start + 1 and size + context_tokens(names) > token_budget:
+            # One paragraph is larger than the budget on its own
+            context = make_chunk(start, end)
+            for piece in split_oversized_unit(texts[start], max(200, token_budget - context_tokens(names))):
+                chunks.append(dict(context, content=piece, tokens=count_tokens(piece) + context_tokens(names)))
+            start = end
+            continue
+
+        if end < len(paragraphs) and not anchored:
+            # Prefer the boundary with the fewest crossing edges in the second half of the chunk
+            half = size / 2
+            running = 0
+            best = end
+            for boundary in range(start, end):
+                running += tokens[boundary]
+                if running >= half and crossing[boundary] < crossing[best - 1]:
+                    best = boundary + 1
+            end = best
+
+        chunks.append(make_chunk(start, end))
+        start = end
+
+    logger.info(f"Split program into {len(chunks)} chunks along call-graph boundaries "
+                f"(budget {token_budget} tokens)")
+    return chunks
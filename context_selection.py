@@ -0,0 +1,195 @@
+"""
+Module for selecting the requirement and definition context relevant to each conversion chunk.
+"""
+import json
+import logging
+import re
+
+from token_chunker import count_tokens
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"[A-Z0-9][A-Z0-9-]*", re.IGNORECASE)
+ITEM_START = re.compile(r"^\s*(?:\d+[.)]|[-*•]|#{1,6}|[A-Z]{1,3}\d+[:.)])\s+")
+VSAM_BLOCK_START = re.compile(r"^\s*(?:01\s|DEFINE\s+CLUSTER|RECORD\b|[A-Z0-9-]+\s*:)", re.IGNORECASE)
+EXEC_SQL = re.compile(r"\bEXEC\s+SQL\b", re.IGNORECASE)
+
+# COBOL words that say nothing about which part of a program a requirement talks about
+COBOL_KEYWORDS = {
+    "ACCEPT", "ADD", "AFTER", "ALSO", "AND", "ASSIGN", "AT", "BY", "CALL", "CLOSE", "COMP", "COMP-3",
+    "COMPUTE", "COPY", "DATA", "DISPLAY", "DIVIDE", "DIVISION", "ELSE", "END", "END-IF", "END-PERFORM",
+    "EVALUATE", "EXEC", "END-EXEC", "EXIT", "FD", "FILE", "FILLER", "FROM", "GIVING", "GO", "GOBACK",
+    "IF", "INPUT", "INTO", "IS", "MOVE", "MULTIPLY", "NOT", "OCCURS", "OF", "OPEN", "OR", "OUTPUT",
+    "PERFORM", "PIC", "PICTURE", "PROCEDURE", "READ", "REDEFINES", "RUN", "SECTION", "SELECT", "SET",
+    "SQL", "STOP", "SUBTRACT", "THEN", "THRU", "TIMES", "TO", "UNTIL", "USING", "VALUE", "VARYING",
+    "WHEN", "WITH", "WORKING-STORAGE", "WRITE", "ZERO", "ZEROS", "SPACES", "TRUE", "FALSE",
+}
+
+
+def program_symbols(text):
+    """Return the program-specific identifiers used in COBOL text"""
+    symbols = set()
+    for word in WORD.findall(text):
+        word = word.upper().strip("-")
+        if len(word) >= 3 and not word.isdigit() and word not in COBOL_KEYWORDS:
+            symbols.add(word)
+    return symbols
+
+
+def _symbol_pattern(symbol):
+    """Match a COBOL name in prose, also in its snake_case and camelCase spellings"""
+    parts = [re.escape(part) for part in symbol.lower().split("-") if part]
+    return re.compile(r"(?<![a-z0-9])" + r"[-_ ]?".join(parts) + r"(?![a-z0-9])")
+
+
+def _mentions(text, symbols, patterns):
+    lowered = text.lower()
+    return {symbol for symbol in symbols if patterns[symbol].search(lowered)}
+
+
+def split_requirement_items(requirements):
+    """
+    Splits requirements into independent items.
+
+    JSON requirements are flattened to one item per leaf value; plain text is
+    split at numbered items, bullets and headings.
+
+    Args:
+        requirements (str|dict|list): Requirements as received by the convert endpoint
+
+    Returns:
+        list: Requirement items as strings, in their original order
+    """
+    if not requirements:
+        return []
+    if isinstance(requirements, str) and requirements.strip()[:1] in ("{", "["):
+        try:
+            requirements = json.loads(requirements)
+        except json.JSONDecodeError:
+            pass
+
+    if isinstance(requirements, (dict, list)):
+        items = []
+
+        def flatten(value, path):
+            if isinstance(value, dict):
+                if "description" in value:
+                    # A requirement object such as {"id": "TR1", "description": ...}
+                    items.append(json.dumps(value, ensure_ascii=False))
+                    return
+                for key, child in value.items():
+                    flatten(child, path + [str(key)])
+            elif isinstance(value, list):
+                for child in value:
+                    flatten(child, path)
+            else:
+                items.append(f"{' > '.join(path)}: {value}" if path else str(value))
+
+        flatten(requirements, [])
+        return items
+
+    items = []
+    current = []
+    for line in str(requirements).splitlines():
+        if current and ITEM_START.match(line):
+            items.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        items.append("\n".join(current))
+    return [item for item in items if item.strip()]
+
+
+def split_vsam_blocks(vsam_definition):
+    """Split a VSAM definition into record layouts / cluster definitions"""
+    blocks = []
+    current = []
+    for line in vsam_definition.splitlines():
+        if current and VSAM_BLOCK_START.match(line):
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def select_items(items, chunk_symbols, all_symbols, patterns, keep_first=True):
+    """
+    Keeps items that mention the chunk's symbols or no program symbol at all.
+
+    Items that only talk about other parts of the program are dropped. The
+    first item (usually a title or overview) is always kept.
+    """
+    selected = []
+    for position, item in enumerate(items):
+        mentioned = _mentions(item, all_symbols, patterns)
+        if (keep_first and position == 0) or not mentioned or mentioned & chunk_symbols:
+            selected.append(item)
+    return selected
+
+
+def select_chunk_contexts(chunks, business_requirements, technical_requirements, db_setup_template, vsam_definition):
+    """
+    Builds a pruned context for each conversion chunk.
+
+    Args:
+        chunks (list): Chunks as produced by the COBOL chunkers (dicts with 'content')
+        business_requirements (str|dict): Business requirements for the program
+        technical_requirements (str|dict): Technical requirements for the program
+        db_setup_template (str): Database setup template for the target language
+        vsam_definition (str): VSAM definition for the program
+
+    Returns:
+        tuple: (contexts, report). contexts has one dict per chunk with
+        'businessRequirements', 'technicalRequirements', 'dbSetupTemplate' and
+        'vsamDefinition'. report gives full and pruned context token counts.
+    """
+    texts = [
+        (chunk.get("content", "") + chunk.get("dataContext", "")) if isinstance(chunk, dict) else chunk
+        for chunk in chunks
+    ]
+    chunk_symbols = [program_symbols(text) for text in texts]
+    all_symbols = set().union(*chunk_symbols) if chunk_symbols else set()
+    patterns = {symbol: _symbol_pattern(symbol) for symbol in all_symbols}
+
+    business_items = split_requirement_items(business_requirements)
+    technical_items = split_requirement_items(technical_requirements)
+    vsam_blocks = split_vsam_blocks(vsam_definition) if vsam_definition else []
+    sql_chunks = [i for i, text in enumerate(texts) if EXEC_SQL.search(text)]
+    # DB setup belongs with the SQL; without embedded SQL it goes with the first chunk only
+    db_chunks = set(sql_chunks) if sql_chunks else {0}
+
+    def as_text(value):
+        return value if isinstance(value, str) else json.dumps(value, indent=2)
+
+    full_tokens = count_tokens(
+        as_text(business_requirements or "") + as_text(technical_requirements or "") +
+        (db_setup_template or "") + (vsam_definition or "")
+    )
+
+    contexts = []
+    per_chunk = []
+    for i, symbols in enumerate(chunk_symbols):
+        context = {
+            "businessRequirements": "\n".join(select_items(business_items, symbols, all_symbols, patterns)),
+            "technicalRequirements": "\n".join(select_items(technical_items, symbols, all_symbols, patterns)),
+            "dbSetupTemplate": db_setup_template if i in db_chunks else "",
+            "vsamDefinition": "\n".join(select_items(vsam_blocks, symbols, all_symbols, patterns, keep_first=False))
+        }
+        pruned_tokens = sum(count_tokens(value) for value in context.values())
+        contexts.append(context)
+        per_chunk.append({
+            "chunkIndex": i,
+            "contextTokens": pruned_tokens,
+            "tokensSaved": max(0, full_tokens - pruned_tokens)
+        })
+
+    report = {
+        "fullContextTokensPerChunk": full_tokens,
+        "contextTokensSent": sum(entry["contextTokens"] for entry in per_chunk),
+        "tokensSaved": sum(entry["tokensSaved"] for entry in per_chunk),
+        "perChunk": per_chunk
+    }
+    logger.info(f"Context pruning saved {report['tokensSaved']} prompt tokens across {len(chunks)} chunks")
+    return contexts, report
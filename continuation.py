@@ -0,0 +1,164 @@
+"""
+Module for continuing model replies that were cut off before they were complete.
+"""
+import logging
+
+from token_chunker import CHARS_PER_TOKEN, count_tokens
+
+logger = logging.getLogger(__name__)
+
+CONTINUATION_INSTRUCTION = (
+    "Your previous reply was cut off. Continue it from exactly the next character. "
+    "Do not repeat anything, do not add any preamble or markdown fence, so that your previous "
+    "reply followed by this one forms the complete response."
+)
+
+# Longest overlap looked for when the model repeats the end of its previous reply
+MAX_OVERLAP = 200
+# Shorter matches are more likely coincidence than repetition
+MIN_OVERLAP = 8
+
+OMITTED_MARKER = "[... earlier part of this reply omitted ...]\n"
+
+# Replies that stopped before they were complete: cut off by max_tokens, or a stream that broke off.
+# Others, such as 'stop' or 'content_filter', are not continued even when their JSON is invalid.
+CONTINUED_FINISH_REASONS = ("length", "interrupted")
+
+
+def trim_partial_reply(partial_reply, context_tokens):
+    """Keep only the end of a reply that fits in context_tokens, starting at a line break when possible"""
+    if not context_tokens or count_tokens(partial_reply) <= context_tokens:
+        return partial_reply
+    tail = partial_reply[-int(context_tokens * CHARS_PER_TOKEN):]
+    newline = tail.find("\n")
+    if 0 <= newline < len(tail) // 2:
+        tail = tail[newline + 1:]
+    return OMITTED_MARKER + tail
+
+
+def continuation_messages(messages, partial_reply, context_tokens=None):
+    """
+    Builds the messages that ask the model to continue a cut-off reply.
+
+    The original request is repeated so the model knows what it was doing, but
+    only the end of its partial reply is sent back: that is all it needs to
+    pick up at the next character, and it keeps long replies from filling the
+    context window on every continuation.
+
+    Args:
+        messages (list): The messages of the original request
+        partial_reply (str): Everything the model has replied so far
+        context_tokens (int): Optional limit on the tokens of the partial reply sent back
+
+    Returns:
+        list: The messages for the continuation request
+    """
+    return list(messages) + [
+        {"role": "assistant", "content": trim_partial_reply(partial_reply, context_tokens)},
+        {"role": "user", "content": CONTINUATION_INSTRUCTION}
+    ]
+
+
+def _overlap(previous, continuation):
+    """
+    Length of the suffix of previous that the continuation repeats.
+
+    Repetitive text such as generated field declarations can match at several
+    lengths; the repetition is then ambiguous and nothing is dropped.
+    """
+    longest = min(len(previous), len(continuation), MAX_OVERLAP)
+    sizes = [size for size in range(longest, MIN_OVERLAP - 1, -1) if previous.endswith(continuation[:size])]
+    return sizes[0] if len(sizes) == 1 else 0
+
+
+class ContinuationStitcher:
+    """
+    Joins a streamed continuation onto the reply it continues.
+
+    The first characters of the continuation are held back until it is clear
+    whether the model repeated the end of its previous reply; the repeated
+    part, and any leading markdown fence, is dropped.
+    """
+
+    def __init__(self, previous):
+        self.previous = previous
+        self._pending = []
+        self._pending_size = 0
+        self._resolved = False
+
+    def feed(self, text):
+        """Return the part of the new text that should be appended to the reply"""
+        if self._resolved:
+            return text
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size < MAX_OVERLAP:
+            return ""
+        return self._resolve()
+
+    def flush(self):
+        """Return whatever is still held back once the continuation has ended"""
+        return "" if self._resolved else self._resolve()
+
+    def _resolve(self):
+        self._resolved = True
+        text = "".join(self._pending)
+        self._pending = []
+        if text.lstrip().startswith("```"):
+            stripped = text.lstrip()
+            newline = stripped.find("\n")
+            text = stripped[newline + 1:] if newline >= 0 else ""
+        size = _overlap(self.previous, text)
+        if size:
+            logger.info(f"Dropped {size} repeated characters from a continuation")
+        return text[size:]
+
+
+def stitch_continuation(previous, continuation):
+    """Append a complete continuation to the reply it continues"""
+    stitcher = ContinuationStitcher(previous)
+    return previous + stitcher.feed(continuation) + stitcher.flush()
+
+
+def complete_reply(send, messages, max_continuations=3, context_tokens=None, on_text=None, label="Reply"):
+    """
+    Sends a request and continues its reply for as long as it stopped before it was complete.
+
+    Args:
+        send (callable): Called as send(messages, is_continuation, on_text) and returns (content, finish_reason);
+            a streaming send passes text to on_text as it arrives, others may ignore on_text
+        messages (list): The messages of the request
+        max_continuations (int): Maximum number of continuation requests
+        context_tokens (int): Optional limit on the partial-reply tokens sent with each continuation
+        on_text (callable): Optional callback, called with the text of the stitched reply as it streams in
+        label (str): Name of the request in log messages
+
+    Returns:
+        tuple: (content, finish_reason, continuations)
+    """
+    content, finish_reason = send(messages, False, on_text)
+    continuations = 0
+    while finish_reason in CONTINUED_FINISH_REASONS and continuations < max_continuations:
+        continuations += 1
+        logger.warning(f"{label} stopped early (finish_reason={finish_reason}), "
+                       f"requesting continuation {continuations}/{max_continuations}")
+        request_messages = continuation_messages(messages, content, context_tokens)
+        if on_text is None:
+            piece, finish_reason = send(request_messages, True, None)
+            content = stitch_continuation(content, piece)
+            continue
+        stitcher = ContinuationStitcher(content)
+        pieces = []
+
+        def on_piece(text):
+            text = stitcher.feed(text)
+            pieces.append(text)
+            on_text(text)
+
+        _, finish_reason = send(request_messages, True, on_piece)
+        remainder = stitcher.flush()
+        on_text(remainder)
+        content += "".join(pieces) + remainder
+    if finish_reason in CONTINUED_FINISH_REASONS:
+        logger.error(f"{label} still incomplete after {max_continuations} continuations")
+    return content, finish_reason, continuations
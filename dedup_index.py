@@ -0,0 +1,361 @@
+"""
+Module for reusing the conversion of COBOL fragments that are equivalent up to naming.
+
+Fragments are canonicalised (sequence area, comments, spacing and case
+removed, program-specific names replaced by positional placeholders) and
+fingerprinted. A fragment whose fingerprint has been converted before reuses
+that conversion, with the earlier fragment's names mapped onto its own.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from token_chunker import _code_area, _is_comment, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Single-word names shorter than this (I, X, IDX) are spelled like loop variables and keywords in
+# converted code, so they cannot be renamed there without renaming unrelated code too
+MIN_REMAP_LENGTH = 4
+
+# A PICTURE clause is one token: its symbols (9, V99, X, S9...) fix the item's type, size and scale
+TOKEN = re.compile(
+    r"\bPIC(?:TURE)?(?:\s+IS)?\s+\S+?(?=\.?(?:\s|$))|'[^']*'|\"[^\"]*\"|[A-Z0-9][A-Z0-9-]*|\S",
+    re.IGNORECASE
+)
+
+# Reserved words keep their spelling in canonical text, so only program-specific names are renamed
+COBOL_RESERVED_WORDS = set("""
+ACCEPT ACCESS ADD ADDRESS ADVANCING AFTER ALL ALPHABETIC ALPHANUMERIC ALSO ALTER AND ANY ARE AREA AREAS
+ASCENDING ASSIGN AT AUTHOR BEFORE BINARY BLANK BLOCK BOTTOM BY CALL CANCEL CHARACTER CHARACTERS CLOSE
+CODE COLLATING COMMA COMP COMP-1 COMP-2 COMP-3 COMP-4 COMP-5 COMPUTATIONAL COMPUTATIONAL-3 COMPUTE
+CONFIGURATION CONTAINS CONTENT CONTINUE CONVERTING COPY CORR CORRESPONDING COUNT CURRENCY DATA DATE
+DAY DAY-OF-WEEK DECIMAL-POINT DECLARATIVES DELETE DELIMITED DELIMITER DEPENDING DESCENDING DISPLAY
+DIVIDE DIVISION DOWN DUPLICATES DYNAMIC ELSE END END-ADD END-CALL END-COMPUTE END-DELETE END-DIVIDE
+END-EVALUATE END-EXEC END-IF END-MULTIPLY END-OF-PAGE END-PERFORM END-READ END-RETURN END-REWRITE
+END-SEARCH END-START END-STRING END-SUBTRACT END-UNSTRING END-WRITE ENVIRONMENT EOP EQUAL ERROR
+EVALUATE EXCEPTION EXEC EXIT EXTEND EXTERNAL FALSE FD FILE FILE-CONTROL FILLER FIRST FOR FROM FUNCTION
+GIVING GLOBAL GO GOBACK GREATER HIGH-VALUE HIGH-VALUES I-O I-O-CONTROL IDENTIFICATION IF IN INDEX
+INDEXED INITIAL INITIALIZE INPUT INPUT-OUTPUT INSPECT INTO INVALID IS JUST JUSTIFIED KEY LABEL LEADING
+LEFT LENGTH LESS LINE LINES LINKAGE LOCAL-STORAGE LOW-VALUE LOW-VALUES MERGE MODE MOVE MULTIPLY NEGATIVE
+NEXT NO NOT NULL NULLS NUMERIC OCCURS OF OFF OMITTED ON OPEN OPTIONAL OR ORDER ORGANIZATION OTHER
+OUTPUT OVERFLOW PACKED-DECIMAL PADDING PAGE PERFORM PIC PICTURE POINTER POSITIVE PROCEDURE PROGRAM
+PROGRAM-ID QUOTE QUOTES RANDOM READ RECORD RECORDS REDEFINES REFERENCE RELATIVE RELEASE REMAINDER
+REPLACING RETURN RETURNING REWRITE RIGHT ROUNDED RUN SD SEARCH SECTION SECURITY SELECT SENTENCE
+SEPARATE SEQUENTIAL SET SIGN SIZE SORT SOURCE-COMPUTER SPACE SPACES SQL STANDARD START STATUS STOP
+STRING SUBTRACT SUPPRESS SYNC SYNCHRONIZED TALLYING TEST THAN THEN THROUGH THRU TIME TIMES TO TOP
+TRAILING TRUE UNSTRING UNTIL UP UPON USAGE USING VALUE VALUES VARYING WHEN WITH WORKING-STORAGE WRITE
+ZERO ZEROES ZEROS SELECT INSERT UPDATE WHERE SQLCA SQLCODE INCLUDE DECLARE CURSOR FETCH
+""".split())
+
+
+def canonicalize(*texts):
+    """
+    Canonicalises COBOL text for fingerprinting.
+
+    Sequence numbers, indicator and identification areas, comment lines,
+    spacing and letter case are dropped; program-specific names are replaced
+    by placeholders numbered in order of first appearance. Numbering runs
+    across all texts, so a paragraph and its data context share placeholders.
+    PICTURE clauses and intrinsic FUNCTION names are kept as written, since
+    they are not names but decide what the converted code does.
+
+    Args:
+        *texts (str): COBOL fragments
+
+    Returns:
+        tuple: (list of canonical texts, list of the original names in placeholder order)
+    """
+    identifiers = []
+    positions = {}
+    canonical = []
+    for text in texts:
+        tokens = []
+        for line in text.splitlines():
+            if _is_comment(line) or line.lstrip().startswith("*>"):
+                continue
+            for token in TOKEN.findall(_code_area(line)):
+                upper = token.upper()
+                if token[0] in "'\"":
+                    tokens.append(token)
+                    continue
+                picture = upper.startswith("PIC") and " " in token
+                function_name = bool(tokens) and tokens[-1] == "FUNCTION"
+                if picture or function_name or upper in COBOL_RESERVED_WORDS or not re.search(r"[A-Z]", upper):
+                    tokens.append(" ".join(upper.split()))
+                    continue
+                if upper not in positions:
+                    positions[upper] = len(identifiers)
+                    identifiers.append(upper)
+                tokens.append(f"#{positions[upper]}")
+        canonical.append(" ".join(tokens))
+    return canonical, identifiers
+
+
+def fragment_fingerprint(code, data_context="", chunk_type="procedures", target_language="", template_version=""):
+    """
+    Fingerprints a conversion fragment.
+
+    Args:
+        code (str): The COBOL fragment to convert
+        data_context (str): Record definitions sent with the fragment
+        chunk_type (str): 'declarations' or 'procedures'
+        target_language (str): The target programming language
+        template_version (str): Version of the prompt templates conversions are made with
+
+    Returns:
+        tuple: (SHA-256 hex digest, list of the fragment's names in placeholder order)
+    """
+    (canonical_code, canonical_context), identifiers = canonicalize(code, data_context)
+    payload = json.dumps([template_version, target_language.upper(), chunk_type, canonical_code, canonical_context])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest(), identifiers
+
+
+def _spellings(name):
+    """The ways a COBOL name is usually written in converted Java or C# code"""
+    parts = [part for part in name.lower().split("-") if part]
+    if not parts:
+        return {}
+    return {
+        "cobol": name.upper(),
+        "camel": parts[0] + "".join(part.capitalize() for part in parts[1:]),
+        "pascal": "".join(part.capitalize() for part in parts),
+        "snake": "_".join(parts),
+        "constant": "_".join(parts).upper(),
+    }
+
+
+def _spelling_pattern(style, spelling):
+    escaped = re.escape(spelling)
+    if style == "pascal":
+        # Also matches after a lower-case prefix, as in getCustomerId or setCustomerId
+        return rf"(?<![A-Z0-9_]){escaped}(?![a-z0-9_])"
+    if style == "camel":
+        return rf"(?<![A-Za-z0-9_]){escaped}(?![a-z0-9_])"
+    return rf"(?<![A-Za-z0-9_-]){escaped}(?![A-Za-z0-9_-])"
+
+
+def is_distinctive(name):
+    """Whether a COBOL name's spellings in converted code are unlikely to be anything else"""
+    parts = [part for part in name.split("-") if part]
+    return len(parts) > 1 or len(name) >= MIN_REMAP_LENGTH
+
+
+def can_remap(source_identifiers, target_identifiers):
+    """Whether every name that differs between two equivalent fragments can be renamed safely"""
+    return all(
+        old == new or (is_distinctive(old) and is_distinctive(new))
+        for old, new in zip(source_identifiers, target_identifiers)
+    )
+
+
+def remap_identifiers(text, source_identifiers, target_identifiers):
+    """
+    Renames the names of one fragment to those of an equivalent fragment in converted text.
+
+    Each COBOL name is replaced in its COBOL, camelCase, PascalCase,
+    snake_case and CONSTANT_CASE spellings, in a single pass so renamed names
+    are never renamed again. Callers check can_remap first: short names such
+    as I or X would also rename unrelated locals and keywords.
+
+    Args:
+        text (str): Converted code or notes of the source fragment
+        source_identifiers (list): Names of the fragment that was converted
+        target_identifiers (list): Names of the equivalent fragment, in the same placeholder order
+
+    Returns:
+        str: The text with the target fragment's names
+    """
+    replacements = {}
+    for old, new in zip(source_identifiers, target_identifiers):
+        if old == new:
+            continue
+        old_spellings = _spellings(old)
+        new_spellings = _spellings(new)
+        for style, spelling in old_spellings.items():
+            replacements.setdefault((style, spelling), new_spellings[style])
+    if not text or not replacements:
+        return text
+
+    ordered = sorted(replacements, key=lambda key: -len(key[1]))
+    pattern = re.compile("|".join(f"(?P<r{i}>{_spelling_pattern(style, spelling)})"
+                                  for i, (style, spelling) in enumerate(ordered)))
+    return pattern.sub(lambda match: replacements[ordered[int(match.lastgroup[1:])]], text)
+
+
+def remap_result(result, source_identifiers, target_identifiers):
+    """Apply remap_identifiers to every string (also inside lists) of a conversion result"""
+    def remap(value):
+        if isinstance(value, str):
+            return remap_identifiers(value, source_identifiers, target_identifiers)
+        if isinstance(value, list):
+            return [remap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: remap(item) for key, item in value.items()}
+        return value
+    return remap(result)
+
+
+class DedupIndex:
+    """
+    Persistent index of converted fragments keyed by fingerprint.
+
+    It also remembers which programs each fragment fingerprint was seen in, so
+    fragments shared between programs can be converted on their own and reused.
+    """
+
+    def __init__(self, path, min_tokens=60):
+        """
+        Args:
+            path (str): Path of the SQLite database file
+            min_tokens (int): Smallest paragraph worth converting on its own; smaller
+                paragraphs such as EXIT paragraphs stay with their neighbours
+        """
+        self.path = path
+        self.min_tokens = min_tokens
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fragments ("
+            "fingerprint TEXT PRIMARY KEY, identifiers TEXT NOT NULL, result TEXT NOT NULL, "
+            "hits INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sightings ("
+            "fingerprint TEXT NOT NULL, source_id TEXT NOT NULL, PRIMARY KEY (fingerprint, source_id))"
+        )
+        self._conn.commit()
+
+    def lookup(self, fingerprint, identifiers):
+        """Return the stored conversion remapped to identifiers, or None if there is none or it cannot be remapped"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT identifiers, result FROM fragments WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is None or not can_remap(json.loads(row[0]), identifiers):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE fragments SET hits = hits + 1 WHERE fingerprint = ?", (fingerprint,))
+            self._conn.commit()
+        return remap_result(json.loads(row[1]), json.loads(row[0]), identifiers)
+
+    def store(self, fingerprint, identifiers, result):
+        """Store the conversion of a fragment unless an equivalent one is already stored"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO fragments (fingerprint, identifiers, result, created_at) VALUES (?, ?, ?, ?)",
+                (fingerprint, json.dumps(identifiers), json.dumps(result), time.time())
+            )
+            self._conn.commit()
+
+    def shared_fingerprints(self, fingerprints, source_id):
+        """
+        Returns the fingerprints worth converting on their own: those already
+        converted, and those seen in another program.
+        """
+        fingerprints = list(set(fingerprints))
+        shared = set()
+        with self._lock:
+            for start in range(0, len(fingerprints), 500):
+                batch = fingerprints[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                shared.update(row[0] for row in self._conn.execute(
+                    f"SELECT fingerprint FROM fragments WHERE fingerprint IN ({marks})", batch
+                ))
+                shared.update(row[0] for row in self._conn.execute(
+                    f"SELECT fingerprint FROM sightings WHERE fingerprint IN ({marks}) AND source_id != ?",
+                    batch + [source_id]
+                ))
+        return shared
+
+    def record_sightings(self, fingerprints, source_id):
+        """Remember that a program contains these fragment fingerprints"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sightings (fingerprint, source_id) VALUES (?, ?)",
+                [(fingerprint, source_id) for fingerprint in set(fingerprints)]
+            )
+            self._conn.commit()
+
+    def isolation_anchors(self, index, target_language, source_id, template_version=""):
+        """
+        Returns the paragraphs to cut around so shared paragraphs become chunks of their own.
+
+        A paragraph is shared when its fingerprint was already converted or was
+        seen in another program. Cutting before it and before the paragraph
+        after it gives it a chunk whose fingerprint matches the other copies.
+        Copies that only repeat within this program are not isolated: cutting
+        for them costs extra requests before anything can be reused. The
+        program's paragraph fingerprints are recorded so later programs can
+        find what they share with it.
+
+        Args:
+            index (CobolIndex): The parsed program
+            target_language (str): The target programming language
+            source_id (str): The program's sourceId
+            template_version (str): Version of the prompt templates conversions are made with
+
+        Returns:
+            set: Names of paragraphs that must start a chunk
+        """
+        paragraphs = index.paragraphs
+        fingerprints = []
+        for i, paragraph in enumerate(paragraphs):
+            start = paragraph["start"]
+            if i == 0 and index.procedure_start is not None:
+                # The first chunk carries the PROCEDURE DIVISION header, see chunk_by_call_graph
+                start = min(start, index.procedure_start)
+            text = index.text(start, paragraph["end"])
+            if count_tokens(text) < self.min_tokens:
+                fingerprints.append(None)
+                continue
+            _, context = index.data_context(index.referenced_records(text))
+            fingerprints.append(fragment_fingerprint(text, context, "procedures", target_language, template_version)[0])
+
+        known = [fingerprint for fingerprint in fingerprints if fingerprint]
+        shared = self.shared_fingerprints(known, source_id)
+        self.record_sightings(known, source_id)
+
+        anchors = set()
+        for i, fingerprint in enumerate(fingerprints):
+            if fingerprint in shared:
+                anchors.add(paragraphs[i]["name"])
+                if i + 1 < len(paragraphs):
+                    anchors.add(paragraphs[i + 1]["name"])
+        if anchors:
+            logger.info(f"Isolating {len(anchors)} shared paragraph boundaries for fragment reuse")
+        return anchors
+
+    def stats(self):
+        with self._lock:
+            fragments = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM fragments").fetchone()
+        return {"fragments": fragments[0], "totalHits": fragments[1], "hits": self.hits, "misses": self.misses}
+
+
+def create_dedup_index_from_env():
+    """
+    Creates the fragment index configured by environment variables.
+
+    DEDUP_ENABLED=false turns deduplication off, DEDUP_INDEX_PATH sets the
+    database file and DEDUP_MIN_TOKENS the smallest paragraph isolated for reuse.
+
+    Returns:
+        DedupIndex: The index, or None when deduplication is disabled
+    """
+    if os.environ.get("DEDUP_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        logger.info("Fragment deduplication disabled")
+        return None
+    return DedupIndex(
+        os.environ.get("DEDUP_INDEX_PATH", os.path.join("data", "dedup.sqlite3")),
+        min_tokens=int(os.environ.get("DEDUP_MIN_TOKENS", 60))
+    )
@@ -0,0 +1,330 @@
+"""
+Module for spreading chat completion requests over a pool of Azure OpenAI deployments.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from llm_client import AIMDLimiter, RateLimitedClient, create_http_client, get_status_code, is_retryable
+from tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_VERSION = "2023-05-15"
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half-open"
+
+
+class NoHealthyDeployment(Exception):
+    """Raised when every deployment in the pool is failing or has its circuit open"""
+
+
+class StreamInterrupted(Exception):
+    """
+    Raised when a streamed reply fails after part of it was delivered.
+
+    The delivered text cannot be taken back, so the caller continues the reply
+    from where it stopped instead of the pool sending the request again.
+    """
+
+    def __init__(self, error):
+        super().__init__(f"Stream interrupted: {error}")
+        self.error = error
+
+
+class Deployment:
+    """One deployment of the pool, with its own quotas and circuit breaker."""
+
+    def __init__(self, name, client, model, weight=1.0, failure_threshold=3, cooldown=30.0):
+        """
+        Args:
+            name (str): Name used in logs and statistics
+            client (RateLimitedClient): Client bound to this deployment's quotas
+            model (str): The Azure deployment name sent as the model
+            weight (float): Relative share of traffic; a weight of 2 takes twice the outstanding requests
+            failure_threshold (int): Consecutive failures that open the circuit
+            cooldown (float): Seconds the circuit stays open before a probe request is allowed
+        """
+        self.name = name
+        self.client = client
+        self.model = model
+        self.weight = max(float(weight), 0.01)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.completed = 0
+        self.failed = 0
+
+    def state(self, now):
+        if self.open_until == 0.0:
+            return CIRCUIT_CLOSED
+        return CIRCUIT_OPEN if now < self.open_until else CIRCUIT_HALF_OPEN
+
+    def is_available(self, now):
+        state = self.state(now)
+        # A half-open circuit lets a single probe through to test recovery
+        return state == CIRCUIT_CLOSED or (state == CIRCUIT_HALF_OPEN and not self.probing)
+
+    def load(self):
+        return (self.outstanding + 1) / self.weight
+
+
+class DeploymentPool:
+    """
+    Routes requests to the least-loaded healthy deployment and fails over on errors.
+
+    Each deployment keeps its own RateLimitedClient, so token and request quotas,
+    retries and adaptive concurrency apply per deployment. A deployment that keeps
+    failing has its circuit opened and receives no traffic until the cooldown has
+    passed; a request that fails with a retryable error is re-sent to another
+    deployment instead of failing the whole conversion. The circuit of the last
+    deployment with a closed circuit is never opened, so a pool of one behaves
+    like a single client.
+    """
+
+    def __init__(self, deployments):
+        """
+        Args:
+            deployments (list): Deployment instances, at least one
+        """
+        if not deployments:
+            raise ValueError("A deployment pool needs at least one deployment")
+        self.deployments = deployments
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    def _acquire(self, exclude):
+        """
+        Pick the healthy deployment with the fewest weighted outstanding requests.
+
+        Returns:
+            tuple: (deployment, probe) where probe tells whether this request tests a half-open
+            circuit, or (None, False) if no deployment is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [d for d in self.deployments if d.name not in exclude and d.is_available(now)]
+            if not candidates:
+                return None, False
+            deployment = min(candidates, key=lambda d: (d.load(), random.random()))
+            probe = deployment.state(now) == CIRCUIT_HALF_OPEN
+            if probe:
+                deployment.probing = True
+            deployment.outstanding += 1
+            return deployment, probe
+
+    def _release(self, deployment, healthy, probe=False):
+        with self._lock:
+            deployment.outstanding -= 1
+            # Only the probe itself ends the half-open test
+            if probe:
+                deployment.probing = False
+            if healthy:
+                deployment.completed += 1
+                deployment.consecutive_failures = 0
+                deployment.open_until = 0.0
+                return
+            deployment.failed += 1
+            deployment.consecutive_failures += 1
+            if deployment.consecutive_failures >= deployment.failure_threshold or deployment.open_until:
+                now = time.monotonic()
+                if not any(d is not deployment and d.state(now) == CIRCUIT_CLOSED for d in self.deployments):
+                    # Opening the last closed circuit would fail every request fast, even those the
+                    # retrying client could still serve, so a lone deployment never opens its circuit
+                    if deployment.consecutive_failures == deployment.failure_threshold:
+                        logger.warning(f"Deployment {deployment.name} keeps failing but is the last healthy one, "
+                                       f"leaving its circuit closed")
+                    return
+                deployment.open_until = now + deployment.cooldown
+                logger.warning(f"Opening circuit for deployment {deployment.name} for {deployment.cooldown:.0f}s "
+                               f"after {deployment.consecutive_failures} consecutive failures")
+
+    def create_chat_completion(self, **kwargs):
+        """
+        Sends a chat completion request to the pool, failing over between deployments.
+
+        Args:
+            **kwargs: Arguments for client.chat.completions.create; model is set per deployment
+
+        Returns:
+            The chat completion response
+
+        Raises:
+            NoHealthyDeployment: If no deployment is available to take the request
+        """
+        tried = set()
+        if kwargs.get("stream"):
+            return self._track_stream(kwargs, tried)
+        deployment, probe, response = self._send(kwargs, tried)
+        self._release(deployment, healthy=True, probe=probe)
+        return response
+
+    def _failed_over(self, deployment, error, tried):
+        tried.add(deployment.name)
+        with self._lock:
+            self.failovers += 1
+        logger.warning(f"Deployment {deployment.name} failed ({str(error)}), failing over")
+
+    def _send(self, kwargs, tried, last_error=None):
+        """
+        Sends the request to the next healthy deployment not in tried until one accepts it.
+
+        Returns:
+            tuple: (deployment, probe, response); the deployment stays acquired
+        """
+        while True:
+            deployment, probe = self._acquire(tried)
+            if deployment is None:
+                if last_error is not None:
+                    raise last_error
+                raise NoHealthyDeployment("No healthy Azure OpenAI deployment is available")
+            active_span = current_span()
+            if active_span is not None:
+                active_span.set("deployment", deployment.name)
+            try:
+                return deployment, probe, deployment.client.create_chat_completion(**dict(kwargs, model=deployment.model))
+            except Exception as e:
+                # Client errors such as 400s say nothing about the deployment's health
+                retryable = is_retryable(e)
+                self._release(deployment, healthy=not retryable and get_status_code(e) is not None, probe=probe)
+                if not retryable:
+                    raise
+                self._failed_over(deployment, e, tried)
+                last_error = e
+
+    def _track_stream(self, kwargs, tried):
+        """
+        Streams a reply, keeping the request outstanding on its deployment until the stream ends.
+
+        A stream that fails before any text arrived is sent to the next healthy
+        deployment. Once text has been delivered it raises StreamInterrupted.
+        """
+        deployment, probe, stream = self._send(kwargs, tried)
+        delivered = False
+        while True:
+            try:
+                for chunk in stream:
+                    if not delivered and any(
+                        choice.delta is not None and choice.delta.content for choice in chunk.choices or []
+                    ):
+                        delivered = True
+                    yield chunk
+            except GeneratorExit:
+                # The reader stopped early; that says nothing about the deployment
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+                self._release(deployment, healthy=True, probe=probe)
+                raise
+            except Exception as e:
+                retryable = is_retryable(e)
+                self._release(deployment, healthy=not retryable and get_status_code(e) is not None, probe=probe)
+                if not retryable:
+                    raise
+                if delivered:
+                    logger.warning(f"Deployment {deployment.name} failed mid-stream ({str(e)})")
+                    raise StreamInterrupted(e) from e
+                self._failed_over(deployment, e, tried)
+                deployment, probe, stream = self._send(kwargs, tried, last_error=e)
+                continue
+            self._release(deployment, healthy=True, probe=probe)
+            return
+
+    def models(self):
+        """The distinct models a request may be sent to, sorted"""
+        return sorted({d.model for d in self.deployments})
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            deployments = {
+                d.name: dict(d.client.stats(), **{
+                    "model": d.model,
+                    "weight": d.weight,
+                    "outstanding": d.outstanding,
+                    "circuit": d.state(now),
+                    "consecutiveFailures": d.consecutive_failures,
+                    "completed": d.completed,
+                    "failed": d.failed
+                })
+                for d in self.deployments
+            }
+            return {"failovers": self.failovers, "deployments": deployments}
+
+
+def _create_deployment(config, http_client, index):
+    """Build a Deployment from one entry of the pool configuration"""
+    # Imported here so the SDK only loads when the pool is first used
+    from openai import AzureOpenAI
+
+    api_key = config.get("apiKey") or os.environ.get(config.get("apiKeyEnv", ""), "")
+    azure_client = AzureOpenAI(
+        api_key=api_key,
+        api_version=config.get("apiVersion", DEFAULT_API_VERSION),
+        azure_endpoint=config["endpoint"],
+        http_client=http_client,
+        max_retries=0,
+    )
+    limiter = AIMDLimiter(
+        initial=int(os.environ.get("LLM_CONCURRENCY_INITIAL", 8)),
+        minimum=int(os.environ.get("LLM_CONCURRENCY_MIN", 1)),
+        maximum=int(config.get("maxConcurrency", os.environ.get("LLM_CONCURRENCY_MAX", 64)))
+    )
+    # With several deployments a failing one is left quickly and the pool fails over instead
+    default_retries = 1 if config.get("pooled") else 5
+    client = RateLimitedClient(
+        azure_client,
+        tokens_per_minute=int(config.get("tpm", os.environ.get("LLM_TPM_LIMIT", 0))),
+        requests_per_minute=int(config.get("rpm", os.environ.get("LLM_RPM_LIMIT", 0))),
+        max_retries=int(os.environ.get("LLM_MAX_RETRIES", default_retries)),
+        backoff_base=float(os.environ.get("LLM_BACKOFF_BASE", 1.0)),
+        backoff_max=float(os.environ.get("LLM_BACKOFF_MAX", 60.0)),
+        limiter=limiter
+    )
+    return Deployment(
+        config.get("name") or f"deployment-{index}",
+        client,
+        config["deployment"],
+        weight=config.get("weight", 1.0),
+        failure_threshold=int(os.environ.get("LLM_CIRCUIT_FAILURE_THRESHOLD", 3)),
+        cooldown=float(os.environ.get("LLM_CIRCUIT_COOLDOWN", 30.0))
+    )
+
+
+def create_deployment_pool_from_env(default_deployment):
+    """
+    Builds the deployment pool from environment variables.
+
+    AZURE_OPENAI_DEPLOYMENTS holds a JSON list of deployments, for example
+    [{"name": "east", "endpoint": "https://...", "apiKeyEnv": "EAST_KEY",
+      "deployment": "gpt-4o", "weight": 2, "tpm": 300000, "rpm": 1800}].
+    Keys may be given inline with "apiKey" or read from the variable named by
+    "apiKeyEnv". Without it the pool holds the single default deployment.
+    LLM_CIRCUIT_FAILURE_THRESHOLD and LLM_CIRCUIT_COOLDOWN tune circuit breaking.
+
+    Args:
+        default_deployment (dict): Deployment used when AZURE_OPENAI_DEPLOYMENTS is not set
+
+    Returns:
+        DeploymentPool: The pool shared by all endpoints
+    """
+    configs = [default_deployment]
+    raw = os.environ.get("AZURE_OPENAI_DEPLOYMENTS", "").strip()
+    if raw:
+        configs = json.loads(raw)
+        if isinstance(configs, dict):
+            configs = configs.get("deployments", [])
+        configs = [dict(config, pooled=len(configs) > 1) for config in configs]
+
+    http_client = create_http_client()
+    deployments = [_create_deployment(config, http_client, i) for i, config in enumerate(configs)]
+    logger.info(f"LLM deployment pool: {', '.join(f'{d.name} (weight {d.weight:g})' for d in deployments)}")
+    return DeploymentPool(deployments)
@@ -0,0 +1,269 @@
+"""
+Module for a local fake chat-completions server used by the benchmark harness.
+
+The server answers Azure OpenAI and OpenAI style chat completion requests with
+canned JSON replies that match what each pipeline step asks for. Latency,
+jitter and error rates are configurable and all randomness is seeded, so runs
+are repeatable.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from token_chunker import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _reply_for(system_message, user_prompt):
+    """Return a JSON reply shaped like the one the system message asks for"""
+    if "unitTestCode" in system_message:
+        return {
+            "unitTestCode": "class ConvertedProgramTest {\n    // generated test\n}\n",
+            "testDescription": "Fake unit tests",
+            "coverage": ["main flow"]
+        }
+    if "functionalTests" in system_message:
+        return {
+            "functionalTests": [
+                {"id": "FT1", "title": "Main flow", "steps": ["Run the program"], "expectedResult": "It completes"}
+            ],
+            "testStrategy": "Fake functional tests"
+        }
+    if "convertedCode" in system_message:
+        # Roughly one converted line per source line keeps output sizes realistic
+        source_lines = [line for line in user_prompt.splitlines() if line.strip()]
+        body = "\n".join(f"        // {line.strip()[:60]}" for line in source_lines[:400])
+        return {
+            "convertedCode": f"public class ConvertedProgram {{\n    public void run() {{\n{body}\n    }}\n}}\n",
+            "conversionNotes": "Converted by the fake LLM server",
+            "potentialIssues": [],
+            "databaseUsed": "EXEC SQL" in user_prompt
+        }
+    if "technicalRequirements" in system_message:
+        return {"technicalRequirements": [
+            {"id": "TR1", "description": "Convert file handling to streams", "complexity": "Medium"}
+        ]}
+    return {
+        "Overview": {"Purpose of the System": "Fake analysis", "Context and Business Impact": "None"},
+        "Business Rules & Requirements": {"Business Rules": "None"}
+    }
+
+
+class FakeLLMBehaviour:
+    """Latency and error model of the fake server."""
+
+    def __init__(self, latency=0.2, jitter=0.05, per_token_latency=0.0, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=1.0, seed=0):
+        """
+        Args:
+            latency (float): Base response time in seconds
+            jitter (float): Standard deviation of the gaussian noise added to the latency
+            per_token_latency (float): Extra seconds per completion token, to model generation speed
+            error_rate (float): Share of requests answered with a 500
+            throttle_rate (float): Share of requests answered with a 429 and a Retry-After header
+            retry_after (float): Retry-After value sent with 429 responses, in seconds
+            seed (int): Seed of the random generator
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.per_token_latency = per_token_latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def draw(self):
+        """Draw the outcome of one request: ('ok' | 'error' | 'throttle', base delay)"""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            delay = max(0.0, self.latency + self._random.gauss(0, self.jitter))
+        if roll < self.throttle_rate:
+            return "throttle", delay
+        if roll < self.throttle_rate + self.error_rate:
+            return "error", delay
+        return "ok", delay
+
+    def record(self, outcome, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            if outcome == "error":
+                self.errors += 1
+            elif outcome == "throttle":
+                self.throttled += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "throttled": self.throttled,
+                "promptTokens": self.prompt_tokens,
+                "completionTokens": self.completion_tokens
+            }
+
+
+def _make_handler(behaviour):
+    class FakeChatCompletionsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, request_body, content, piece_size=40):
+            """Send the reply as server-sent chat.completion.chunk events"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+            def event(delta, finish_reason=None):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request_body.get("model", "fake"),
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            for start in range(0, len(content), piece_size):
+                piece = content[start:start + piece_size]
+                time.sleep(count_tokens(piece) * behaviour.per_token_latency)
+                event({"role": "assistant", "content": piece} if start == 0 else {"content": piece})
+            event({}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request_body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.split("?")[0].endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "Not found"}})
+                return
+
+            outcome, delay = behaviour.draw()
+            if outcome == "throttle":
+                time.sleep(min(delay, 0.05))
+                behaviour.record(outcome)
+                self._send(429, {"error": {"code": "429", "message": "Rate limit is exceeded"}},
+                           {"Retry-After": f"{behaviour.retry_after:g}"})
+                return
+            if outcome == "error":
+                time.sleep(delay)
+                behaviour.record(outcome)
+                self._send(500, {"error": {"code": "500", "message": "Internal server error"}})
+                return
+
+            messages = request_body.get("messages", [])
+            system_message = next((m["content"] for m in messages if m.get("role") == "system"), "")
+            user_prompt = next((m["content"] for m in messages if m.get("role") == "user"), "")
+            content = json.dumps(_reply_for(system_message, user_prompt))
+            prompt_tokens = sum(count_tokens(m.get("content") or "") + 4 for m in messages)
+            completion_tokens = count_tokens(content)
+            if request_body.get("stream"):
+                time.sleep(delay)
+                self._stream(request_body, content)
+                behaviour.record(outcome, prompt_tokens, completion_tokens)
+                return
+            time.sleep(delay + completion_tokens * behaviour.per_token_latency)
+            behaviour.record(outcome, prompt_tokens, completion_tokens)
+            self._send(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request_body.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            })
+
+    return FakeChatCompletionsHandler
+
+
+class FakeLLMServer:
+    """Runs the fake chat-completions server on a background thread."""
+
+    def __init__(self, behaviour=None, host="127.0.0.1", port=0):
+        self.behaviour = behaviour or FakeLLMBehaviour()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self.behaviour), bind_and_activate=False)
+        self._server.daemon_threads = True
+        # Load tests open hundreds of connections at once
+        self._server.request_queue_size = 1024
+        self._server.server_bind()
+        self._server.server_activate()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake chat-completions server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--per-token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    behaviour = FakeLLMBehaviour(args.latency, args.jitter, args.per_token_latency, args.error_rate,
+                                 args.throttle_rate, seed=args.seed)
+    server = FakeLLMServer(behaviour, port=args.port).start()
+    logger.info(f"Fake chat-completions server listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,907 @@
+"""
+Module for compiling and testing generated Java code in a pool of warm JVM workers.
+
+Each worker is a resident JVM running VerifierWorker (below), which holds
+the system Java compiler and its file manager for its whole life. Sources
+are compiled in memory, the generated unit tests are run from an in-memory
+class loader on a thread with a time limit, and the JVM heap is capped with
+-Xmx. A worker whose tests hang or exhaust the heap exits after answering
+and is replaced, so one bad program never affects the next request.
+
+The worker is compiled once per version of its source into the work
+directory and needs JDK 11 or later. JUnit (4 or 5) must be on
+JAVA_VERIFY_CLASSPATH for generated tests to compile. Tests are run by a small reflective runner that
+honours @Test, @Before/@BeforeEach, @After/@AfterEach, @BeforeClass/@BeforeAll,
+@AfterClass/@AfterAll and @Ignore/@Disabled.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import threading
+import time
+from collections import Counter
+
+from llm_executor import run_concurrently
+from tracing import metrics, span
+
+logger = logging.getLogger(__name__)
+
+WORKER_CLASS = "VerifierWorker"
+
+JAVA_PACKAGE = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.MULTILINE)
+JAVA_PUBLIC_TYPE = re.compile(
+    r"^\s*public\s+(?:(?:abstract|final|sealed|non-sealed|strictfp)\s+)*(?:class|interface|enum|record)\s+(\w+)",
+    re.MULTILINE
+)
+
+WORKER_SOURCE = r'''import java.io.BufferedInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.annotation.Annotation;
+import java.lang.reflect.Constructor;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Comparator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import javax.tools.Diagnostic;
+import javax.tools.DiagnosticCollector;
+import javax.tools.FileObject;
+import javax.tools.ForwardingJavaFileManager;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+
+/**
+ * Resident compile-and-test worker driven by java_verifier.py over stdin and stdout.
+ *
+ * Request: a line "VERIFY <file count> <test timeout ms>", then for each file a line
+ * "<main|test> <path> <byte length>" followed by that many bytes of UTF-8 source.
+ * Response: one line of JSON. The worker exits after a response with "restart": true.
+ */
+public class VerifierWorker {
+
+    private static final int MAX_OUTPUT = 8000;
+
+    static final class Source extends SimpleJavaFileObject {
+        final String path;
+        final boolean test;
+        final String code;
+
+        Source(String path, boolean test, String code) {
+            super(URI.create("string:///" + path), JavaFileObject.Kind.SOURCE);
+            this.path = path;
+            this.test = test;
+            this.code = code;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return code;
+        }
+
+        String className() {
+            return path.substring(0, path.length() - ".java".length()).replace('/', '.');
+        }
+    }
+
+    static final class ClassOutput extends SimpleJavaFileObject {
+        final ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+
+        ClassOutput(String className) {
+            super(URI.create("bytes:///" + className.replace('.', '/') + ".class"), JavaFileObject.Kind.CLASS);
+        }
+
+        @Override
+        public OutputStream openOutputStream() {
+            return bytes;
+        }
+    }
+
+    static final class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        final Map<String, ClassOutput> classes = new LinkedHashMap<>();
+
+        MemoryFileManager(StandardJavaFileManager fileManager) {
+            super(fileManager);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(Location location, String className, JavaFileObject.Kind kind,
+                                                   FileObject sibling) {
+            ClassOutput output = new ClassOutput(className);
+            classes.put(className, output);
+            return output;
+        }
+    }
+
+    static final class MemoryClassLoader extends ClassLoader {
+        private final Map<String, ClassOutput> classes;
+
+        MemoryClassLoader(Map<String, ClassOutput> classes, ClassLoader parent) {
+            super(parent);
+            this.classes = classes;
+        }
+
+        @Override
+        protected Class<?> findClass(String name) throws ClassNotFoundException {
+            ClassOutput output = classes.get(name);
+            if (output == null) {
+                throw new ClassNotFoundException(name);
+            }
+            byte[] bytes = output.bytes.toByteArray();
+            return defineClass(name, bytes, 0, bytes.length);
+        }
+    }
+
+    static final class TestReport {
+        int run;
+        int passed;
+        int failed;
+        int skipped;
+        final List<String[]> failures = new ArrayList<>();
+    }
+
+    public static void main(String[] args) throws IOException {
+        PrintStream protocol = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        ByteArrayOutputStream captured = new ByteArrayOutputStream();
+        PrintStream capture = new PrintStream(captured, true, "UTF-8");
+        // Whatever the compiled code prints must not end up in the protocol stream
+        System.setOut(capture);
+        System.setErr(capture);
+
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        if (compiler == null) {
+            protocol.println("{\"status\":\"error\",\"message\":\"No system Java compiler, run the worker on a JDK\"}");
+            return;
+        }
+        StandardJavaFileManager standard = compiler.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+        List<String> options = Arrays.asList(
+            "-classpath", System.getProperty("java.class.path"), "-proc:none", "-g", "-encoding", "UTF-8");
+
+        // Compile once so javac is loaded and JIT-compiled before the first request
+        compiler.getTask(null, new MemoryFileManager(standard), null, options, null, Arrays.asList(
+            new Source("Warmup.java", false, "public class Warmup { int value() { return 1; } }"))).call();
+        protocol.println("{\"status\":\"ready\"}");
+
+        InputStream in = new BufferedInputStream(System.in);
+        while (true) {
+            String header = readLine(in);
+            if (header == null) {
+                return;
+            }
+            String[] parts = header.trim().split(" ");
+            if (parts.length != 3 || !parts[0].equals("VERIFY")) {
+                protocol.println("{\"status\":\"error\",\"message\":" + quote("Bad request: " + header) + "}");
+                continue;
+            }
+            int count = Integer.parseInt(parts[1]);
+            long timeoutMs = Long.parseLong(parts[2]);
+            List<Source> sources = new ArrayList<>();
+            for (int i = 0; i < count; i++) {
+                String[] file = readLine(in).trim().split(" ");
+                byte[] bytes = in.readNBytes(Integer.parseInt(file[2]));
+                sources.add(new Source(file[1], file[0].equals("test"), new String(bytes, StandardCharsets.UTF_8)));
+            }
+            captured.reset();
+            if (verify(compiler, standard, options, sources, timeoutMs, captured, protocol)) {
+                // A test thread that would not stop, or an exhausted heap, leaves this JVM unusable
+                System.exit(3);
+            }
+        }
+    }
+
+    static boolean verify(JavaCompiler compiler, StandardJavaFileManager standard, List<String> options,
+                          List<Source> sources, long timeoutMs, ByteArrayOutputStream captured,
+                          PrintStream protocol) {
+        long started = System.nanoTime();
+        DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+        MemoryFileManager files = new MemoryFileManager(standard);
+        boolean compiled;
+        String compilerError = null;
+        try {
+            compiled = compiler.getTask(null, files, diagnostics, options, null, sources).call();
+        } catch (RuntimeException e) {
+            compiled = false;
+            compilerError = describe(e);
+        }
+        long compileMs = (System.nanoTime() - started) / 1000000;
+
+        List<String> errors = new ArrayList<>();
+        for (Diagnostic<? extends JavaFileObject> diagnostic : diagnostics.getDiagnostics()) {
+            if (diagnostic.getKind() != Diagnostic.Kind.ERROR) {
+                continue;
+            }
+            Source source = diagnostic.getSource() instanceof Source ? (Source) diagnostic.getSource() : null;
+            errors.add("{\"file\":" + quote(source == null ? null : source.path)
+                + ",\"test\":" + (source != null && source.test)
+                + ",\"line\":" + diagnostic.getLineNumber()
+                + ",\"column\":" + diagnostic.getColumnNumber()
+                + ",\"message\":" + quote(diagnostic.getMessage(null)) + "}");
+        }
+        if (compilerError != null) {
+            errors.add("{\"file\":null,\"test\":false,\"line\":-1,\"column\":-1,\"message\":" + quote(compilerError) + "}");
+        }
+
+        String status = compiled ? "passed" : "compile_error";
+        boolean restart = false;
+        long testMs = 0;
+        TestReport report = new TestReport();
+        List<String> testClasses = new ArrayList<>();
+        for (Source source : sources) {
+            if (source.test) {
+                testClasses.add(source.className());
+            }
+        }
+        if (compiled && testClasses.isEmpty()) {
+            status = "compiled";
+        } else if (compiled) {
+            ClassLoader loader = new MemoryClassLoader(files.classes, VerifierWorker.class.getClassLoader());
+            Throwable[] error = new Throwable[1];
+            Thread runner = new Thread(() -> {
+                try {
+                    for (String name : testClasses) {
+                        runClass(Class.forName(name, true, loader), report);
+                    }
+                } catch (Throwable e) {
+                    error[0] = e;
+                }
+            }, "verifier-tests");
+            runner.setDaemon(true);
+            runner.setContextClassLoader(loader);
+            long testStarted = System.nanoTime();
+            runner.start();
+            try {
+                runner.join(timeoutMs);
+            } catch (InterruptedException e) {
+                Thread.currentThread().interrupt();
+            }
+            testMs = (System.nanoTime() - testStarted) / 1000000;
+            if (runner.isAlive()) {
+                status = "timeout";
+                restart = true;
+            } else if (error[0] instanceof OutOfMemoryError) {
+                status = "memory_limit";
+                restart = true;
+            } else if (error[0] != null) {
+                status = "test_error";
+                synchronized (report) {
+                    report.failures.add(new String[] {String.join(",", testClasses), describe(error[0])});
+                }
+            } else if (report.failed > 0) {
+                status = "test_failures";
+            } else if (report.run == 0) {
+                status = "no_tests";
+            }
+        }
+
+        StringBuilder json = new StringBuilder();
+        json.append("{\"status\":").append(quote(status))
+            .append(",\"compiled\":").append(compiled)
+            .append(",\"compileMs\":").append(compileMs)
+            .append(",\"testMs\":").append(testMs)
+            .append(",\"diagnostics\":[").append(String.join(",", errors)).append("]");
+        synchronized (report) {
+            json.append(",\"tests\":{\"run\":").append(report.run)
+                .append(",\"passed\":").append(report.passed)
+                .append(",\"failed\":").append(report.failed)
+                .append(",\"skipped\":").append(report.skipped)
+                .append(",\"failures\":[");
+            for (int i = 0; i < report.failures.size(); i++) {
+                String[] failure = report.failures.get(i);
+                json.append(i > 0 ? "," : "").append("{\"test\":").append(quote(failure[0]))
+                    .append(",\"message\":").append(quote(failure[1])).append("}");
+            }
+            json.append("]}");
+        }
+        String output = captured.toString(StandardCharsets.UTF_8);
+        if (output.length() > MAX_OUTPUT) {
+            output = output.substring(0, MAX_OUTPUT);
+        }
+        json.append(",\"output\":").append(quote(output)).append(",\"restart\":").append(restart).append("}");
+        protocol.println(json);
+        return restart;
+    }
+
+    static void runClass(Class<?> type, TestReport report) throws Throwable {
+        Method[] methods = type.getDeclaredMethods();
+        Arrays.sort(methods, Comparator.comparing(Method::getName));
+        List<Method> before = annotated(methods, "BeforeEach", "Before");
+        List<Method> after = annotated(methods, "AfterEach", "After");
+        for (Method method : annotated(methods, "BeforeAll", "BeforeClass")) {
+            invoke(method, null);
+        }
+        try {
+            for (Method method : annotated(methods, "Test")) {
+                runTest(type, method, before, after, report);
+            }
+        } finally {
+            for (Method method : annotated(methods, "AfterAll", "AfterClass")) {
+                invoke(method, null);
+            }
+        }
+    }
+
+    static void runTest(Class<?> type, Method method, List<Method> before, List<Method> after, TestReport report)
+            throws Throwable {
+        if (method.getParameterCount() > 0 || !annotated(new Method[] {method}, "Disabled", "Ignore").isEmpty()) {
+            synchronized (report) {
+                report.skipped++;
+            }
+            return;
+        }
+        Class<?> expected = expectedException(method);
+        Throwable failure = null;
+        try {
+            Constructor<?> constructor = type.getDeclaredConstructor();
+            constructor.setAccessible(true);
+            Object instance = constructor.newInstance();
+            try {
+                for (Method setup : before) {
+                    invoke(setup, instance);
+                }
+                invoke(method, instance);
+                if (expected != null) {
+                    failure = new AssertionError("Expected exception: " + expected.getName());
+                }
+            } finally {
+                for (Method teardown : after) {
+                    invoke(teardown, instance);
+                }
+            }
+        } catch (Throwable e) {
+            Throwable cause = e instanceof InvocationTargetException ? e.getCause() : e;
+            if (cause instanceof OutOfMemoryError) {
+                throw cause;
+            }
+            failure = expected != null && expected.isInstance(cause) ? null : cause;
+        }
+        String kind = failure == null ? "" : failure.getClass().getName();
+        synchronized (report) {
+            if (kind.endsWith("TestAbortedException") || kind.endsWith("AssumptionViolatedException")) {
+                report.skipped++;
+                return;
+            }
+            report.run++;
+            if (failure == null) {
+                report.passed++;
+            } else {
+                report.failed++;
+                report.failures.add(new String[] {type.getName() + "." + method.getName(), describe(failure)});
+            }
+        }
+    }
+
+    static void invoke(Method method, Object target) throws Throwable {
+        method.setAccessible(true);
+        try {
+            method.invoke(target);
+        } catch (InvocationTargetException e) {
+            throw e.getCause();
+        }
+    }
+
+    static List<Method> annotated(Method[] methods, String... names) {
+        List<String> wanted = Arrays.asList(names);
+        List<Method> result = new ArrayList<>();
+        for (Method method : methods) {
+            for (Annotation annotation : method.getAnnotations()) {
+                if (wanted.contains(annotation.annotationType().getSimpleName())) {
+                    result.add(method);
+                    break;
+                }
+            }
+        }
+        return result;
+    }
+
+    static Class<?> expectedException(Method method) {
+        for (Annotation annotation : method.getAnnotations()) {
+            if (annotation.annotationType().getName().equals("org.junit.Test")) {
+                try {
+                    Class<?> expected = (Class<?>) annotation.annotationType().getMethod("expected").invoke(annotation);
+                    return expected.getName().equals("org.junit.Test$None") ? null : expected;
+                } catch (ReflectiveOperationException e) {
+                    return null;
+                }
+            }
+        }
+        return null;
+    }
+
+    static String describe(Throwable error) {
+        StringBuilder text = new StringBuilder(error.getClass().getName());
+        if (error.getMessage() != null) {
+            text.append(": ").append(error.getMessage());
+        }
+        for (StackTraceElement frame : error.getStackTrace()) {
+            String name = frame.getClassName();
+            if (!name.startsWith("java.") && !name.startsWith("jdk.") && !name.startsWith("sun.")
+                    && !name.startsWith("org.junit.") && !name.startsWith("org.opentest4j.")
+                    && !name.startsWith("VerifierWorker")) {
+                text.append(" at ").append(frame);
+                break;
+            }
+        }
+        return text.toString();
+    }
+
+    static String readLine(InputStream in) throws IOException {
+        ByteArrayOutputStream line = new ByteArrayOutputStream();
+        int b;
+        while ((b = in.read()) != -1 && b != '\n') {
+            line.write(b);
+        }
+        if (b == -1 && line.size() == 0) {
+            return null;
+        }
+        return line.toString(StandardCharsets.UTF_8);
+    }
+
+    static String quote(String text) {
+        if (text == null) {
+            return "null";
+        }
+        StringBuilder result = new StringBuilder(text.length() + 2).append('"');
+        for (int i = 0; i < text.length(); i++) {
+            char c = text.charAt(i);
+            if (c == '"' || c == '\\') {
+                result.append('\\').append(c);
+            } else if (c == '\n') {
+                result.append("\\n");
+            } else if (c < 0x20) {
+                result.append(String.format("\\u%04x", (int) c));
+            } else {
+                result.append(c);
+            }
+        }
+        return result.append('"').toString();
+    }
+}
+'''
+
+
+class WorkerError(Exception):
+    """Raised when a worker does not answer in time or exits"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def java_source_path(code, default_name):
+    """Return the path javac expects for a compilation unit: its package directories and public type name"""
+    package = JAVA_PACKAGE.search(code)
+    public_type = JAVA_PUBLIC_TYPE.search(code)
+    name = public_type.group(1) if public_type else default_name
+    return (package.group(1).replace(".", "/") + "/" if package else "") + f"{name}.java"
+
+
+def locate_chunks(code, chunk_codes):
+    """
+    Finds the lines each chunk's converted code occupies in the merged program.
+
+    Returns:
+        list: (first line, last line) per chunk, 1-based, or None where a chunk cannot be found
+    """
+    ranges = []
+    position = 0
+    for chunk_code in chunk_codes:
+        text = (chunk_code or "").strip()
+        index = code.find(text, position) if text else -1
+        if index < 0:
+            ranges.append(None)
+            continue
+        first = code.count("\n", 0, index) + 1
+        ranges.append((first, first + text.count("\n")))
+        position = index + len(text)
+    return ranges
+
+
+def errors_by_chunk(diagnostics, ranges):
+    """
+    Assigns compiler errors to the chunks whose code they are in.
+
+    Returns:
+        tuple: (dict of chunk index to its errors with chunk-relative lines, list of errors in no chunk)
+    """
+    by_chunk = {}
+    unattributed = []
+    for diagnostic in diagnostics:
+        line = diagnostic.get("line", -1)
+        index = next((i for i, span in enumerate(ranges) if span and span[0] <= line <= span[1]), None)
+        if index is None:
+            unattributed.append(diagnostic)
+        else:
+            by_chunk.setdefault(index, []).append(dict(diagnostic, line=line - ranges[index][0] + 1))
+    return by_chunk, unattributed
+
+
+def format_diagnostics(diagnostics, code=None):
+    """Render compiler errors as text, with the offending source line when the code is given"""
+    lines = code.splitlines() if code else []
+    rendered = []
+    for diagnostic in diagnostics:
+        line = diagnostic.get("line", -1)
+        text = f"line {line}: {diagnostic.get('message', '')}" if line > 0 else diagnostic.get("message", "")
+        if 0 < line <= len(lines):
+            text += f"\n    {lines[line - 1].strip()}"
+        rendered.append(text)
+    return "\n".join(rendered)
+
+
+class JavaWorker:
+    """A resident JVM running VerifierWorker, spoken to over its stdin and stdout"""
+
+    def __init__(self, command, startup_timeout):
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self.requests = 0
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+        ready = self._receive(startup_timeout)
+        if ready.get("status") != "ready":
+            self.close()
+            raise WorkerError("error", ready.get("message", "Java worker failed to start"))
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _receive(self, timeout):
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerError("timeout", f"Java worker did not answer within {timeout:.0f}s")
+        if line is None:
+            self.process.wait()
+            raise WorkerError("crashed", f"Java worker exited with code {self.process.returncode}")
+        return json.loads(line)
+
+    def verify(self, files, test_timeout, timeout):
+        """
+        Compiles files and runs the test classes among them.
+
+        Args:
+            files (list): (kind, path, code) tuples, kind being 'main' or 'test'
+            test_timeout (float): Seconds the tests may run
+            timeout (float): Seconds to wait for the whole answer
+
+        Returns:
+            dict: The worker's report
+        """
+        payload = [f"VERIFY {len(files)} {int(test_timeout * 1000)}\n".encode("utf-8")]
+        for kind, path, code in files:
+            data = code.encode("utf-8")
+            payload.append(f"{kind} {path} {len(data)}\n".encode("utf-8"))
+            payload.append(data)
+        try:
+            self.process.stdin.write(b"".join(payload))
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError("crashed", f"Java worker is not running: {e}")
+        self.requests += 1
+        return self._receive(timeout)
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+
+
+class JavaVerifier:
+    """
+    Pool of warm JVM workers that compile converted Java code and run its unit tests.
+
+    Workers are started on first use (or by start() during warm-up) and kept
+    for later requests; at most `workers` verifications run at the same time.
+    """
+
+    def __init__(self, java, javac, classpath=None, workers=2, heap_mb=256, test_timeout=10.0,
+                 compile_timeout=60.0, work_dir=os.path.join("data", "java-verifier")):
+        self.java = java
+        self.javac = javac
+        self.classpath = list(classpath or [])
+        self.workers = workers
+        self.heap_mb = heap_mb
+        self.test_timeout = test_timeout
+        self.compile_timeout = compile_timeout
+        self.work_dir = work_dir
+        self._class_dir = None
+        self._build_lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._stats_lock = threading.Lock()
+        self._statuses = Counter()
+        self._started = 0
+        self._replaced = 0
+
+    def _worker_classes(self):
+        """Compile VerifierWorker once per version of its source and return the class directory"""
+        with self._build_lock:
+            if self._class_dir is None:
+                digest = hashlib.sha256(WORKER_SOURCE.encode("utf-8")).hexdigest()[:16]
+                class_dir = os.path.join(self.work_dir, f"worker-{digest}")
+                if not os.path.exists(os.path.join(class_dir, f"{WORKER_CLASS}.class")):
+                    os.makedirs(class_dir, exist_ok=True)
+                    source_path = os.path.join(class_dir, f"{WORKER_CLASS}.java")
+                    with open(source_path, "w", encoding="utf-8") as handle:
+                        handle.write(WORKER_SOURCE)
+                    subprocess.run(
+                        [self.javac, "-encoding", "UTF-8", "-d", class_dir, source_path],
+                        check=True, capture_output=True, timeout=self.compile_timeout
+                    )
+                    logger.info(f"Compiled the Java verifier worker into {class_dir}")
+                self._class_dir = class_dir
+            return self._class_dir
+
+    def _spawn(self):
+        command = [
+            self.java, f"-Xmx{self.heap_mb}m", "-XX:+UseSerialGC",
+            "-cp", os.pathsep.join([self._worker_classes()] + self.classpath), WORKER_CLASS
+        ]
+        worker = JavaWorker(command, self.compile_timeout)
+        with self._stats_lock:
+            self._started += 1
+        return worker
+
+    def start(self):
+        """Start every worker so the first verifications do not pay for JVM and javac start-up"""
+        workers = [self._spawn() for _ in range(self.workers - self._idle.qsize())]
+        for worker in workers:
+            self._idle.put(worker)
+        logger.info(f"Started {len(workers)} Java verifier workers")
+
+    def verify(self, code, unit_test_code=""):
+        """
+        Compiles converted Java code with its unit tests and runs the tests.
+
+        Args:
+            code (str): The converted program
+            unit_test_code (str): Optional generated unit tests
+
+        Returns:
+            dict: 'status' (compiled, passed, compile_error, test_failures, test_error, no_tests,
+            timeout, memory_limit or crashed), 'compiled', 'diagnostics' (compiler errors with
+            file, test flag, line, column and message), 'tests' (run, passed, failed, skipped,
+            failures), 'compileMs', 'testMs', 'output' and 'files'
+        """
+        main_path = java_source_path(code, "Main")
+        files = [("main", main_path, code)]
+        test_path = None
+        if unit_test_code and unit_test_code.strip():
+            test_path = java_source_path(unit_test_code, "GeneratedTest")
+            files.append(("test", test_path, unit_test_code))
+
+        started = time.monotonic()
+        with self._slots:
+            worker = None
+            response = {}
+            try:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    worker = self._spawn()
+                response = worker.verify(files, self.test_timeout, self.compile_timeout + self.test_timeout)
+            except (WorkerError, OSError, ValueError, subprocess.SubprocessError) as e:
+                logger.warning(f"Java verification failed: {e}")
+                response = {
+                    "status": getattr(e, "status", "error"),
+                    "compiled": None,
+                    "restart": True,
+                    "output": str(e)
+                }
+            finally:
+                if worker is not None:
+                    if response.get("restart") or not worker.alive:
+                        worker.close()
+                        with self._stats_lock:
+                            self._replaced += 1
+                    else:
+                        self._idle.put(worker)
+
+        report = {
+            "status": response.get("status"),
+            "compiled": response.get("compiled"),
+            "diagnostics": response.get("diagnostics", []),
+            "tests": response.get("tests", {"run": 0, "passed": 0, "failed": 0, "skipped": 0, "failures": []}),
+            "compileMs": response.get("compileMs"),
+            "testMs": response.get("testMs"),
+            "elapsedMs": round((time.monotonic() - started) * 1000),
+            "output": response.get("output", ""),
+            "files": {"main": main_path, "test": test_path}
+        }
+        with self._stats_lock:
+            self._statuses[report["status"]] += 1
+        logger.info(f"Java verification: {report['status']}, {len(report['diagnostics'])} compiler errors, "
+                    f"{report['tests'].get('passed', 0)}/{report['tests'].get('run', 0)} tests passed "
+                    f"in {report['elapsedMs']}ms")
+        return report
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "idleWorkers": self._idle.qsize(),
+                "workersStarted": self._started,
+                "workersReplaced": self._replaced,
+                "verifications": dict(self._statuses)
+            }
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def verify_and_repair(verifier, code, unit_test_code, repair, max_rounds=2, chunk_codes=None, merge=None,
+                      max_workers=4, timeout=None, emit=None):
+    """
+    Verifies converted code and sends its compiler errors back for repair until it compiles.
+
+    Errors are repaired where they are: in the chunks they fall in when the
+    program was merged from chunks, else in the whole program, and in the unit
+    tests once the program itself compiles. Failing tests are reported but not
+    repaired.
+
+    Args:
+        verifier (JavaVerifier): The verifier
+        code (str): The converted program
+        unit_test_code (str): The generated unit tests
+        repair (callable): Called as repair(target, code, errors, program) where target is a chunk
+            index, 'program' or 'unitTests', errors the compiler errors as text with lines relative
+            to code, and program the current converted program; returns the repaired code or None
+        max_rounds (int): Repair rounds after the first verification
+        chunk_codes (list): Converted code of each chunk, when code was merged from them
+        merge (callable): Called as merge(chunk_codes) after chunks were repaired; returns the merged program
+        max_workers (int): Maximum number of repairs running at the same time
+        timeout (float): Optional per-repair timeout in seconds
+        emit (callable): Optional progress callback, called as emit(event, payload)
+
+    Returns:
+        dict: 'code', 'unitTestCode', 'chunkCodes' and 'report', the last verification report
+        with 'rounds', 'repairedChunks', 'repairedProgram' and 'repairedUnitTests' added
+    """
+    if emit is None:
+        emit = lambda event, payload: None
+    chunk_codes = list(chunk_codes) if chunk_codes is not None else None
+    # Chunk-relative repairs only while the merged code is still made of the chunks
+    by_chunks = chunk_codes is not None and merge is not None
+    rounds = []
+    repaired_chunks = set()
+    program_repaired = False
+    unit_tests_repaired = False
+    for round_index in range(max_rounds + 1):
+        with span("verification", round=round_index):
+            report = verifier.verify(code, unit_test_code)
+        metrics.inc("cobol_java_verifications_total", status=report["status"])
+        emit("verification", {"round": round_index, "report": report})
+        rounds.append({
+            "round": round_index,
+            "status": report["status"],
+            "compilerErrors": len(report["diagnostics"]),
+            "tests": report["tests"]
+        })
+        if report["status"] != "compile_error" or round_index == max_rounds:
+            break
+
+        code_diagnostics = [diagnostic for diagnostic in report["diagnostics"] if not diagnostic.get("test")]
+        test_diagnostics = [diagnostic for diagnostic in report["diagnostics"] if diagnostic.get("test")]
+        repairs = {}
+        if code_diagnostics and by_chunks:
+            failing, unattributed = errors_by_chunk(code_diagnostics, locate_chunks(code, chunk_codes))
+            if unattributed:
+                logger.info(f"{len(unattributed)} compiler errors are outside every chunk")
+            for chunk_index, errors in failing.items():
+                repairs[chunk_index] = (
+                    lambda chunk_index=chunk_index, errors=errors: repair(
+                        chunk_index, chunk_codes[chunk_index], format_diagnostics(errors, chunk_codes[chunk_index]), code
+                    )
+                )
+            if not failing:
+                by_chunks = False
+        if code_diagnostics and not by_chunks:
+            repairs["program"] = lambda: repair("program", code, format_diagnostics(code_diagnostics, code), code)
+        elif test_diagnostics and not code_diagnostics:
+            repairs["unitTests"] = lambda: repair(
+                "unitTests", unit_test_code, format_diagnostics(test_diagnostics, unit_test_code), code
+            )
+
+        with span("repair", round=round_index, requests=len(repairs)):
+            results, errors = run_concurrently(repairs, max_workers=max_workers, timeout=timeout)
+        for target, error in errors.items():
+            logger.warning(f"Repair of {target} failed: {error}")
+        repaired = {target: result for target, result in results.items() if result}
+        if not repaired:
+            break
+        metrics.inc("cobol_java_repairs_total", len(repaired))
+
+        for target, repaired_code in repaired.items():
+            if target == "program":
+                code = repaired_code
+                program_repaired = True
+            elif target == "unitTests":
+                unit_test_code = repaired_code
+                unit_tests_repaired = True
+            else:
+                chunk_codes[target] = repaired_code
+                repaired_chunks.add(target)
+        if by_chunks and "program" not in repaired and repaired_chunks:
+            code = merge(chunk_codes)
+        emit("repair", {
+            "round": round_index,
+            "repaired": sorted(str(target) for target in repaired),
+            "convertedCode": code,
+            "unitTestCode": unit_test_code
+        })
+
+    return {
+        "code": code,
+        "unitTestCode": unit_test_code,
+        "chunkCodes": chunk_codes,
+        "report": dict(
+            report,
+            rounds=rounds,
+            repairedChunks=sorted(repaired_chunks),
+            repairedProgram=program_repaired,
+            repairedUnitTests=unit_tests_repaired
+        )
+    }
+
+
+def create_java_verifier_from_env():
+    """
+    Creates the Java verifier from environment variables.
+
+    JAVA_VERIFY_ENABLED turns it off; it is also off when no JDK is found
+    in JAVA_HOME or on the PATH. JAVA_VERIFY_WORKERS, JAVA_VERIFY_HEAP_MB,
+    JAVA_VERIFY_TEST_TIMEOUT, JAVA_VERIFY_COMPILE_TIMEOUT,
+    JAVA_VERIFY_CLASSPATH (JUnit jars, os.pathsep separated) and
+    JAVA_VERIFY_WORK_DIR configure the pool.
+
+    Returns:
+        JavaVerifier: The verifier, or None when disabled
+    """
+    if os.environ.get("JAVA_VERIFY_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    java_home = os.environ.get("JAVA_HOME", "")
+    java = os.path.join(java_home, "bin", "java") if java_home else shutil.which("java")
+    javac = os.path.join(java_home, "bin", "javac") if java_home else shutil.which("javac")
+    if not java or not javac or not os.path.exists(java) or not os.path.exists(javac):
+        logger.info("No JDK found, Java verification is disabled")
+        return None
+    classpath = [entry for entry in os.environ.get("JAVA_VERIFY_CLASSPATH", "").split(os.pathsep) if entry]
+    return JavaVerifier(
+        java,
+        javac,
+        classpath=classpath,
+        workers=int(os.environ.get("JAVA_VERIFY_WORKERS", 2)),
+        heap_mb=int(os.environ.get("JAVA_VERIFY_HEAP_MB", 256)),
+        test_timeout=float(os.environ.get("JAVA_VERIFY_TEST_TIMEOUT", 10)),
+        compile_timeout=float(os.environ.get("JAVA_VERIFY_COMPILE_TIMEOUT", 60)),
+        work_dir=os.environ.get("JAVA_VERIFY_WORK_DIR", os.path.join("data", "java-verifier"))
+    )
@@ -0,0 +1,232 @@
+"""
+Module for running conversions as background jobs with a persistent SQLite job store.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+def process_owner():
+    """Return an owner id for job claims that is unique to this process, even when a restart reuses its pid"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_abandoned(owner, current_owner):
+    """
+    Tells whether a job claimed by owner was left behind by a process that stopped.
+
+    Only owners on this host can be checked; jobs claimed on other hosts are left to them.
+    """
+    if not owner:
+        return True
+    host, pid, token = (owner.split(":") + ["", "", ""])[:3]
+    current_host, current_pid, current_token = current_owner.split(":")
+    if host != current_host or not pid.isdigit():
+        return False
+    if int(pid) == int(current_pid):
+        # Same pid as this process: a restart that reused it, unless the claim is our own
+        return token != current_token
+    return not _pid_alive(int(pid))
+
+
+class JobStore:
+    """Persists job state in a local SQLite database so it survives restarts."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, stage_timings TEXT NOT NULL DEFAULT '{}', "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.commit()
+
+    def create(self, payload):
+        """Stores a new queued job and returns its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, json.dumps(payload), now, now)
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id, **fields):
+        """Updates status, stage, result, error or stage_timings of a job"""
+        columns = []
+        values = []
+        for name, value in fields.items():
+            if name in ("result", "stage_timings"):
+                value = json.dumps(value)
+            columns.append(f"{name} = ?")
+            values.append(value)
+        columns.append("updated_at = ?")
+        values.extend([time.time(), job_id])
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {', '.join(columns)} WHERE id = ?", values)
+            self._conn.commit()
+
+    def get(self, job_id, include_payload=False):
+        """Returns a job as a dict, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, stage, payload, result, error, stage_timings, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "jobId": row[0],
+            "status": row[1],
+            "stage": row[2],
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "stageTimings": json.loads(row[6]),
+            "createdAt": row[7],
+            "updatedAt": row[8]
+        }
+        if include_payload:
+            job["payload"] = json.loads(row[3])
+        return job
+
+    def claim(self, job_id, owner):
+        """
+        Marks a queued job as running for owner.
+
+        The check and the update are one statement, so when several processes
+        share the store only one of them gets the job.
+
+        Returns:
+            bool: Whether owner claimed the job
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (JOB_RUNNING, owner, time.time(), job_id, JOB_QUEUED)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def requeue(self, job_id, owner):
+        """Puts a running job back in the queue if owner still holds it, returning whether it did"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, owner = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND owner IS ?",
+                (JOB_QUEUED, time.time(), job_id, JOB_RUNNING, owner)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def unfinished(self):
+        """Returns (id, status, owner) of queued or running jobs, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, status, owner FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return rows
+
+
+class JobRunner:
+    """Executes stored jobs on a bounded worker pool."""
+
+    def __init__(self, store, pipeline, max_workers=4):
+        """
+        Args:
+            store (JobStore): The store holding job state
+            pipeline (callable): Called as pipeline(payload, on_stage) and returns the job result.
+                on_stage(stage) marks the start of a new pipeline stage.
+            max_workers (int): Maximum number of jobs running at the same time
+        """
+        self.store = store
+        self.pipeline = pipeline
+        self.owner = process_owner()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, payload):
+        """Stores and queues a new job, returning its id"""
+        job_id = self.store.create(payload)
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def resume(self):
+        """
+        Re-queues jobs that were queued, or running in a process that stopped.
+
+        Every process sharing the store may call this; each job is still run
+        once, by whichever process claims it first.
+        """
+        job_ids = []
+        for job_id, status, owner in self.store.unfinished():
+            if status == JOB_RUNNING:
+                if not owner_abandoned(owner, self.owner) or not self.store.requeue(job_id, owner):
+                    continue
+            job_ids.append(job_id)
+            self._executor.submit(self._run, job_id)
+        if job_ids:
+            logger.info(f"Resumed {len(job_ids)} unfinished jobs")
+        return job_ids
+
+    def _run(self, job_id):
+        if not self.store.claim(job_id, self.owner):
+            logger.info(f"Job {job_id} was claimed by another worker")
+            return
+        job = self.store.get(job_id, include_payload=True)
+        if job is None:
+            return
+
+        timings = {}
+        current = {"stage": None, "started": time.monotonic()}
+
+        def on_stage(stage):
+            now = time.monotonic()
+            if current["stage"] is not None:
+                timings[current["stage"]] = round(now - current["started"], 3)
+            current["stage"] = stage
+            current["started"] = now
+            self.store.update(job_id, stage=stage, stage_timings=timings)
+
+        try:
+            result = self.pipeline(job["payload"], on_stage)
+            on_stage(None)
+            self.store.update(job_id, status=JOB_COMPLETED, result=result, stage_timings=timings)
+            logger.info(f"Job {job_id} completed")
+        except Exception as e:
+            on_stage(None)
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self.store.update(job_id, status=JOB_FAILED, error=str(e), stage_timings=timings)
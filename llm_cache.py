@@ -0,0 +1,204 @@
+"""
+Module for caching LLM responses by the content of the request.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(deployment, system_message, user_prompt, max_tokens, response_format=None, template_version=None):
+    """
+    Builds a content-addressed cache key for a chat completion request.
+
+    Args:
+        deployment (str or list): The model deployment name, or every model a pooled request may be sent to
+        system_message (str): The system message sent to the model
+        user_prompt (str): The user prompt sent to the model
+        max_tokens (int): The completion token limit
+        response_format (dict): Optional response format requested from the model
+        template_version (str): Optional version of the prompt templates the request was built from
+
+    Returns:
+        str: A SHA-256 hex digest identifying the request
+    """
+    payload = json.dumps(
+        [deployment, system_message, user_prompt, max_tokens, response_format, template_version],
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryLRUBackend:
+    """In-process LRU cache backend with optional TTL."""
+
+    def __init__(self, max_entries=1000, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """On-disk cache backend stored in a SQLite database, with LRU size limit and optional TTL."""
+
+    def __init__(self, path, max_entries=10000, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key NOT IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """Counts hits and misses in front of a pluggable cache backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Cache lookup failed: {str(e)}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            logger.error(f"Cache store failed: {str(e)}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_cache_from_env():
+    """
+    Creates the response cache configured by environment variables.
+
+    LLM_CACHE_BACKEND selects 'memory', 'sqlite' or 'none'. LLM_CACHE_PATH,
+    LLM_CACHE_MAX_ENTRIES and LLM_CACHE_TTL tune the chosen backend.
+
+    Returns:
+        ResponseCache: The configured cache, or None when caching is disabled
+    """
+    backend_name = os.environ.get("LLM_CACHE_BACKEND", "memory").lower()
+    max_entries = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 1000))
+    ttl = os.environ.get("LLM_CACHE_TTL")
+    ttl = float(ttl) if ttl else None
+
+    if backend_name == "none":
+        logger.info("LLM response cache disabled")
+        return None
+    if backend_name == "sqlite":
+        path = os.environ.get("LLM_CACHE_PATH", os.path.join("cache", "llm_cache.sqlite3"))
+        logger.info(f"Using SQLite LLM response cache at {path}")
+        return ResponseCache(SQLiteBackend(path, max_entries=max_entries, ttl=ttl))
+    if backend_name != "memory":
+        logger.warning(f"Unknown LLM_CACHE_BACKEND '{backend_name}', falling back to memory")
+    logger.info("Using in-memory LLM response cache")
+    return ResponseCache(MemoryLRUBackend(max_entries=max_entries, ttl=ttl))
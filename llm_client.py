@@ -0,0 +1,338 @@
+"""
+Module for rate-limit-aware access to the chat completions API.
+"""
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from token_chunker import count_tokens
+from tracing import record_retry
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def create_http_client():
+    """
+    Creates the pooled HTTP client shared by all LLM requests.
+
+    LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE and LLM_HTTP_KEEPALIVE_EXPIRY
+    tune the connection pool.
+
+    Returns:
+        httpx.Client: A client with keep-alive connection pooling
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(os.environ.get("LLM_HTTP_MAX_KEEPALIVE", 20)),
+        keepalive_expiry=float(os.environ.get("LLM_HTTP_KEEPALIVE_EXPIRY", 30))
+    )
+    return httpx.Client(limits=limits, timeout=httpx.Timeout(600.0, connect=10.0))
+
+
+class TokenBucket:
+    """Token bucket that refills continuously at a per-minute rate."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.available = float(self.capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount):
+        """Block until amount tokens are available, then take them"""
+        amount = min(amount, self.capacity)
+        with self._cond:
+            while True:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                self._cond.wait((amount - self.available) / self.rate)
+
+    def refund(self, amount):
+        """Return tokens that were reserved but not used"""
+        if amount <= 0:
+            return
+        with self._cond:
+            self._refill()
+            self.available = min(self.capacity, self.available + amount)
+            self._cond.notify_all()
+
+
+class AIMDLimiter:
+    """
+    Concurrency limiter with additive increase / multiplicative decrease.
+
+    Each successful call grows the limit by about one slot per window of
+    calls. Each throttled call halves it, so the limit settles just below
+    the point where the deployment starts returning 429s.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=64, decrease_factor=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+def get_status_code(error):
+    """Return the HTTP status code carried by an API error, if any"""
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def get_retry_after(error):
+    """Return the server-requested delay in seconds from Retry-After headers, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        retry_date = email.utils.parsedate_to_datetime(retry_after)
+        return max(0.0, retry_date.timestamp() - time.time()) if retry_date else None
+
+
+def is_retryable(error):
+    """Whether an error is worth retrying: throttling, server errors, timeouts and dropped connections"""
+    status = get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)) or \
+        type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class HeldStream:
+    """
+    Iterator over a streamed reply that holds its request's concurrency slot.
+
+    The slot is given back once, when the stream ends, fails or is closed. A
+    stream that is dropped without being read to the end, or without being
+    read at all, gives it back when it is garbage collected.
+    """
+
+    def __init__(self, stream, on_release):
+        """
+        Args:
+            stream: The stream returned by chat.completions.create
+            on_release (callable): Called once as on_release(used, completion) with the total tokens from
+                the usage chunk (None without one) and the streamed completion text
+        """
+        self._stream = stream
+        self._iterator = None
+        self._on_release = on_release
+        self._used = None
+        self._completion = []
+        self._lock = threading.Lock()
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._released:
+            raise StopIteration
+        try:
+            if self._iterator is None:
+                self._iterator = iter(self._stream)
+            chunk = next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+        usage = getattr(chunk, "usage", None)
+        if usage is not None and usage.total_tokens:
+            self._used = usage.total_tokens
+        for choice in getattr(chunk, "choices", None) or []:
+            delta = getattr(choice, "delta", None)
+            if delta is not None and getattr(delta, "content", None):
+                self._completion.append(delta.content)
+        return chunk
+
+    def close(self):
+        """Stop reading the stream and give back its slot"""
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        close = getattr(self._stream, "close", None)
+        try:
+            if close is not None:
+                close()
+        except Exception as e:
+            logger.debug(f"Closing an LLM stream failed: {str(e)}")
+        finally:
+            self._on_release(self._used, "".join(self._completion))
+
+    def __del__(self):
+        self.close()
+
+
+class RateLimitedClient:
+    """
+    Wraps an OpenAI-compatible client with admission control, retries and adaptive concurrency.
+
+    One instance is shared by every endpoint so all requests draw from the same
+    token and request budgets of the deployment.
+    """
+
+    def __init__(self, client, tokens_per_minute=0, requests_per_minute=0, max_retries=5,
+                 backoff_base=1.0, backoff_max=60.0, limiter=None):
+        """
+        Args:
+            client: An OpenAI or AzureOpenAI client (or anything with chat.completions.create)
+            tokens_per_minute (int): Deployment TPM quota, 0 to disable token admission control
+            requests_per_minute (int): Deployment RPM quota, 0 to disable request admission control
+            max_retries (int): Retries after the first attempt for retryable errors
+            backoff_base (float): Base delay in seconds for exponential backoff
+            backoff_max (float): Upper bound on a single backoff delay in seconds
+            limiter (AIMDLimiter): Concurrency limiter, a default one is created when omitted
+        """
+        self.client = client
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter or AIMDLimiter()
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+    def estimate_prompt_tokens(self, messages):
+        """Estimate the prompt tokens of a request"""
+        return sum(count_tokens(message.get("content") or "") + 4 for message in messages)
+
+    def _backoff(self, attempt, retry_after):
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        # Full jitter keeps retrying callers from synchronising
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def create_chat_completion(self, **kwargs):
+        """
+        Sends a chat completion request, waiting for quota and retrying transient failures.
+
+        Args:
+            **kwargs: Arguments for client.chat.completions.create
+
+        Returns:
+            The chat completion response. With stream=True, a HeldStream over the
+            stream chunks that keeps its concurrency slot until it ends or is closed.
+        """
+        # The quota a request consumes: prompt tokens plus the reserved completion
+        prompt_tokens = self.estimate_prompt_tokens(kwargs.get("messages", []))
+        estimate = prompt_tokens + (kwargs.get("max_tokens") or 0)
+        attempt = 0
+        while True:
+            if self.request_bucket is not None:
+                self.request_bucket.acquire(1)
+            if self.token_bucket is not None:
+                self.token_bucket.acquire(estimate)
+
+            self.limiter.acquire()
+            throttled = False
+            release = True
+            try:
+                self._count("calls")
+                response = self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                # A failed attempt produced no completion; give its reservation back
+                if self.token_bucket is not None:
+                    self.token_bucket.refund(estimate)
+                throttled = get_status_code(e) == 429
+                if throttled:
+                    self._count("throttled")
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._count("failures")
+                    raise
+                delay = self._backoff(attempt, get_retry_after(e))
+                logger.warning(f"LLM request failed ({str(e)}), retry {attempt + 1}/{self.max_retries} "
+                               f"in {delay:.1f}s")
+                attempt += 1
+                self._count("retries")
+                record_retry()
+            else:
+                if kwargs.get("stream"):
+                    # The request is in flight until the stream has been read to the end
+                    release = False
+                    return HeldStream(
+                        response,
+                        lambda used, completion: self._release_stream(estimate, prompt_tokens, used, completion)
+                    )
+                usage = getattr(response, "usage", None)
+                if self.token_bucket is not None and usage is not None:
+                    self.token_bucket.refund(estimate - (usage.total_tokens or 0))
+                return response
+            finally:
+                if release:
+                    self.limiter.release(throttled=throttled)
+            time.sleep(delay)
+
+    def _release_stream(self, estimate, prompt_tokens, used, completion):
+        self.limiter.release()
+        if self.token_bucket is not None:
+            # Without a usage chunk, count what was streamed
+            if used is None:
+                used = prompt_tokens + count_tokens(completion)
+            self.token_bucket.refund(estimate - used)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "concurrencyLimit": round(self.limiter.limit, 2),
+            "inFlight": self.limiter.in_flight,
+            "availableTokens": int(self.token_bucket.available) if self.token_bucket else None,
+            "availableRequests": int(self.request_bucket.available) if self.request_bucket else None
+        }
+
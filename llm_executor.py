@@ -0,0 +1,153 @@
+"""
+Module for running independent LLM calls concurrently.
+"""
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from tracing import run_in_context
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTaskTimeout(Exception):
+    """Raised when a concurrent LLM task does not finish within its timeout."""
+
+
+def run_concurrently(tasks, max_workers=4, timeout=None):
+    """
+    Runs independent tasks on a bounded thread pool and collects their results.
+
+    A failing or timed-out task does not abort the others, so callers can
+    report partial results.
+
+    Args:
+        tasks (dict): Mapping of task name to a zero-argument callable
+        max_workers (int): Maximum number of tasks running at the same time
+        timeout (float): Optional per-task timeout in seconds
+
+    Returns:
+        tuple: (results, errors) dicts keyed by task name
+    """
+    results = {}
+    errors = {}
+    if not tasks:
+        return results, errors
+
+    workers = max(1, min(max_workers, len(tasks)))
+    # Tasks queued behind the worker cap get their own timeout window
+    rounds = -(-len(tasks) // workers)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        started = time.monotonic()
+        # Tasks run in a copy of the caller's context so their spans join the request's trace
+        futures = {name: executor.submit(run_in_context(fn)) for name, fn in tasks.items()}
+        for name, future in futures.items():
+            remaining = None
+            if timeout is not None:
+                remaining = max(0.0, timeout * rounds - (time.monotonic() - started))
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                future.cancel()
+                logger.error(f"Task '{name}' timed out after {timeout} seconds")
+                errors[name] = LLMTaskTimeout(f"{name} timed out after {timeout} seconds")
+            except Exception as e:
+                logger.error(f"Task '{name}' failed: {str(e)}")
+                errors[name] = e
+    finally:
+        # Timed-out calls cannot be interrupted; don't block the request on them
+        executor.shutdown(wait=False)
+
+    logger.info(f"Ran {len(tasks)} tasks concurrently in {time.monotonic() - started:.2f}s "
+                f"({len(errors)} failed)")
+    return results, errors
+
+
+def get_chunk_code(chunk):
+    """Return the source text of a chunk produced by the COBOL chunker"""
+    if isinstance(chunk, dict):
+        return chunk.get("content") or chunk.get("code", "")
+    return chunk
+
+
+def get_chunk_type(chunk):
+    """Return 'declarations' or 'procedures' for a chunk produced by the COBOL chunker"""
+    if isinstance(chunk, dict) and chunk.get("type") in ("declarations", "procedures"):
+        return chunk["type"]
+    if re.search(r"\bPROCEDURE\s+DIVISION\b", get_chunk_code(chunk), re.IGNORECASE):
+        return "procedures"
+    if re.search(r"\b(IDENTIFICATION|ENVIRONMENT|DATA)\s+DIVISION\b|\bPIC(TURE)?\b", get_chunk_code(chunk), re.IGNORECASE):
+        return "declarations"
+    return "procedures"
+
+
+def run_chunk_schedule(chunks, process_chunk, max_workers=4, timeout=None, on_result=None, completed=None):
+    """
+    Converts COBOL chunks concurrently while keeping their ordering constraints.
+
+    Declaration chunks are converted first, in parallel with each other. The
+    procedure chunks that depend on them are then converted in parallel, each
+    given the converted declarations so they use the same names. Results
+    always come back in chunk order so merging stays deterministic.
+
+    Args:
+        chunks (list): Chunks produced by the COBOL chunker
+        process_chunk (callable): Called as process_chunk(code, is_chunk=True, chunk_index=i, total_chunks=n),
+            with declarations=<converted declarations> added for procedure chunks
+        max_workers (int): Maximum number of chunks converted at the same time
+        timeout (float): Optional per-chunk timeout in seconds
+        on_result (callable): Optional callback, called as on_result(chunk_index, result) as each chunk finishes
+        completed (dict): Results already known for some chunks, keyed by chunk index; these chunks are not converted again
+
+    Returns:
+        list: The result for each chunk, in the same order as chunks
+
+    Raises:
+        Exception: The error of the first failing chunk
+    """
+    total_chunks = len(chunks)
+    chunk_types = [get_chunk_type(chunk) for chunk in chunks]
+
+    def run_chunk(i, **kwargs):
+        result = process_chunk(
+            get_chunk_code(chunks[i]), is_chunk=True, chunk_index=i, total_chunks=total_chunks, **kwargs
+        )
+        if on_result is not None:
+            on_result(i, result)
+        return result
+
+    stages = [
+        [i for i, chunk_type in enumerate(chunk_types) if chunk_type == "declarations"],
+        [i for i, chunk_type in enumerate(chunk_types) if chunk_type == "procedures"],
+    ]
+
+    results = [None] * total_chunks
+    for i, result in sorted((completed or {}).items()):
+        results[i] = result
+        if on_result is not None:
+            on_result(i, result)
+    stages = [[i for i in stage if i not in (completed or {})] for stage in stages]
+
+    for stage_index, stage in enumerate(stages):
+        if not stage:
+            continue
+        kwargs = {}
+        if stage_index == 1:
+            kwargs["declarations"] = "\n\n".join(
+                (results[i] or {}).get("convertedCode", "") for i in range(total_chunks)
+                if chunk_types[i] == "declarations"
+            ).strip()
+        logger.info(f"Converting {len(stage)} {chunk_types[stage[0]]} chunks with up to {max_workers} in parallel")
+        stage_results, errors = run_concurrently(
+            {i: (lambda i=i: run_chunk(i, **kwargs)) for i in stage},
+            max_workers=max_workers,
+            timeout=timeout
+        )
+        if errors:
+            raise errors[min(errors)]
+        for i, result in stage_results.items():
+            results[i] = result
+
+    return results
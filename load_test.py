@@ -0,0 +1,249 @@
+"""
+Load test of the serving modes with many conversions waiting on a slow LLM.
+
+Starts serve.py once per SERVER_MODE as a separate process, with the LLM
+pointed at a local fake chat-completions server, keeps a fixed number of
+/api/convert requests in flight and reports throughput, latency percentiles
+and the server's peak memory and thread count.
+
+Example:
+    python load_test.py --modes threaded,gevent --concurrency 300 --requests 900 --latency 2
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import check_app_dependencies, generate_program, percentile
+from fake_llm_server import FakeLLMBehaviour, FakeLLMServer
+
+logger = logging.getLogger(__name__)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_process_status(pid):
+    """Return (resident memory in MB, thread count) of a process from /proc, or (None, None)"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as handle:
+            fields = dict(line.split(":", 1) for line in handle if ":" in line)
+        return int(fields["VmRSS"].split()[0]) / 1024, int(fields["Threads"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+class ProcessSampler:
+    """Samples the peak memory and thread count of a process on a background thread"""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_mb = None
+        self.peak_threads = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss, threads = read_process_status(self.pid)
+            if rss is not None:
+                self.peak_rss_mb = max(self.peak_rss_mb or 0, rss)
+                self.peak_threads = max(self.peak_threads or 0, threads)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def start_server(mode, llm_url, data_dir, concurrency):
+    """Start serve.py in a subprocess and wait until /api/ready reports it warm"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        SERVER_MODE=mode,
+        HOST="127.0.0.1",
+        PORT=str(port),
+        SERVER_MAX_CONNECTIONS=str(concurrency * 2),
+        AZURE_OPENAI_ENDPOINT=llm_url,
+        AZURE_OPENAI_API_KEY="load-test",
+        AZURE_OPENAI_DEPLOYMENT_NAME="load-test",
+        LLM_CACHE_BACKEND="none",
+        # The synthetic program is inside the rule-based subset; measure the LLM path
+        RULE_TRANSLATION_ENABLED="false",
+        # The fake backend's code does not compile, so do not measure repair rounds
+        JAVA_VERIFY_ENABLED="false",
+        # The fake backend has no quotas, so let every request reach it
+        LLM_CONCURRENCY_INITIAL=str(concurrency * 4),
+        LLM_CONCURRENCY_MAX=str(concurrency * 4),
+        LLM_HTTP_MAX_CONNECTIONS=str(concurrency * 4),
+        LLM_HTTP_MAX_KEEPALIVE=str(concurrency * 4),
+        ARTIFACT_STORE_PATH=os.path.join(data_dir, f"{mode}-artifacts.sqlite3"),
+        JOB_STORE_PATH=os.path.join(data_dir, f"{mode}-jobs.sqlite3"),
+        DEDUP_INDEX_PATH=os.path.join(data_dir, f"{mode}-dedup.sqlite3"),
+    )
+    env.pop("AZURE_OPENAI_DEPLOYMENTS", None)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.py")],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py in {mode} mode exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/api/ready", timeout=2) as response:
+                if response.status == 200:
+                    return process, url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"serve.py in {mode} mode did not become ready")
+
+
+def run_load(url, payload, requests, concurrency, timeout):
+    """Send requests with concurrency of them in flight and return (outcomes, elapsed seconds)"""
+    body = json.dumps(payload).encode("utf-8")
+
+    def send(_):
+        started = time.perf_counter()
+        request = urllib.request.Request(f"{url}/api/convert", data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = None
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(send, range(requests)))
+    return outcomes, time.perf_counter() - started
+
+
+def run_mode(mode, behaviour, llm_url, data_dir, requests, concurrency, timeout):
+    """Load test one serving mode and return its measurements"""
+    process, url = start_server(mode, llm_url, data_dir, concurrency)
+    payload = {
+        "sourceLanguage": "COBOL",
+        "targetLanguage": "Java",
+        "sourceCode": generate_program("LOADTEST", 5),
+        "bypassCache": True
+    }
+    try:
+        idle_rss, idle_threads = read_process_status(process.pid)
+        before = behaviour.snapshot()
+        logger.info(f"{mode}: sending {requests} conversions, {concurrency} in flight")
+        with ProcessSampler(process.pid) as sampler:
+            outcomes, elapsed = run_load(url, payload, requests, concurrency, timeout)
+        after = behaviour.snapshot()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    latencies = [latency for latency, status in outcomes if status == 200]
+    return {
+        "mode": mode,
+        "requests": requests,
+        "concurrency": concurrency,
+        "failed": sum(1 for _, status in outcomes if status != 200),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "throughputPerSecond": len(latencies) / elapsed if elapsed else None,
+        "llmCalls": after["requests"] - before["requests"],
+        "idleRssMb": idle_rss,
+        "peakRssMb": sampler.peak_rss_mb,
+        "idleThreads": idle_threads,
+        "peakThreads": sampler.peak_threads
+    }
+
+
+def format_report(results):
+    """Render load test results as a text table, with each mode compared to the first"""
+    header = f"{'mode':<10} {'in flight':>9} {'ok':>6} {'failed':>6} {'p50 s':>7} {'p95 s':>7} {'req/s':>7} " \
+             f"{'peak MB':>8} {'MB/req':>7} {'threads':>8}"
+    rows = [header, "-" * len(header)]
+
+    def number(value, width, digits):
+        return f"{value:{width}.{digits}f}" if value is not None else f"{'-':>{width}}"
+
+    for stats in results:
+        per_request = None
+        if stats["peakRssMb"] is not None and stats["idleRssMb"] is not None:
+            per_request = (stats["peakRssMb"] - stats["idleRssMb"]) / stats["concurrency"]
+        rows.append(
+            f"{stats['mode']:<10} {stats['concurrency']:9d} {stats['requests'] - stats['failed']:6d} "
+            f"{stats['failed']:6d} {number(stats['p50'], 7, 2)} {number(stats['p95'], 7, 2)} "
+            f"{number(stats['throughputPerSecond'], 7, 2)} {number(stats['peakRssMb'], 8, 1)} "
+            f"{number(per_request, 7, 3)} {stats['peakThreads'] if stats['peakThreads'] is not None else '-':>8}"
+        )
+    if len(results) > 1 and results[0]["throughputPerSecond"]:
+        base = results[0]
+        for stats in results[1:]:
+            rows.append(f"{stats['mode']} vs {base['mode']}: "
+                        f"{stats['throughputPerSecond'] / base['throughputPerSecond']:.2f}x throughput"
+                        + (f", {stats['peakRssMb'] / base['peakRssMb']:.2f}x peak memory"
+                           if stats["peakRssMb"] and base["peakRssMb"] else ""))
+    return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the serving modes with many conversions in flight")
+    parser.add_argument("--modes", default="threaded,gevent", help="SERVER_MODE values to compare")
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=200, help="Conversions in flight at the same time")
+    parser.add_argument("--latency", type=float, default=2.0, help="Fake LLM latency per call in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=600.0, help="Client timeout per request in seconds")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    modes = [mode for mode in args.modes.split(",") if mode]
+    try:
+        check_app_dependencies(["gevent"] if "gevent" in modes else [])
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+
+    behaviour = FakeLLMBehaviour(latency=args.latency, jitter=args.jitter)
+    server = FakeLLMServer(behaviour).start()
+    data_dir = tempfile.mkdtemp(prefix="cobol-load-")
+    results = []
+    try:
+        for mode in modes:
+            results.append(run_mode(mode, behaviour, server.url, data_dir, args.requests, args.concurrency,
+                                    args.timeout))
+    finally:
+        server.stop()
+
+    print(format_report(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,137 @@
 """
 Module for generating prompts for code analysis and conversion.
-"""
-
-def create_business_requirements_prompt(source_language, source_code, vsam_definition=""):
-    """
-    Creates a prompt for analyzing business requirements from source code.
-    
-    Args:
-        source_language (str): The programming language of the source code
-        source_code (str): The source code to analyze
-        vsam_definition (str): Optional VSAM file definition
-        
-    Returns:
-        str: The prompt for business requirements analysis
-    """
-    vsam_section = ""
-    if vsam_definition:
-        vsam_section = f"""
-        VSAM Definition:
-        {vsam_definition}
-        """
 
+Every prompt is a compiled static part followed by the request's own content.
+The static part depends only on the languages, chunk type and database
+template; it is rendered once per combination and cached, and placed first
+so requests that share it send an identical prefix the provider's prompt
+caching can reuse. Source code, requirements and definitions come after it.
+"""
+import functools
+
+# Bump when the wording of any template changes; it is part of every LLM cache key and chunk fingerprint
+PROMPT_TEMPLATE_VERSION = "3"
+
+TEMPLATE_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def create_business_requirements_system_message(source_language):
+    """Return the system message of the business requirements analysis"""
+    return (
+        f"You are an expert in analyzing legacy code to extract business requirements. "
+        f"You understand {source_language} deeply and can identify business rules and processes in the code. "
+        f"Output your analysis in JSON format with the following structure:\n\n"
+        f"{{\n"
+        f'  "Overview": {{\n'
+        f'    "Purpose of the System": "Describe the system\'s primary function and how it fits into the business.",\n'
+        f'    "Context and Business Impact": "Explain the operational context and value the system provides."\n'
+        f'  }},\n'
+        f'  "Objectives": {{\n'
+        f'    "Primary Objective": "Clearly state the system\'s main goal.",\n'
+        f'    "Key Outcomes": "Outline expected results (e.g., improved processing speed, customer satisfaction)."\n'
+        f'  }},\n'
+        f'  "Business Rules & Requirements": {{\n'
+        f'    "Business Purpose": "Explain the business objective behind this specific module or logic.",\n'
+        f'    "Business Rules": "List the inferred rules/conditions the system enforces.",\n'
+        f'    "Impact on System": "Describe how this part affects the system\'s overall operation.",\n'
+        f'    "Constraints": "Note any business limitations or operational restrictions."\n'
+        f'  }},\n'
+        f'  "Assumptions & Recommendations": {{\n'
+        f'    "Assumptions": "Describe what is presumed about data, processes, or environment.",\n'
+        f'    "Recommendations": "Suggest enhancements or modernization directions."\n'
+        f'  }},\n'
+        f'  "Expected Output": {{\n'
+        f'    "Output": "Describe the main outputs (e.g., reports, logs, updates).",\n'
+        f'    "Business Significance": "Explain why these outputs matter for business processes."\n'
+        f'  }}\n'
+        f"}}"
+    )
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def create_technical_requirements_system_message(source_language, target_language):
+    """Return the system message of the technical requirements analysis"""
+    return (
+        f"You are an expert in {source_language} to {target_language} migration. "
+        f"You deeply understand both languages and can identify technical challenges and requirements for migration. "
+        f"Output your analysis in JSON format with the following structure:\n"
+        f"{{\n"
+        f'  "technicalRequirements": [\n'
+        f'    {{"id": "TR1", "description": "First technical requirement", "complexity": "High/Medium/Low"}},\n'
+        f'    {{"id": "TR2", "description": "Second technical requirement", "complexity": "High/Medium/Low"}}\n'
+        f'  ]\n'
+        f"}}"
+    )
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def create_code_conversion_system_message(source_language, target_language):
+    """Return the system message of code conversion"""
+    return (
+        f"You are an expert code converter assistant specializing in {source_language} to {target_language} migration. "
+        f"You convert legacy code to modern, idiomatic code while maintaining all business logic. "
+        f"Only include database setup/initialization if the original code uses databases or SQL. "
+        f"For simple algorithms or calculations without database operations, don't add any database code. "
+        f"Return your response in JSON format always with the following structure:\n"
+        f"{{\n"
+        f'  "convertedCode": "The complete converted code here",\n'
+        f'  "conversionNotes": "Notes about the conversion process",\n'
+        f'  "potentialIssues": ["List of any potential issues or limitations"],\n'
+        f'  "databaseUsed": true/false\n'
+        f"}}"
+    )
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def create_unit_test_system_message(target_language):
+    """Return the system message of unit test generation"""
+    return (
+        f"You are an expert test engineer specializing in writing unit tests for {target_language}. "
+        f"You create comprehensive unit tests that verify all business logic and edge cases. "
+        f"Return your response in JSON format with the following structure:\n"
+        f"{{\n"
+        f'  "unitTestCode": "The complete unit test code here",\n'
+        f'  "testDescription": "Description of the test strategy",\n'
+        f'  "coverage": ["List of functionalities covered by the tests"]\n'
+        f"}}"
+    )
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def create_functional_test_system_message(target_language):
+    """Return the system message of functional test generation"""
+    return (
+        f"You are an expert QA engineer specializing in creating functional tests for {target_language} applications. "
+        f"You create comprehensive test scenarios that verify the application meets all business requirements. "
+        f"Focus on user journey tests and acceptance criteria. "
+        f"Return your response in JSON format with the following structure:\n"
+        f"{{\n"
+        f'  "functionalTests": [\n'
+        f'    {{"id": "FT1", "title": "Test scenario title", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}},\n'
+        f'    {{"id": "FT2", "title": "Another test scenario", "steps": ["Step 1", "Step 2"], "expectedResult": "Expected outcome"}}\n'
+        f'  ],\n'
+        f'  "testStrategy": "Description of the overall testing approach"\n'
+        f"}}"
+    )
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def create_code_repair_system_message(target_language):
+    """Return the system message of compiler error repair"""
+    return (
+        f"You are an expert {target_language} developer who fixes compiler errors in converted code. "
+        f"You change only what is needed to make the code compile and keep its behavior, names and structure. "
+        f"Return your response in JSON format always with the following structure:\n"
+        f"{{\n"
+        f'  "repairedCode": "The complete corrected code here",\n'
+        f'  "repairNotes": "Notes about what was changed"\n'
+        f"}}"
+    )
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _business_requirements_template(source_language):
     return f"""
             You are a business analyst responsible for analyzing and documenting the business requirements from the following {source_language} code and VSAM definition. Your task is to interpret the code's intent and extract meaningful business logic suitable for non-technical stakeholders.
 
@@ -38,162 +149,151 @@ def create_business_requirements_prompt(source_language, source_code, vsam_defin
             ### Structure your output into these 5 sections:
 
             # Overview
-            ## Purpose of the System  
+            ## Purpose of the System
             ### Describe the system's primary function and how it fits into the business.
-            ## Context and Business Impact  
+            ## Context and Business Impact
             ### Explain the operational context and value the system provides.
 
             # Objectives
-            ## Primary Objective  
+            ## Primary Objective
             ### Clearly state the system's main goal.
-            ## Key Outcomes  
+            ## Key Outcomes
             ### Outline expected results (e.g., improved processing speed, customer satisfaction).
 
             # Business Rules & Requirements
-            ## Business Purpose  
+            ## Business Purpose
             ### Explain the business objective behind this specific module or logic.
-            ## Business Rules  
+            ## Business Rules
             ### List the inferred rules/conditions the system enforces.
-            ## Impact on System  
+            ## Impact on System
             ### Describe how this part affects the system's overall operation.
-            ## Constraints  
+            ## Constraints
             ### Note any business limitations or operational restrictions.
 
             # Assumptions & Recommendations
-            - Assumptions  
+            - Assumptions
             ### Describe what is presumed about data, processes, or environment.
-            - Recommendations  
+            - Recommendations
             ### Suggest enhancements or modernization directions.
 
             # Expected Output
-            ## Output  
+            ## Output
             ### Describe the main outputs (e.g., reports, logs, updates).
-            ## Business Significance  
+            ## Business Significance
             ### Explain why these outputs matter for business processes.
-            
 
-            {source_language} Code:
-            {source_code}
 
-            {vsam_section}
+            {source_language} Code:
             """
 
-def create_technical_requirements_prompt(source_language, target_language, source_code, vsam_definition=""):
+
+def create_business_requirements_prompt(source_language, source_code, vsam_definition=""):
     """
-    Creates a prompt for analyzing technical requirements from source code.
-    
+    Creates a prompt for analyzing business requirements from source code.
+
     Args:
         source_language (str): The programming language of the source code
-        target_language (str): The target programming language for conversion
         source_code (str): The source code to analyze
         vsam_definition (str): Optional VSAM file definition
-        
+
     Returns:
-        str: The prompt for technical requirements analysis
+        str: The prompt for business requirements analysis
     """
     vsam_section = ""
     if vsam_definition:
         vsam_section = f"""
         VSAM Definition:
         {vsam_definition}
-
-        Additional Requirements for VSAM:
-        - Analyze VSAM file structures and access methods
-        - Map VSAM record layouts to appropriate database tables or data structures
-        - Consider VSAM-specific operations (KSDS, RRDS, ESDS) and their equivalents
-        - Plan for data migration from VSAM to modern storage
         """
 
+    return f"""{_business_requirements_template(source_language)}{source_code}
+
+            {vsam_section}
+            """
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _technical_requirements_template(source_language, target_language):
     return f"""
             Analyze the following {source_language} code and extract the technical requirements for migrating it to {target_language}.
             Do not use any Markdown formatting (e.g., no **bold**, italics, or backticks).
             Return plain text only.
 
             **Focus on implementation details such as:**
-            "1. Examine the entire codebase first to understand architectural patterns and dependencies.\n"
-            "2. Analyze code in logical sections, mapping technical components to system functions.\n"
-            "3. For each M204 or COBOL-specific construct, identify the exact technical requirement it represents.\n"
-            "4. Document all technical constraints, dependencies, and integration points.\n"
-            "5. Pay special attention to error handling, transaction management, and data access patterns.\n\n"
-            "kindat each requirement as 'The system must [specific technical capability]' or 'The system should [specific technical capability]' with direct traceability to code sections.\n\n"
-            "Ensure your output captures ALL technical requirements including:\n"
-            "- Data structure definitions and relationships\n"
-            "- Processing algorithms and computation logic\n"
-            "- I/O operations and file handling\n"
-            "- Error handling and recovery mechanisms\n"
-            "- Performance considerations and optimizations\n"
-            "- Security controls and access management\n"
-            "- Integration protocols and external system interfaces\n"
-            "- Database Interactions and equivalent in target language\n"
-            "- VSAM file structures and their modern equivalents\n"
+            "1. Examine the entire codebase first to understand architectural patterns and dependencies.\\n"
+            "2. Analyze code in logical sections, mapping technical components to system functions.\\n"
+            "3. For each M204 or COBOL-specific construct, identify the exact technical requirement it represents.\\n"
+            "4. Document all technical constraints, dependencies, and integration points.\\n"
+            "5. Pay special attention to error handling, transaction management, and data access patterns.\\n\\n"
+            "kindat each requirement as 'The system must [specific technical capability]' or 'The system should [specific technical capability]' with direct traceability to code sections.\\n\\n"
+            "Ensure your output captures ALL technical requirements including:\\n"
+            "- Data structure definitions and relationships\\n"
+            "- Processing algorithms and computation logic\\n"
+            "- I/O operations and file handling\\n"
+            "- Error handling and recovery mechanisms\\n"
+            "- Performance considerations and optimizations\\n"
+            "- Security controls and access management\\n"
+            "- Integration protocols and external system interfaces\\n"
+            "- Database Interactions and equivalent in target language\\n"
+            "- VSAM file structures and their modern equivalents\\n"
 
 
             Format your response as a numbered list with '# Technical Requirements' as the title.
             Each requirement should start with a number followed by a period (e.g., "1.", "2.", etc.)
 
             {source_language} Code:
-            {source_code}
+            """
 
-            {vsam_section}
-             """
 
-def create_code_conversion_prompt(
-    source_language,
-    target_language,
-    source_code,
-    business_requirements,
-    technical_requirements,
-    db_setup_template,
-    vsam_definition="",
-    is_chunk=False,
-    chunk_type=None
-):
+def create_technical_requirements_prompt(source_language, target_language, source_code, vsam_definition=""):
     """
-    Creates a prompt for converting code from one language to another.
-    Supports chunked COBOL code for declarations and procedures.
+    Creates a prompt for analyzing technical requirements from source code.
 
     Args:
         source_language (str): The programming language of the source code
         target_language (str): The target programming language for conversion
-        source_code (str): The source code to convert
-        business_requirements (str): The business requirements extracted from analysis
-        technical_requirements (str): The technical requirements extracted from analysis
-        db_setup_template (str): The database setup template for the target language
+        source_code (str): The source code to analyze
         vsam_definition (str): Optional VSAM file definition
-        is_chunk (bool): Whether the code is a chunk of a larger COBOL program
-        chunk_type (str): Type of chunk ('declarations' or 'procedures') for COBOL
 
     Returns:
-        str: The prompt for code conversion
-
-    Raises:
-        ValueError: If chunk_type is invalid when is_chunk is True
+        str: The prompt for technical requirements analysis
     """
     vsam_section = ""
     if vsam_definition:
         vsam_section = f"""
-        **VSAM Definition:**
+        VSAM Definition:
         {vsam_definition}
 
-        **VSAM-Specific Instructions:**
-        - Convert VSAM file structures to appropriate database tables or data structures
-        - Map VSAM operations to equivalent database operations
-        - Maintain VSAM-like functionality (KSDS, RRDS, ESDS) using modern storage
-        - Ensure data integrity and transaction management
+        Additional Requirements for VSAM:
+        - Analyze VSAM file structures and access methods
+        - Map VSAM record layouts to appropriate database tables or data structures
+        - Consider VSAM-specific operations (KSDS, RRDS, ESDS) and their equivalents
+        - Plan for data migration from VSAM to modern storage
         """
 
-    base_prompt = f"""
+    return f"""{_technical_requirements_template(source_language, target_language)}{source_code}
+
+            {vsam_section}
+             """
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _code_conversion_template(source_language, target_language, chunk_type, db_setup_template):
+    """
+    Renders the static part of a conversion prompt.
+
+    Raises:
+        ValueError: If chunk_type is not None, 'declarations' or 'procedures'
+    """
+    template = f"""
         **Important- Please ensure that the {source_language} code is translated into its exact equivalent in {target_language}, without missing any part of the logic or functionality.**
     Convert the following {source_language} code to {target_language} while strictly adhering to the provided business and technical requirements.
 
     **Source Language:** {source_language}
     **Target Language:** {target_language}
-
-    {vsam_section}
     """
-    if is_chunk and source_language.upper() == "COBOL":
-        if chunk_type == "declarations":
-            base_prompt += f"""
+    if chunk_type == "declarations":
+        template += f"""
     **Chunk Type:** Declarations (Identification, Environment, and Data Divisions)
     **Instructions for Declarations Chunk:**
     - Focus on converting COBOL data structures, file definitions, and variable declarations to {target_language}.
@@ -201,18 +301,18 @@ def create_code_conversion_prompt(
     - Do not include method implementations, as the Procedure Division will be converted separately.
     - Ensure the output is a valid {target_language} class or module with all necessary fields and structures.
     """
-        elif chunk_type == "procedures":
-            base_prompt += f"""
+    elif chunk_type == "procedures":
+        template += f"""
     **Chunk Type:** Procedures (Procedure Division)
     **Instructions for Procedures Chunk:**
     - Focus on converting COBOL business logic and procedures to {target_language} methods or functions.
     - Assume the data structures and declarations are already converted and available in {target_language}.
     - Generate only the method implementations and related logic, ensuring they integrate with the previously converted declarations.
     """
-        else:
-            raise ValueError(f"Invalid chunk_type: {chunk_type}. Must be 'declarations' or 'procedures'.")
+    elif chunk_type is not None:
+        raise ValueError(f"Invalid chunk_type: {chunk_type}. Must be 'declarations' or 'procedures'.")
 
-    base_prompt += f"""
+    template += f"""
     **Requirements:**
     - The output should be a complete, executable implementation in the target language
     - Maintain all business logic, functionality, and behavior of the original code
@@ -221,6 +321,7 @@ def create_code_conversion_prompt(
     - Ensure consistent data handling, formatting, and computations
     - DO NOT include markdown code blocks (like ```java or ```) in your response, just provide the raw code
     - Do not return any unwanted code in {target_language} or functions which are not in {source_language}.
+    - Only include database initialization code if the source {source_language} code contains database or SQL operations. If the code is a simple algorithm (like sorting, calculation, etc.) without any database interaction, do NOT include any database setup code in the converted {target_language} code.
 
     **Language-Specific Instructions:**
     - If converting to Java: Produce a fully functional and idiomatic Java implementation with appropriate class structures
@@ -233,44 +334,163 @@ def create_code_conversion_prompt(
     - Follow this example format for database initialization and setup:
 
     {db_setup_template if db_setup_template else 'No database setup required.'}
+    """
+    return template
+
+
+def create_code_conversion_prompt(
+    source_language,
+    target_language,
+    source_code,
+    business_requirements,
+    technical_requirements,
+    db_setup_template,
+    vsam_definition="",
+    is_chunk=False,
+    chunk_type=None,
+    data_context="",
+    chunk_index=None,
+    total_chunks=None,
+    converted_declarations=""
+):
+    """
+    Creates a prompt for converting code from one language to another.
+    Supports chunked COBOL code for declarations and procedures.
+
+    Args:
+        source_language (str): The programming language of the source code
+        target_language (str): The target programming language for conversion
+        source_code (str): The source code to convert
+        business_requirements (str): The business requirements extracted from analysis
+        technical_requirements (str): The technical requirements extracted from analysis
+        db_setup_template (str): The database setup template for the target language
+        vsam_definition (str): Optional VSAM file definition
+        is_chunk (bool): Whether the code is a chunk of a larger COBOL program
+        chunk_type (str): Type of chunk ('declarations' or 'procedures') for COBOL
+        data_context (str): Optional data items referenced by a procedures chunk
+        chunk_index (int): Optional zero-based position of the chunk, stated after the code
+        total_chunks (int): Number of chunks of the program, used with chunk_index
+        converted_declarations (str): Optional converted code of the declarations chunks, for a procedures chunk
+
+    Returns:
+        str: The prompt for code conversion
 
+    Raises:
+        ValueError: If chunk_type is invalid when is_chunk is True
+    """
+    chunked = is_chunk and source_language.upper() == "COBOL"
+    prompt = _code_conversion_template(
+        source_language, target_language, chunk_type if chunked else None, db_setup_template or ""
+    )
+
+    if vsam_definition:
+        prompt += f"""
+        **VSAM Definition:**
+        {vsam_definition}
+
+        **VSAM-Specific Instructions:**
+        - Convert VSAM file structures to appropriate database tables or data structures
+        - Map VSAM operations to equivalent database operations
+        - Maintain VSAM-like functionality (KSDS, RRDS, ESDS) using modern storage
+        - Ensure data integrity and transaction management
+        """
+
+    prompt += f"""
     **Business Requirements:**
     {business_requirements if business_requirements else 'None provided.'}
 
     **Technical Requirements:**
     {technical_requirements if technical_requirements else 'None provided.'}
+    """
+
+    if chunked and chunk_type == "procedures" and data_context:
+        prompt += f"""
+    **Referenced Data Definitions (for reference only, do not redeclare):**
+    {data_context}
+    """
 
+    if chunked and chunk_type == "procedures" and converted_declarations:
+        prompt += f"""
+    **Converted Declarations ({target_language}, use these names and do not redeclare):**
+    {converted_declarations}
+    """
+
+    prompt += f"""
     **Source Code ({source_language}):**
     {source_code}
 
     IMPORTANT: Only return the complete converted code WITHOUT any markdown formatting. DO NOT wrap your code in triple backticks (```). Return just the raw code itself.
     """
 
-    return base_prompt
+    if is_chunk and chunk_index is not None:
+        prompt += f"\n\nIMPORTANT: This is chunk {chunk_index+1} of {total_chunks} from a larger COBOL program. " \
+                  f"Only convert this specific portion while maintaining awareness that it's part of a larger system."
+
+    return prompt
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _code_repair_template(target_language):
+    return f"""
+    The {target_language} code below does not compile. Fix the compiler errors listed after it.
+
+    **Instructions:**
+    - Return the complete corrected code, not only the changed lines
+    - Change only what is needed to fix the errors; keep the logic, method names and field names as they are
+    - Code given for reference is already correct and is compiled together with this code; use its names and do not repeat it
+    - DO NOT include markdown code blocks (like ```java or ```) in your response, just provide the raw code
+    """
+
 
+def create_code_repair_prompt(target_language, code, compiler_errors, original_code="", original_language="",
+                              reference_code=""):
+    """
+    Creates a prompt for fixing the compiler errors of one piece of converted code.
 
+    Args:
+        target_language (str): The language of the code
+        code (str): The code that does not compile, usually a single conversion chunk
+        compiler_errors (str): The compiler errors, with line numbers relative to the code
+        original_code (str): Optional source the code was converted from
+        original_language (str): The language of original_code
+        reference_code (str): Optional code compiled together with this code, such as the converted declarations
 
-def create_unit_test_prompt(target_language, converted_code, business_requirements, technical_requirements):
-    """Create a prompt for generating unit tests for the converted code"""
-    
-    prompt = f"""
+    Returns:
+        str: The prompt for the repair
+    """
+    prompt = _code_repair_template(target_language)
+
+    if original_code:
+        prompt += f"""
+    **Original {original_language} Code:**
+    {original_code}
+    """
+
+    if reference_code:
+        prompt += f"""
+    **Reference Code ({target_language}, do not repeat):**
+    {reference_code}
+    """
+
+    prompt += f"""
+    **Code to Fix ({target_language}):**
+    {code}
+
+    **Compiler Errors:**
+    {compiler_errors}
+    """
+
+    return prompt
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _unit_test_template(target_language):
+    return f"""
     You are tasked with creating comprehensive unit tests for newly converted {target_language} code.
-    
-    Please generate unit tests for the following {target_language} code. The tests should verify that 
+
+    Please generate unit tests for the {target_language} code below. The tests should verify that
     the code meets all business requirements and handles edge cases appropriately.
-    
-    Business Requirements:
-    {business_requirements}
-    
-    Technical Requirements:
-    {technical_requirements}
-    
-    Converted Code ({target_language}):
-    
-    ```
-    {converted_code}
-    ```
-    
+
     Guidelines for the unit tests:
     1. Use appropriate unit testing framework for {target_language} (e.g., JUnit for Java, NUnit/xUnit for C#)
     2. Create tests for all public methods and key functionality
@@ -280,32 +500,40 @@ def create_unit_test_prompt(target_language, converted_code, business_requiremen
     6. Include setup and teardown as needed
     7. Add comments explaining complex test scenarios
     8. Ensure high code coverage, especially for complex business logic
-    
+
     Provide ONLY the unit test code without additional explanations.
     """
-    
-    return prompt
 
 
-def create_functional_test_prompt(target_language, converted_code, business_requirements):
-    """Create a prompt for generating functional test cases based on business requirements"""
-    
-    prompt = f"""
-    You are tasked with creating functional test cases for a newly converted {target_language} application.
-    Give response of functional tests in numeric plain text numbering.
-    
-    Please generate comprehensive functional test cases that verify the application meets all business requirements.
-    These test cases will be used by QA engineers to validate the application functionality.
-    
+def create_unit_test_prompt(target_language, converted_code, business_requirements, technical_requirements):
+    """Create a prompt for generating unit tests for the converted code"""
+
+    prompt = f"""{_unit_test_template(target_language)}
     Business Requirements:
     {business_requirements}
-    
+
+    Technical Requirements:
+    {technical_requirements}
+
     Converted Code ({target_language}):
-    
+
     ```
     {converted_code}
     ```
-    
+    """
+
+    return prompt
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _functional_test_template(target_language):
+    return f"""
+    You are tasked with creating functional test cases for a newly converted {target_language} application.
+    Give response of functional tests in numeric plain text numbering.
+
+    Please generate comprehensive functional test cases that verify the application below meets all business requirements.
+    These test cases will be used by QA engineers to validate the application functionality.
+
     Guidelines for functional test cases:
     1. Create test cases that cover all business requirements
     2. Organize test cases by feature or business functionality
@@ -319,9 +547,78 @@ def create_functional_test_prompt(target_language, converted_code, business_requ
     4. Include both positive and negative test scenarios
     5. Include test cases for boundary conditions and edge cases
     6. Create end-to-end test scenarios that cover complete business processes
-    
+
     Format your response as a structured test plan document with clear sections and test case tables.
     Return the response in JSON FORMAT
     """
-    
-    return prompt
\ No newline at end of file
+
+
+def create_functional_test_prompt(target_language, converted_code, business_requirements):
+    """Create a prompt for generating functional test cases based on business requirements"""
+
+    prompt = f"""{_functional_test_template(target_language)}
+    Business Requirements:
+    {business_requirements}
+
+    Converted Code ({target_language}):
+
+    ```
+    {converted_code}
+    ```
+    """
+
+    return prompt
+
+
+TEMPLATES = [
+    create_business_requirements_system_message,
+    create_technical_requirements_system_message,
+    create_code_conversion_system_message,
+    create_unit_test_system_message,
+    create_functional_test_system_message,
+    create_code_repair_system_message,
+    _business_requirements_template,
+    _technical_requirements_template,
+    _code_conversion_template,
+    _unit_test_template,
+    _functional_test_template,
+    _code_repair_template,
+]
+
+
+def precompile_templates(source_language, target_languages, db_setup_templates=None):
+    """
+    Renders the static parts of every prompt for the given languages ahead of the first request.
+
+    Args:
+        source_language (str): The source language, such as 'COBOL'
+        target_languages (list): Target languages to compile for
+        db_setup_templates (dict): Optional database setup template per target language
+    """
+    db_setup_templates = db_setup_templates or {}
+    create_business_requirements_system_message(source_language)
+    _business_requirements_template(source_language)
+    for target_language in target_languages:
+        create_technical_requirements_system_message(source_language, target_language)
+        create_code_conversion_system_message(source_language, target_language)
+        create_unit_test_system_message(target_language)
+        create_functional_test_system_message(target_language)
+        _technical_requirements_template(source_language, target_language)
+        _unit_test_template(target_language)
+        _functional_test_template(target_language)
+        create_code_repair_system_message(target_language)
+        _code_repair_template(target_language)
+        for db_setup_template in {"", db_setup_templates.get(target_language) or ""}:
+            for chunk_type in (None, "declarations", "procedures"):
+                _code_conversion_template(source_language, target_language, chunk_type, db_setup_template)
+
+
+def template_stats():
+    """Return hit and miss counts of the compiled template caches"""
+    stats = {"version": PROMPT_TEMPLATE_VERSION, "hits": 0, "misses": 0, "compiled": 0}
+    for template in TEMPLATES:
+        info = template.cache_info()
+        stats["hits"] += info.hits
+        stats["misses"] += info.misses
+        stats["compiled"] += info.currsize
+    return stats
@@ -0,0 +1,1704 @@
+"""
+Module for translating a well-defined subset of COBOL to Java or C# without the LLM.
+
+The subset covers elementary PIC X/A/9 data items (DISPLAY and binary or
+packed usages), level-88 condition names, group records, sequential files,
+MOVE, INITIALIZE, SET ... TO TRUE, the arithmetic verbs and COMPUTE, IF,
+PERFORM (out-of-line, THRU, TIMES, UNTIL, VARYING and inline), DISPLAY,
+OPEN, CLOSE, READ, WRITE, EXIT, CONTINUE, STOP RUN and GOBACK. Numeric items
+become BigDecimal (Java) or decimal (C#) fields and every store applies the
+item's PICTURE: digits beyond it are truncated, as COBOL does.
+
+A paragraph is translated only if every statement in it is inside the
+subset; anything else (EVALUATE, GO TO, OCCURS tables, edited pictures,
+ON SIZE ERROR, ...) is left to the LLM and counted in the coverage report.
+"""
+import json
+import logging
+import re
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from cobol_parser import PARAGRAPH_HEADER, SECTION_HEADER, is_fixed_format
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_TARGETS = {"JAVA": "Java", "C#": "C#", "CSHARP": "C#"}
+
+TOKEN = re.compile(
+    r"(?P<str>'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")"
+    r"|(?P<num>[+-]?(?:\d+\.\d+|\.\d+|\d+)(?![A-Z0-9-]))"
+    r"|(?P<word>[A-Z0-9][A-Z0-9-]*[A-Z0-9]|[A-Z0-9])"
+    r"|(?P<op>\*\*|>=|<=|[-+*/=<>()])"
+    r"|(?P<period>\.)"
+    r"|(?P<sep>[,;])"
+    r"|(?P<other>\S)",
+    re.IGNORECASE
+)
+PROGRAM_ID = re.compile(r"\bPROGRAM-ID\s*\.?\s*['\"]?([A-Z0-9][A-Z0-9-]*)", re.IGNORECASE)
+
+VERBS = {
+    "ACCEPT", "ADD", "ALTER", "CALL", "CANCEL", "CLOSE", "COMPUTE", "CONTINUE", "DELETE", "DISPLAY", "DIVIDE",
+    "ENTRY", "EVALUATE", "EXEC", "EXIT", "GO", "GOBACK", "IF", "INITIALIZE", "INSPECT", "MERGE", "MOVE",
+    "MULTIPLY", "NEXT", "OPEN", "PERFORM", "READ", "RELEASE", "RETURN", "REWRITE", "SEARCH", "SET", "SORT",
+    "START", "STOP", "STRING", "SUBTRACT", "UNSTRING", "WRITE",
+}
+KEYWORDS = VERBS | {
+    "ADVANCING", "AFTER", "AND", "AT", "BEFORE", "BY", "CORR", "CORRESPONDING", "ELSE", "END", "EQUAL",
+    "ERROR", "EXTEND", "FROM", "GIVING", "GREATER", "I-O", "IN", "INPUT", "INTO", "INVALID", "IS", "LESS",
+    "NO", "NOT", "OF", "ON", "OR", "OUTPUT", "REMAINDER", "ROUNDED", "SIZE", "TEST", "THAN", "THEN", "THROUGH",
+    "THRU", "TIMES", "TO", "TRUE", "UNTIL", "UPON", "USING", "VARYING", "WITH", "FALSE", "FUNCTION",
+}
+ZERO_WORDS = {"ZERO", "ZEROS", "ZEROES"}
+SPACE_WORDS = {"SPACE", "SPACES"}
+BINARY_USAGES = {"COMP", "COMP-3", "COMP-4", "COMP-5", "COMPUTATIONAL", "COMPUTATIONAL-3", "BINARY",
+                 "PACKED-DECIMAL"}
+RESERVED_NAMES = {
+    "abstract", "assert", "boolean", "break", "byte", "case", "catch", "char", "class", "const", "continue",
+    "decimal", "default", "do", "double", "else", "enum", "event", "extends", "final", "finally", "float",
+    "for", "goto", "if", "implements", "import", "in", "int", "interface", "internal", "is", "lock", "long",
+    "namespace", "native", "new", "null", "object", "out", "override", "package", "params", "private",
+    "protected", "public", "record", "ref", "return", "short", "static", "string", "super", "switch",
+    "this", "throw", "throws", "try", "var", "void", "volatile", "while", "run", "main",
+}
+
+
+class UnsupportedConstruct(Exception):
+    """Raised when a data item or statement is outside the translatable subset"""
+
+    def __init__(self, construct, detail=""):
+        super().__init__(f"{construct} ({detail})" if detail else construct)
+        self.construct = construct
+
+
+def _name_words(name):
+    return [part for part in re.split(r"[-_\s]+", name.lower()) if part]
+
+
+def camel_case(name):
+    words = _name_words(name) or ["item"]
+    result = words[0] + "".join(word.capitalize() for word in words[1:])
+    if result[0].isdigit():
+        result = "n" + result
+    return result + "_" if result in RESERVED_NAMES else result
+
+
+def pascal_case(name):
+    words = _name_words(name) or ["item"]
+    result = "".join(word.capitalize() for word in words)
+    if result[0].isdigit():
+        result = "N" + result
+    return result + "_" if result.lower() in RESERVED_NAMES else result
+
+
+def parse_picture(picture):
+    """
+    Classifies a PICTURE string.
+
+    Returns:
+        tuple: ('text', length, 0, 0, False) or ('number', length, integer digits, scale, signed)
+
+    Raises:
+        UnsupportedConstruct: For edited, floating-insertion or scaling (P) pictures
+    """
+    expanded = re.sub(r"(.)\((\d+)\)", lambda match: match.group(1) * int(match.group(2)), picture.upper())
+    if re.fullmatch(r"[XA9]+", expanded) and set(expanded) & {"X", "A"}:
+        return "text", len(expanded), 0, 0, False
+    match = re.fullmatch(r"(S?)(9*)(?:V(9*))?", expanded)
+    if match and (match.group(2) or match.group(3)):
+        integer_digits = len(match.group(2))
+        scale = len(match.group(3) or "")
+        return "number", integer_digits + scale, integer_digits, scale, bool(match.group(1))
+    raise UnsupportedConstruct("edited PICTURE", picture)
+
+
+def tokenize(text):
+    """Split COBOL statement text into (kind, value) tokens; words are upper-cased"""
+    tokens = []
+    for match in TOKEN.finditer(text):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "sep":
+            continue
+        if kind == "word":
+            value = value.upper()
+        elif kind == "str":
+            value = value[1:-1].replace(value[0] * 2, value[0])
+        tokens.append((kind, value))
+    return tokens
+
+
+def parse_literal(raw):
+    """Return (kind, value) for the first literal of a VALUE clause"""
+    tokens = tokenize(raw or "")
+    if not tokens:
+        raise UnsupportedConstruct("VALUE clause", raw)
+    kind, value = tokens[0]
+    if kind == "str":
+        return "text", value
+    if kind == "num":
+        return "number", value
+    if kind == "word" and value in ZERO_WORDS:
+        return "zero", None
+    if kind == "word" and value in SPACE_WORDS:
+        return "space", None
+    raise UnsupportedConstruct("VALUE clause", raw)
+
+
+class Field:
+    """A data item of the program and the variable it becomes"""
+
+    def __init__(self, item, name):
+        self.item = item
+        self.cobol_name = item["name"]
+        self.name = name
+        self.kind = "group"
+        self.length = 0
+        self.integer_digits = 0
+        self.scale = 0
+        self.signed = False
+        self.binary = False
+        self.value = None
+        self.children = []
+        self.layout = None
+
+    @property
+    def is_number(self):
+        return self.kind == "number"
+
+
+class Value:
+    """A translated operand or expression: its kind ('number', 'text', 'group', 'zero', 'space') and code"""
+
+    def __init__(self, kind, code=None, field=None, literal=None):
+        self.kind = kind
+        self.code = code
+        self.field = field
+        self.literal = literal
+
+
+class JavaEmitter:
+    """Java spellings of the translated constructs"""
+
+    language = "Java"
+    number_type = "BigDecimal"
+    text_type = "String"
+
+    def method_name(self, name):
+        return camel_case(name)
+
+    def block(self, header, body):
+        return [(0, f"{header} {{")] + [(level + 1, text) for level, text in body] + [(0, "}")]
+
+    def if_else(self, condition, then_body, else_body):
+        lines = self.block(f"if ({condition})", then_body)
+        if else_body:
+            lines = lines[:-1] + [(0, "} else {")] + [(level + 1, text) for level, text in else_body] + [(0, "}")]
+        return lines
+
+    def do_while(self, body, condition):
+        return [(0, "do {")] + [(level + 1, text) for level, text in body] + [(0, f"}} while ({condition});")]
+
+    def number_literal(self, text):
+        return f"new BigDecimal(\"{text}\")"
+
+    def zero(self):
+        return "BigDecimal.ZERO"
+
+    def arithmetic(self, operator, left, right):
+        if operator == "+":
+            return f"{left}.add({right})"
+        if operator == "-":
+            return f"{left}.subtract({right})"
+        if operator == "*":
+            return f"{left}.multiply({right})"
+        return f"{left}.divide({right}, 18, RoundingMode.HALF_UP)"
+
+    def negate(self, value):
+        return f"{value}.negate()"
+
+    def power(self, value, exponent):
+        return f"{value}.pow({exponent})"
+
+    def compare_numbers(self, left, operator, right):
+        return f"{left}.compareTo({right}) {operator} 0"
+
+    def compare_text(self, left, operator, right):
+        return f"compareText({left}, {right}) {operator} 0"
+
+    def to_int(self, value):
+        return f"{value}.intValue()"
+
+    def helper(self, name):
+        return name
+
+    def display(self, value, advancing):
+        return f"System.out.{'println' if advancing else 'print'}({value});"
+
+    def stop(self):
+        return "throw new StopRun();"
+
+    def local(self, type_name, name, value):
+        return f"{'int' if type_name == 'int' else 'String'} {name} = {value};"
+
+    def reader_type(self):
+        return "BufferedReader"
+
+    def writer_type(self):
+        return "BufferedWriter"
+
+    def field_declaration(self, field, initial):
+        type_name = self.number_type if field.is_number else self.text_type
+        return f"private {type_name} {field.name} = {initial};"
+
+    def handle_declaration(self, type_name, name):
+        return f"private {type_name} {name};"
+
+    def method(self, name, body, visibility="private", parameters=""):
+        return self.block(f"{visibility} void {name}({parameters})", body)
+
+    def function(self, type_name, name, parameters, body):
+        return self.block(f"private {type_name} {name}({parameters})", body)
+
+    def substring(self, value, start, length):
+        return f"{value}.substring({start}, {start + length})"
+
+    def program(self, class_name, fields, handles, run_body, methods, close_handles):
+        lines = ["import java.io.BufferedReader;", "import java.io.BufferedWriter;", "import java.io.Closeable;",
+                 "import java.io.IOException;", "import java.io.UncheckedIOException;", "import java.math.BigDecimal;",
+                 "import java.math.BigInteger;", "import java.math.RoundingMode;", "import java.nio.file.Files;",
+                 "import java.nio.file.Paths;", "import java.nio.file.StandardOpenOption;", "",
+                 f"public class {class_name} {{", "",
+                 "    /** Thrown by STOP RUN and GOBACK to end the program */",
+                 "    private static class StopRun extends RuntimeException {", "    }", ""]
+        lines += [f"    {line}" for line in fields + handles]
+        lines += ["", "    public static void main(String[] args) {", f"        new {class_name}().run();", "    }", ""]
+        run = [(0, "try {")] + [(1, call) for call in run_body] + [(0, "} catch (StopRun stop) {"),
+                                                                  (1, "// STOP RUN ends the program"), (0, "}")]
+        if close_handles:
+            run = run[:-1] + [(0, "} finally {")] + [(1, line) for line in close_handles] + [(0, "}")]
+        lines += render(self.method("run", run, visibility="public"), 1)
+        for method in methods:
+            lines += [""] + render(method, 1)
+        lines += [""] + [f"    {line}" if line else "" for line in JAVA_HELPERS.splitlines()]
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+class CSharpEmitter(JavaEmitter):
+    """C# spellings of the translated constructs"""
+
+    language = "C#"
+    number_type = "decimal"
+    text_type = "string"
+
+    def method_name(self, name):
+        return pascal_case(name)
+
+    def block(self, header, body):
+        return [(0, header), (0, "{")] + [(level + 1, text) for level, text in body] + [(0, "}")]
+
+    def if_else(self, condition, then_body, else_body):
+        lines = self.block(f"if ({condition})", then_body)
+        if else_body:
+            lines += self.block("else", else_body)
+        return lines
+
+    def do_while(self, body, condition):
+        return [(0, "do"), (0, "{")] + [(level + 1, text) for level, text in body] + [(0, f"}} while ({condition});")]
+
+    def number_literal(self, text):
+        return f"{text}m"
+
+    def zero(self):
+        return "0m"
+
+    def arithmetic(self, operator, left, right):
+        return f"({left} {operator} {right})"
+
+    def negate(self, value):
+        return f"(-{value})"
+
+    def power(self, value, exponent):
+        return f"Pow({value}, {exponent})"
+
+    def compare_numbers(self, left, operator, right):
+        return f"{left} {operator} {right}"
+
+    def compare_text(self, left, operator, right):
+        return f"CompareText({left}, {right}) {operator} 0"
+
+    def to_int(self, value):
+        return f"(int){value}"
+
+    def helper(self, name):
+        return name[0].upper() + name[1:]
+
+    def display(self, value, advancing):
+        return f"Console.{'WriteLine' if advancing else 'Write'}({value});"
+
+    def local(self, type_name, name, value):
+        return f"{'int' if type_name == 'int' else 'string'} {name} = {value};"
+
+    def reader_type(self):
+        return "StreamReader"
+
+    def writer_type(self):
+        return "StreamWriter"
+
+    def substring(self, value, start, length):
+        return f"{value}.Substring({start}, {length})"
+
+    def program(self, class_name, fields, handles, run_body, methods, close_handles):
+        lines = ["using System;", "using System.Globalization;", "using System.IO;", "using System.Linq;", "",
+                 f"public class {class_name}", "{",
+                 "    /// <summary>Thrown by STOP RUN and GOBACK to end the program</summary>",
+                 "    private class StopRun : Exception", "    {", "    }", ""]
+        lines += [f"    {line}" for line in fields + handles]
+        lines += ["", "    public static void Main(string[] args)", "    {", f"        new {class_name}().Run();",
+                  "    }", ""]
+        run = self.block("try", [(0, call) for call in run_body]) + self.block(
+            "catch (StopRun)", [(0, "// STOP RUN ends the program")])
+        if close_handles:
+            run += self.block("finally", [(0, line) for line in close_handles])
+        lines += render(self.method("Run", run, visibility="public"), 1)
+        for method in methods:
+            lines += [""] + render(method, 1)
+        lines += [""] + [f"    {line}" if line else "" for line in CSHARP_HELPERS.splitlines()]
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+JAVA_HELPERS = """\
+/** Store a value in a numeric item: truncate (or round) to its scale and drop digits beyond its PICTURE */
+private static BigDecimal store(BigDecimal value, int integerDigits, int scale, boolean signed, boolean rounded) {
+    BigDecimal result = value.setScale(scale, rounded ? RoundingMode.HALF_UP : RoundingMode.DOWN)
+            .remainder(BigDecimal.TEN.pow(integerDigits));
+    return signed ? result : result.abs();
+}
+
+/** Pad with spaces or truncate on the right, as a MOVE to an alphanumeric item does */
+private static String fit(String value, int length) {
+    if (value.length() >= length) {
+        return value.substring(0, length);
+    }
+    return value + " ".repeat(length - value.length());
+}
+
+/** The DISPLAY form of a numeric item: its digits, without a decimal point */
+private static String toDisplay(BigDecimal value, int integerDigits, int scale, boolean signed) {
+    String digits = value.abs().setScale(scale, RoundingMode.DOWN).unscaledValue().toString();
+    int width = integerDigits + scale;
+    if (digits.length() > width) {
+        digits = digits.substring(digits.length() - width);
+    }
+    digits = "0".repeat(width - digits.length()) + digits;
+    return signed && value.signum() < 0 ? "-" + digits : digits;
+}
+
+/** Read an unsigned DISPLAY numeric field; anything but digits reads as zero */
+private static BigDecimal parseDisplay(String text, int scale) {
+    String digits = text.trim();
+    if (digits.isEmpty() || !digits.chars().allMatch(Character::isDigit)) {
+        return BigDecimal.ZERO.setScale(scale);
+    }
+    return new BigDecimal(new BigInteger(digits), scale);
+}
+
+/** Compare alphanumeric values the COBOL way, padding the shorter one with spaces */
+private static int compareText(String left, String right) {
+    int length = Math.max(left.length(), right.length());
+    return fit(left, length).compareTo(fit(right, length));
+}
+
+private static BufferedReader openInput(String path) {
+    try {
+        return Files.newBufferedReader(Paths.get(path));
+    } catch (IOException e) {
+        throw new UncheckedIOException(e);
+    }
+}
+
+private static BufferedWriter openOutput(String path, boolean append) {
+    try {
+        if (append) {
+            return Files.newBufferedWriter(Paths.get(path), StandardOpenOption.CREATE, StandardOpenOption.APPEND);
+        }
+        return Files.newBufferedWriter(Paths.get(path));
+    } catch (IOException e) {
+        throw new UncheckedIOException(e);
+    }
+}
+
+private static String readLine(BufferedReader reader) {
+    try {
+        return reader.readLine();
+    } catch (IOException e) {
+        throw new UncheckedIOException(e);
+    }
+}
+
+private static void writeLine(BufferedWriter writer, String line) {
+    try {
+        writer.write(line);
+        writer.newLine();
+    } catch (IOException e) {
+        throw new UncheckedIOException(e);
+    }
+}
+
+private static void close(Closeable handle) {
+    if (handle == null) {
+        return;
+    }
+    try {
+        handle.close();
+    } catch (IOException e) {
+        throw new UncheckedIOException(e);
+    }
+}"""
+
+CSHARP_HELPERS = """\
+/// <summary>Store a value in a numeric item: truncate (or round) to its scale and drop digits beyond its PICTURE</summary>
+private static decimal Store(decimal value, int integerDigits, int scale, bool signed, bool rounded)
+{
+    decimal factor = Pow(10m, scale);
+    decimal result = rounded
+        ? Math.Round(value, scale, MidpointRounding.AwayFromZero)
+        : Math.Truncate(value * factor) / factor;
+    result %= Pow(10m, integerDigits);
+    return signed ? result : Math.Abs(result);
+}
+
+private static decimal Pow(decimal value, int exponent)
+{
+    decimal result = 1m;
+    for (int i = 0; i < exponent; i++)
+    {
+        result *= value;
+    }
+    return result;
+}
+
+/// <summary>Pad with spaces or truncate on the right, as a MOVE to an alphanumeric item does</summary>
+private static string Fit(string value, int length)
+{
+    return value.Length >= length ? value.Substring(0, length) : value.PadRight(length);
+}
+
+/// <summary>The DISPLAY form of a numeric item: its digits, without a decimal point</summary>
+private static string ToDisplay(decimal value, int integerDigits, int scale, bool signed)
+{
+    string digits = Math.Truncate(Math.Abs(value) * Pow(10m, scale)).ToString("0", CultureInfo.InvariantCulture);
+    int width = integerDigits + scale;
+    if (digits.Length > width)
+    {
+        digits = digits.Substring(digits.Length - width);
+    }
+    digits = digits.PadLeft(width, '0');
+    return signed && value < 0 ? "-" + digits : digits;
+}
+
+/// <summary>Read an unsigned DISPLAY numeric field; anything but digits reads as zero</summary>
+private static decimal ParseDisplay(string text, int scale)
+{
+    string digits = text.Trim();
+    if (digits.Length == 0 || !digits.All(char.IsDigit))
+    {
+        return 0m;
+    }
+    return decimal.Parse(digits, CultureInfo.InvariantCulture) / Pow(10m, scale);
+}
+
+/// <summary>Compare alphanumeric values the COBOL way, padding the shorter one with spaces</summary>
+private static int CompareText(string left, string right)
+{
+    int length = Math.Max(left.Length, right.Length);
+    return string.CompareOrdinal(Fit(left, length), Fit(right, length));
+}
+
+private static StreamReader OpenInput(string path)
+{
+    return new StreamReader(path);
+}
+
+private static StreamWriter OpenOutput(string path, bool append)
+{
+    return new StreamWriter(path, append);
+}
+
+private static string ReadLine(StreamReader reader)
+{
+    return reader.ReadLine();
+}
+
+private static void WriteLine(StreamWriter writer, string line)
+{
+    writer.WriteLine(line);
+}
+
+private static void Close(IDisposable handle)
+{
+    handle?.Dispose();
+}"""
+
+
+def render(lines, indent=0):
+    """Turn (level, text) pairs into source lines indented by four spaces per level"""
+    return [("    " * (indent + level) + text) if text else "" for level, text in lines]
+
+
+def string_literal(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+class ProgramModel:
+    """The data items, condition names, files and paragraphs of a program, in target-language terms"""
+
+    def __init__(self, index, emitter):
+        self.index = index
+        self.emitter = emitter
+        self.fields = {}
+        self.ordered_fields = []
+        self.conditions = {}
+        self.files = {}
+        self.record_files = {}
+        self.data_errors = Counter()
+        self.data_items = 0
+        self.translated_items = 0
+        # The parameter of the generated load methods
+        self._names = {"line"}
+        self._ambiguous = set()
+        self._build_fields()
+        self._build_files()
+        self.paragraph_methods = {}
+        for paragraph in index.paragraphs:
+            name = paragraph["name"].strip("()")
+            self.paragraph_methods[paragraph["name"]] = self._unique(emitter.method_name(name))
+
+    def _unique(self, name):
+        candidate = name
+        suffix = 2
+        while candidate in self._names:
+            candidate = f"{name}{suffix}"
+            suffix += 1
+        self._names.add(candidate)
+        return candidate
+
+    def _build_fields(self):
+        by_position = {}
+        for position, item in enumerate(self.index.data_items):
+            self.data_items += 1
+            try:
+                field = self._build_field(item, by_position)
+            except UnsupportedConstruct as e:
+                self.data_errors[e.construct] += 1
+                by_position[position] = None
+                continue
+            self.translated_items += 1
+            by_position[position] = field
+            if not isinstance(field, Field) or field.name is None:
+                continue
+            if field.cobol_name in self.fields:
+                self._ambiguous.add(field.cobol_name)
+            self.fields[field.cobol_name] = field
+            self.ordered_fields.append(field)
+        for field in self.ordered_fields:
+            if field.kind == "group":
+                field.layout = self._layout(field)
+
+    def _build_field(self, item, by_position):
+        if item["section"] == "LINKAGE":
+            raise UnsupportedConstruct("LINKAGE SECTION")
+        if item["level"] == 66:
+            raise UnsupportedConstruct("RENAMES")
+        if item["occurs"]:
+            raise UnsupportedConstruct("OCCURS")
+        if item["redefines"]:
+            raise UnsupportedConstruct("REDEFINES")
+        parent = by_position.get(item["parent"]) if item["parent"] is not None else None
+        if item["parent"] is not None and parent is None:
+            raise UnsupportedConstruct("item of an unsupported group")
+
+        if item["level"] == 88:
+            if parent is None or parent.kind == "group":
+                raise UnsupportedConstruct("condition name on a group")
+            tokens = tokenize(item["value"] or "")
+            if not tokens or any(kind == "word" for kind, _ in tokens):
+                raise UnsupportedConstruct("condition name values", item["value"])
+            values = [Value("number" if kind == "num" else "text", literal=value) for kind, value in tokens]
+            if any((value.kind == "number") != parent.is_number for value in values):
+                raise UnsupportedConstruct("condition name values", item["value"])
+            self.conditions[item["name"]] = (parent, values)
+            return None
+
+        field = Field(item, self._unique(camel_case(item["name"])) if item["name"] else None)
+        if item["picture"] is None:
+            if item["value"] is not None:
+                raise UnsupportedConstruct("VALUE on a group")
+            if parent is not None:
+                parent.children.append(field)
+            return field
+
+        if item["usage"] in ("COMP-1", "COMP-2", "INDEX", "POINTER"):
+            raise UnsupportedConstruct(f"USAGE {item['usage']}")
+        kind, length, integer_digits, scale, signed = parse_picture(item["picture"])
+        field.kind = kind
+        field.length = length
+        field.integer_digits = integer_digits
+        field.scale = scale
+        field.signed = signed
+        field.binary = item["usage"] in BINARY_USAGES
+        if field.binary and kind != "number":
+            raise UnsupportedConstruct("binary alphanumeric item")
+        if item["value"] is not None:
+            field.value = parse_literal(item["value"])
+            if field.value[0] == "space" and kind == "number":
+                raise UnsupportedConstruct("VALUE SPACES on a numeric item")
+        if not item["name"]:
+            field = _Filler(field)
+        if parent is not None:
+            parent.children.append(field)
+        return field
+
+    def _layout(self, group):
+        """The (field, filler text) pieces of a group's DISPLAY record, or None if it has no flat layout"""
+        pieces = []
+        for child in group.children:
+            if isinstance(child, _Filler):
+                filler = child.field
+                if filler.is_number:
+                    return None
+                text = self.initial_text(filler)
+                pieces.append((None, text))
+            elif child.kind == "group":
+                layout = self._layout(child)
+                if layout is None:
+                    return None
+                pieces.extend(layout)
+            elif child.binary or (child.is_number and child.signed):
+                return None
+            else:
+                pieces.append((child, None))
+        return pieces
+
+    def _build_files(self):
+        for name, file_info in self.index.files.items():
+            if "descriptor" not in file_info:
+                continue
+            try:
+                if file_info.get("descriptor") != "FD":
+                    raise UnsupportedConstruct("SORT file")
+                if file_info["organization"] not in ("SEQUENTIAL", "LINE SEQUENTIAL"):
+                    raise UnsupportedConstruct(f"{file_info['organization']} file")
+                if len(file_info["records"]) != 1:
+                    raise UnsupportedConstruct("file with several record layouts")
+                record = self.fields.get(file_info["records"][0])
+                if record is None or (record.kind == "group" and record.layout is None) or record.is_number:
+                    raise UnsupportedConstruct("file record layout")
+            except UnsupportedConstruct as e:
+                self.data_errors[e.construct] += 1
+                continue
+            handle = camel_case(name)
+            self.files[name] = {
+                "path": file_info.get("assign") or name,
+                "record": record,
+                "reader": self._unique(f"{handle}Reader"),
+                "writer": self._unique(f"{handle}Writer"),
+            }
+            self.record_files[record.cobol_name] = name
+
+    @property
+    def data_supported(self):
+        return not self.data_errors
+
+    def record_length(self, group):
+        return sum(piece_field.length if piece_field is not None else len(text) for piece_field, text in group.layout)
+
+    def initial_text(self, field):
+        kind, value = field.value or ("space", None)
+        if kind == "text":
+            text = value
+        elif kind == "number":
+            text = value.lstrip("+-").replace(".", "")
+        elif kind == "zero":
+            text = "0" * field.length
+        else:
+            text = ""
+        return (text + " " * field.length)[:field.length]
+
+    def initial_number(self, field):
+        kind, value = field.value or ("zero", None)
+        if kind == "text":
+            raise UnsupportedConstruct("alphanumeric VALUE on a numeric item")
+        try:
+            number = Decimal(value) if kind == "number" else Decimal(0)
+        except InvalidOperation:
+            raise UnsupportedConstruct("VALUE clause", value)
+        return str(number.quantize(Decimal(1).scaleb(-field.scale)))
+
+    def field(self, name):
+        if name in self._ambiguous:
+            raise UnsupportedConstruct("qualified data name", name)
+        return self.fields.get(name)
+
+    def declarations(self):
+        """Field and file handle declarations of the program class"""
+        emitter = self.emitter
+        lines = []
+        for field in self.ordered_fields:
+            if field.kind == "group" or field.name is None:
+                continue
+            if field.is_number:
+                initial = emitter.number_literal(self.initial_number(field))
+            else:
+                initial = string_literal(self.initial_text(field))
+            lines.append(emitter.field_declaration(field, initial))
+        handles = []
+        for file_info in self.files.values():
+            handles.append(emitter.handle_declaration(emitter.reader_type(), file_info["reader"]))
+            handles.append(emitter.handle_declaration(emitter.writer_type(), file_info["writer"]))
+        return lines, handles
+
+    def group_methods(self):
+        """format/load methods that turn each group with a flat layout into a record string and back"""
+        emitter = self.emitter
+        methods = []
+        for field in self.ordered_fields:
+            if field.kind != "group" or field.layout is None:
+                continue
+            parts = []
+            loads = [(0, f"line = {emitter.helper('fit')}(line, {self.record_length(field)});")]
+            position = 0
+            for piece_field, text in field.layout:
+                if piece_field is None:
+                    parts.append(string_literal(text))
+                    position += len(text)
+                    continue
+                if piece_field.is_number:
+                    parts.append(f"{emitter.helper('toDisplay')}({piece_field.name}, {piece_field.integer_digits}, "
+                                 f"{piece_field.scale}, false)")
+                    loads.append((0, f"{piece_field.name} = {emitter.helper('parseDisplay')}("
+                                     f"{emitter.substring('line', position, piece_field.length)}, {piece_field.scale});"))
+                else:
+                    parts.append(piece_field.name)
+                    loads.append((0, f"{piece_field.name} = "
+                                     f"{emitter.substring('line', position, piece_field.length)};"))
+                position += piece_field.length
+            methods.append(emitter.function(
+                emitter.text_type, self.format_method(field), "",
+                [(0, f"return {' + '.join(parts) if parts else string_literal('')};")]
+            ))
+            methods.append(emitter.method(self.load_method(field), loads, parameters=f"{emitter.text_type} line"))
+        return methods
+
+    def format_method(self, group):
+        return self.emitter.method_name(f"format-{group.cobol_name}")
+
+    def load_method(self, group):
+        return self.emitter.method_name(f"load-{group.cobol_name}")
+
+
+class _Filler:
+    """An unnamed (FILLER) item, which only takes part in its group's record layout"""
+
+    def __init__(self, field):
+        self.field = field
+        self.kind = "filler"
+
+
+class ParagraphTranslator:
+    """Recursive-descent translator of one paragraph's statements"""
+
+    def __init__(self, model, tokens):
+        self.model = model
+        self.emitter = model.emitter
+        self.tokens = tokens
+        self.position = 0
+        self.statements = 0
+
+    # Token helpers
+
+    def peek(self, offset=0):
+        position = self.position + offset
+        return self.tokens[position] if position < len(self.tokens) else (None, None)
+
+    def peek_word(self, offset=0):
+        kind, value = self.peek(offset)
+        return value if kind == "word" else None
+
+    def next(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def accept(self, *words):
+        if self.peek_word() in words:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, *words):
+        if not self.accept(*words):
+            raise UnsupportedConstruct("syntax", f"expected {' or '.join(words)} near {self.peek()[1]}")
+
+    def at_end(self):
+        return self.position >= len(self.tokens)
+
+    def local_name(self, prefix):
+        # Reserved with the field and method names, so a local never shadows a field such as I1
+        return self.model._unique(prefix)
+
+    # Statements
+
+    def translate(self):
+        """Translate the whole paragraph and return its (level, text) body lines"""
+        lines = []
+        while not self.at_end():
+            sentence = self.block(set())
+            if not self.terminated(lines):
+                lines += sentence
+            if self.peek()[0] == "period":
+                self.next()
+            elif not self.at_end():
+                raise UnsupportedConstruct("syntax", f"unexpected {self.peek()[1]}")
+        return lines
+
+    def block(self, terminators):
+        """Translate statements up to a period or one of the terminator words, which are not consumed"""
+        lines = []
+        while not self.at_end():
+            kind, value = self.peek()
+            if kind == "period" or (kind == "word" and value in terminators):
+                break
+            statement = self.statement()
+            if not self.terminated(lines):
+                lines += statement
+        return lines
+
+    def terminated(self, lines):
+        """Whether lines end by leaving the method, so what follows is unreachable (a javac error)"""
+        return bool(lines) and lines[-1] in ((0, self.emitter.stop()), (0, "return;"))
+
+    def statement(self):
+        kind, verb = self.next()
+        if kind != "word":
+            raise UnsupportedConstruct("syntax", f"unexpected {verb}")
+        handler = getattr(self, f"_{verb.lower().replace('-', '_')}", None)
+        if verb not in VERBS or handler is None:
+            raise UnsupportedConstruct("GO TO" if verb == "GO" else verb)
+        self.statements += 1
+        return handler()
+
+    def _move(self):
+        if self.peek_word() in ("CORR", "CORRESPONDING"):
+            raise UnsupportedConstruct("MOVE CORRESPONDING")
+        source = self.operand()
+        self.expect("TO")
+        lines = []
+        for target in self.targets():
+            lines += self.assign(target, source)
+        return lines
+
+    def _initialize(self):
+        lines = []
+        for target in self.targets():
+            fields = self.elementary_fields(target) if target.kind == "group" else [target]
+            for field in fields:
+                if field.is_number:
+                    lines += self.store(field, Value("number", self.emitter.zero()))
+                else:
+                    lines.append((0, f"{field.name} = {string_literal(' ' * field.length)};"))
+        if self.peek_word() in ("REPLACING", "WITH", "TO"):
+            raise UnsupportedConstruct("INITIALIZE REPLACING")
+        return lines
+
+    def _set(self):
+        name = self.peek_word()
+        if name not in self.model.conditions:
+            raise UnsupportedConstruct("SET")
+        self.next()
+        self.expect("TO")
+        self.expect("TRUE")
+        parent, values = self.model.conditions[name]
+        return self.assign(parent, self.literal_value(values[0]))
+
+    def _add(self):
+        return self._arithmetic_verb("+", "TO")
+
+    def _subtract(self):
+        return self._arithmetic_verb("-", "FROM")
+
+    def _arithmetic_verb(self, operator, preposition):
+        if self.peek_word() in ("CORR", "CORRESPONDING"):
+            raise UnsupportedConstruct(f"{'ADD' if operator == '+' else 'SUBTRACT'} CORRESPONDING")
+        total = None
+        for operand, _ in self.operands():
+            total = operand.code if total is None else self.emitter.arithmetic("+", total, operand.code)
+        lines = []
+        if self.accept(preposition):
+            operands = self.operands()
+            if self.accept("GIVING"):
+                if len(operands) != 1:
+                    raise UnsupportedConstruct("GIVING with several operands")
+                base = operands[0][0].code
+                result = self.emitter.arithmetic("-", base, total) if operator == "-" else \
+                    self.emitter.arithmetic("+", total, base)
+                for target, rounded in self.receiving(self.operands()):
+                    lines += self.store(target, Value("number", result), rounded)
+            else:
+                for target, rounded in self.receiving(operands):
+                    lines += self.store(target, Value("number", self.emitter.arithmetic(operator, target.name, total)),
+                                        rounded)
+        elif operator == "+" and self.accept("GIVING"):
+            for target, rounded in self.receiving(self.operands()):
+                lines += self.store(target, Value("number", total), rounded)
+        else:
+            raise UnsupportedConstruct("syntax", f"expected {preposition}")
+        self.end_arithmetic("END-ADD" if operator == "+" else "END-SUBTRACT")
+        return lines
+
+    def _multiply(self):
+        left = self.numeric(self.operand())
+        self.expect("BY")
+        return self._multiply_or_divide("*", left, "END-MULTIPLY")
+
+    def _divide(self):
+        left = self.numeric(self.operand())
+        if self.accept("INTO"):
+            return self._multiply_or_divide("/", left, "END-DIVIDE", into=True)
+        self.expect("BY")
+        right = self.numeric(self.operand())
+        self.expect("GIVING")
+        lines = []
+        for target, rounded in self.receiving(self.operands()):
+            lines += self.store(target, Value("number", self.emitter.arithmetic("/", left.code, right.code)), rounded)
+        self.end_arithmetic("END-DIVIDE")
+        return lines
+
+    def _multiply_or_divide(self, operator, left, terminator, into=False):
+        operands = self.operands()
+        lines = []
+
+        def combine(value):
+            return self.emitter.arithmetic(operator, value, left.code) if into else \
+                self.emitter.arithmetic(operator, left.code, value)
+
+        if self.accept("GIVING"):
+            if len(operands) != 1:
+                raise UnsupportedConstruct("GIVING with several operands")
+            for target, rounded in self.receiving(self.operands()):
+                lines += self.store(target, Value("number", combine(operands[0][0].code)), rounded)
+        else:
+            for target, rounded in self.receiving(operands):
+                lines += self.store(target, Value("number", combine(target.name)), rounded)
+        self.end_arithmetic(terminator)
+        return lines
+
+    def operands(self):
+        """Numeric operands up to the next keyword, as (value, ROUNDED) pairs"""
+        operands = []
+        while self.is_operand():
+            operands.append((self.numeric(self.operand()), self.accept("ROUNDED")))
+        if not operands:
+            raise UnsupportedConstruct("syntax", f"expected an operand near {self.peek()[1]}")
+        return operands
+
+    def receiving(self, operands):
+        """The (field, ROUNDED) pairs of operands that receive a result"""
+        if any(value.field is None for value, _ in operands):
+            raise UnsupportedConstruct("syntax", "literal as a receiving item")
+        return [(value.field, rounded) for value, rounded in operands]
+
+    def _compute(self):
+        targets = self.targets(rounded=True)
+        if not (self.accept("EQUAL") or self.peek() == ("op", "=")):
+            raise UnsupportedConstruct("syntax", "expected = in COMPUTE")
+        if self.peek() == ("op", "="):
+            self.next()
+        value = self.numeric(self.expression())
+        lines = []
+        for target, rounded in targets:
+            lines += self.store(target, value, rounded)
+        self.end_arithmetic("END-COMPUTE")
+        return lines
+
+    def end_arithmetic(self, terminator):
+        if self.peek_word() in ("ON", "SIZE", "NOT"):
+            raise UnsupportedConstruct("ON SIZE ERROR")
+        if self.peek_word() == "REMAINDER":
+            raise UnsupportedConstruct("DIVIDE REMAINDER")
+        self.accept(terminator)
+
+    def _if(self):
+        condition = self.condition()
+        self.accept("THEN")
+        then_body = self.block({"ELSE", "END-IF"})
+        else_body = []
+        if self.accept("ELSE"):
+            else_body = self.block({"END-IF"})
+        self.accept("END-IF")
+        if self.peek_word() == "NEXT":
+            raise UnsupportedConstruct("NEXT SENTENCE")
+        return self.emitter.if_else(condition, then_body, else_body)
+
+    def _perform(self):
+        word = self.peek_word()
+        targets = None
+        if word and word not in KEYWORDS and word in self.model.paragraph_methods or \
+                (word and word not in KEYWORDS and self.model.field(word) is None and word not in ZERO_WORDS
+                 and self.peek(1)[1] not in ("TIMES",)):
+            targets = self.perform_targets()
+
+        if self.accept("WITH"):
+            self.expect("TEST")
+            test_after = self.accept("AFTER")
+            if not test_after:
+                self.expect("BEFORE")
+        else:
+            test_after = self.accept("TEST") and (self.accept("AFTER") or not self.accept("BEFORE"))
+
+        def body_lines():
+            if targets is not None:
+                return [(0, f"{method}();") for method in targets]
+            body = self.block({"END-PERFORM"})
+            self.expect("END-PERFORM")
+            return body
+
+        if self.accept("UNTIL"):
+            condition = self.condition()
+            body = body_lines()
+            if test_after:
+                return self.emitter.do_while(body, f"!({condition})")
+            return self.emitter.block(f"while (!({condition}))", body)
+
+        if self.accept("VARYING"):
+            counter = self.numeric(self.operand())
+            if counter.field is None:
+                raise UnsupportedConstruct("VARYING a literal")
+            self.expect("FROM")
+            start = self.numeric(self.operand())
+            self.expect("BY")
+            step = self.numeric(self.operand())
+            self.expect("UNTIL")
+            condition = self.condition()
+            if self.peek_word() == "AFTER":
+                raise UnsupportedConstruct("PERFORM VARYING AFTER")
+            body = body_lines()
+            increment = self.store(counter.field, Value(
+                "number", self.emitter.arithmetic("+", counter.field.name, step.code)))
+            lines = self.store(counter.field, start)
+            if test_after:
+                return lines + self.emitter.block("while (true)", body + self.emitter.block(
+                    f"if ({condition})", [(0, "break;")]) + increment)
+            return lines + self.emitter.block(f"while (!({condition}))", body + increment)
+
+        if self.is_operand() and self.peek_word(1) == "TIMES" or self.peek()[0] == "num" and \
+                self.peek_word(1) == "TIMES":
+            count = self.numeric(self.operand())
+            self.expect("TIMES")
+            body = body_lines()
+            counter = self.local_name("i")
+            limit = self.local_name("times")
+            return [(0, self.emitter.local("int", limit, self.emitter.to_int(count.code)))] + self.emitter.block(
+                f"for (int {counter} = 0; {counter} < {limit}; {counter}++)", body)
+
+        return body_lines()
+
+    def perform_targets(self):
+        """The methods called by PERFORM name [THRU name]"""
+        first = self.next()[1]
+        last = first
+        if self.accept("THRU", "THROUGH"):
+            last = self.next()[1]
+        names = [paragraph["name"] for paragraph in self.model.index.paragraphs]
+        if first not in names or last not in names:
+            raise UnsupportedConstruct("PERFORM of an unknown paragraph", first)
+        start, end = names.index(first), names.index(last)
+        if end < start:
+            raise UnsupportedConstruct("PERFORM THRU backwards", f"{first} THRU {last}")
+        members = names[start:end + 1]
+        sections = {paragraph["name"] for paragraph in self.model.index.paragraphs if paragraph["isSection"]}
+        if first == last and first in sections:
+            members = [first] + [paragraph["name"] for paragraph in self.model.index.paragraphs
+                                 if paragraph["section"] == first and not paragraph["isSection"]]
+        return [self.model.paragraph_methods[name] for name in members]
+
+    def _display(self):
+        parts = []
+        while self.is_operand():
+            value = self.operand()
+            parts.append(self.as_text(value))
+        advancing = True
+        if self.accept("UPON"):
+            self.next()
+        if self.accept("WITH"):
+            self.expect("NO")
+            self.expect("ADVANCING")
+            advancing = False
+        if not parts:
+            raise UnsupportedConstruct("syntax", "empty DISPLAY")
+        return [(0, self.emitter.display(" + ".join(parts), advancing))]
+
+    def _stop(self):
+        if not self.accept("RUN"):
+            raise UnsupportedConstruct("STOP literal")
+        return [(0, self.emitter.stop())]
+
+    def _goback(self):
+        return [(0, self.emitter.stop())]
+
+    def _exit(self):
+        if self.accept("PROGRAM"):
+            return [(0, self.emitter.stop())]
+        if self.accept("PARAGRAPH"):
+            return [(0, "return;")]
+        if self.peek_word() in ("PERFORM", "SECTION"):
+            raise UnsupportedConstruct(f"EXIT {self.peek_word()}")
+        return []
+
+    def _continue(self):
+        return []
+
+    def _open(self):
+        lines = []
+        while self.peek_word() in ("INPUT", "OUTPUT", "EXTEND", "I-O"):
+            mode = self.next()[1]
+            if mode == "I-O":
+                raise UnsupportedConstruct("OPEN I-O")
+            while self.peek_word() in self.model.files:
+                file_info = self.model.files[self.next()[1]]
+                path = string_literal(file_info["path"])
+                if mode == "INPUT":
+                    lines.append((0, f"{file_info['reader']} = {self.emitter.helper('openInput')}({path});"))
+                else:
+                    append = "true" if mode == "EXTEND" else "false"
+                    lines.append((0, f"{file_info['writer']} = {self.emitter.helper('openOutput')}({path}, {append});"))
+        if not lines:
+            raise UnsupportedConstruct("OPEN", self.peek()[1])
+        return lines
+
+    def _close(self):
+        lines = []
+        while self.peek_word() in self.model.files:
+            lines += self.close_file(self.model.files[self.next()[1]])
+        if not lines:
+            raise UnsupportedConstruct("CLOSE", self.peek()[1])
+        return lines
+
+    def close_file(self, file_info):
+        close = self.emitter.helper("close")
+        return [(0, f"{close}({file_info['reader']});"), (0, f"{file_info['reader']} = null;"),
+                (0, f"{close}({file_info['writer']});"), (0, f"{file_info['writer']} = null;")]
+
+    def _read(self):
+        name = self.next()[1]
+        if name not in self.model.files:
+            raise UnsupportedConstruct("READ", name)
+        file_info = self.model.files[name]
+        self.accept("NEXT")
+        self.accept("RECORD")
+        into = self.operand() if self.accept("INTO") else None
+        if self.peek_word() in ("KEY", "INVALID"):
+            raise UnsupportedConstruct("keyed READ")
+        at_end = []
+        not_at_end = []
+        if self.accept("AT") or self.peek_word() == "END":
+            self.expect("END")
+            at_end = self.block({"NOT", "END-READ"})
+        if self.accept("NOT"):
+            self.accept("AT")
+            self.expect("END")
+            not_at_end = self.block({"END-READ"})
+        self.accept("END-READ")
+
+        line = self.local_name("line")
+        record = file_info["record"]
+        loaded = self.assign(record, Value("text", line))
+        if into is not None:
+            loaded += self.assign(into, self.field_value(record))
+        return [(0, self.emitter.local("text", line, f"{self.emitter.helper('readLine')}({file_info['reader']})"))] + \
+            self.emitter.if_else(f"{line} == null", at_end or [(0, "// AT END")], loaded + not_at_end)
+
+    def _write(self):
+        name = self.next()[1]
+        record = self.model.field(name)
+        if record is None or name not in self.model.record_files:
+            raise UnsupportedConstruct("WRITE", name)
+        file_info = self.model.files[self.model.record_files[name]]
+        lines = []
+        if self.accept("FROM"):
+            lines += self.assign(record, self.operand())
+        if self.peek_word() in ("AFTER", "BEFORE", "INVALID"):
+            raise UnsupportedConstruct(f"WRITE {self.peek_word()}")
+        self.accept("END-WRITE")
+        text = self.as_text(self.field_value(record))
+        lines.append((0, f"{self.emitter.helper('writeLine')}({file_info['writer']}, {text});"))
+        return lines
+
+    # Operands and values
+
+    def is_operand(self):
+        kind, value = self.peek()
+        if kind in ("str", "num"):
+            return True
+        return kind == "word" and value not in KEYWORDS and not value.startswith("END-")
+
+    def operand(self):
+        kind, value = self.next()
+        if kind == "str":
+            return Value("text", string_literal(value), literal=value)
+        if kind == "num":
+            return Value("number", self.emitter.number_literal(value.lstrip("+")), literal=value)
+        if kind != "word":
+            raise UnsupportedConstruct("syntax", f"unexpected {value}")
+        if value in ZERO_WORDS:
+            return Value("zero")
+        if value in SPACE_WORDS:
+            return Value("space")
+        if value == "FUNCTION":
+            raise UnsupportedConstruct("intrinsic FUNCTION")
+        if value in ("ALL", "HIGH-VALUE", "HIGH-VALUES", "LOW-VALUE", "LOW-VALUES", "QUOTE", "QUOTES"):
+            raise UnsupportedConstruct(f"figurative constant {value}")
+        if value in self.model.conditions:
+            raise UnsupportedConstruct("condition name as an operand", value)
+        field = self.model.field(value)
+        if field is None:
+            raise UnsupportedConstruct("unknown data name", value)
+        if self.peek() == ("op", "("):
+            raise UnsupportedConstruct("subscript or reference modification")
+        if self.peek_word() in ("OF", "IN"):
+            raise UnsupportedConstruct("qualified data name", value)
+        return self.field_value(field)
+
+    def field_value(self, field):
+        if field.kind == "group":
+            if field.layout is None:
+                raise UnsupportedConstruct("group without a flat DISPLAY layout", field.cobol_name)
+            return Value("group", f"{self.model.format_method(field)}()", field=field)
+        return Value(field.kind, field.name, field=field)
+
+    def literal_value(self, value):
+        if value.kind == "number":
+            return Value("number", self.emitter.number_literal(value.literal.lstrip("+")), literal=value.literal)
+        return Value("text", string_literal(value.literal), literal=value.literal)
+
+    def targets(self, rounded=False):
+        """Receiving fields up to the next keyword; with rounded, as (field, rounded) pairs"""
+        targets = []
+        while self.is_operand():
+            value = self.operand()
+            if value.field is None:
+                raise UnsupportedConstruct("syntax", "literal as a receiving item")
+            targets.append((value.field, self.accept("ROUNDED")) if rounded else value.field)
+        if not targets:
+            raise UnsupportedConstruct("syntax", "missing receiving item")
+        return targets
+
+    def numeric(self, value):
+        if isinstance(value, Field):
+            value = self.field_value(value)
+        if value.kind == "zero":
+            return Value("number", self.emitter.zero())
+        if value.kind != "number":
+            raise UnsupportedConstruct("alphanumeric operand in arithmetic")
+        return value
+
+    def elementary_fields(self, group):
+        fields = []
+        for child in group.children:
+            if isinstance(child, _Filler):
+                continue
+            fields += self.elementary_fields(child) if child.kind == "group" else [child]
+        return fields
+
+    def store(self, field, value, rounded=False):
+        if field.kind != "number":
+            raise UnsupportedConstruct("arithmetic on an alphanumeric item", field.cobol_name)
+        return [(0, f"{field.name} = {self.emitter.helper('store')}({value.code}, {field.integer_digits}, "
+                    f"{field.scale}, {'true' if field.signed else 'false'}, {'true' if rounded else 'false'});")]
+
+    def as_text(self, value, length=None):
+        """The alphanumeric form of a value, as MOVE to an alphanumeric item and DISPLAY see it"""
+        if value.kind in ("text", "group"):
+            return value.code
+        if value.kind == "zero":
+            return string_literal("0" * (length or 1))
+        if value.kind == "space":
+            return string_literal(" " * (length or 1))
+        if value.field is not None:
+            field = value.field
+            return f"{self.emitter.helper('toDisplay')}({field.name}, {field.integer_digits}, {field.scale}, " \
+                   f"{'true' if field.signed else 'false'})"
+        if value.literal is not None:
+            return string_literal(value.literal)
+        raise UnsupportedConstruct("numeric expression as alphanumeric")
+
+    def assign(self, target, source):
+        """MOVE source to target"""
+        fit = self.emitter.helper("fit")
+        if target.kind == "number":
+            if source.kind not in ("number", "zero"):
+                raise UnsupportedConstruct("MOVE alphanumeric to numeric")
+            return self.store(target, self.numeric(source))
+        if target.kind == "group":
+            if target.layout is None:
+                raise UnsupportedConstruct("group without a flat DISPLAY layout", target.cobol_name)
+            length = self.model.record_length(target)
+            if source.kind == "number":
+                raise UnsupportedConstruct("MOVE numeric to group")
+            return [(0, f"{self.model.load_method(target)}({self.as_text(source, length)});")]
+        if source.kind == "number" and source.field is not None and source.field.scale:
+            raise UnsupportedConstruct("MOVE non-integer numeric to alphanumeric")
+        return [(0, f"{target.name} = {fit}({self.as_text(source, target.length)}, {target.length});")]
+
+    # Arithmetic expressions
+
+    def expression(self):
+        value = self.term()
+        while True:
+            kind, token = self.peek()
+            if kind == "op" and token in "+-" and len(token) == 1:
+                self.next()
+                right = self.term()
+            elif kind == "num" and token[0] in "+-":
+                # 'A -1' is read as a signed literal by the tokenizer; here it is a subtraction
+                self.next()
+                right = Value("number", self.emitter.number_literal(token[1:]), literal=token[1:])
+                token = token[0]
+            else:
+                return value
+            value = Value("number", self.emitter.arithmetic(token, self.numeric(value).code, self.numeric(right).code))
+
+    def term(self):
+        value = self.factor()
+        while self.peek() in (("op", "*"), ("op", "/")):
+            operator = self.next()[1]
+            right = self.factor()
+            value = Value("number", self.emitter.arithmetic(operator, self.numeric(value).code,
+                                                            self.numeric(right).code))
+        return value
+
+    def factor(self):
+        value = self.unary()
+        if self.peek() == ("op", "**"):
+            self.next()
+            kind, exponent = self.next()
+            if kind != "num" or not exponent.isdigit():
+                raise UnsupportedConstruct("non-integer exponent")
+            value = Value("number", self.emitter.power(self.numeric(value).code, int(exponent)))
+        return value
+
+    def unary(self):
+        if self.peek() == ("op", "-"):
+            self.next()
+            return Value("number", self.emitter.negate(self.numeric(self.unary()).code))
+        if self.peek() == ("op", "+"):
+            self.next()
+            return self.unary()
+        if self.peek() == ("op", "("):
+            self.next()
+            value = self.expression()
+            if self.next() != ("op", ")"):
+                raise UnsupportedConstruct("syntax", "unbalanced parenthesis")
+            return value
+        return self.operand()
+
+    # Conditions
+
+    def condition(self):
+        result = self.and_condition()
+        while self.accept("OR"):
+            result = f"{result} || {self.and_condition()}"
+        return result
+
+    def and_condition(self):
+        result = self.not_condition()
+        while self.accept("AND"):
+            result = f"{result} && {self.not_condition()}"
+        return result
+
+    def not_condition(self):
+        if self.peek_word() == "NOT" and self.peek_word(1) not in ("=", "EQUAL", "GREATER", "LESS") \
+                and self.peek(1) != ("op", "="):
+            self.next()
+            return f"!({self.not_condition()})"
+        if self.peek() == ("op", "("):
+            start = self.position
+            self.next()
+            try:
+                inner = self.condition()
+                if self.next() == ("op", ")") and not self.relational_operator_ahead():
+                    return f"({inner})"
+            except UnsupportedConstruct:
+                pass
+            # An arithmetic expression in parentheses that starts a relation
+            self.position = start
+        return self.relation()
+
+    def relational_operator_ahead(self):
+        word = self.peek_word()
+        return word in ("IS", "NOT", "EQUAL", "GREATER", "LESS") or self.peek() in (
+            ("op", "="), ("op", ">"), ("op", "<"), ("op", ">="), ("op", "<="))
+
+    def relation(self):
+        name = self.peek_word()
+        if name in self.model.conditions:
+            self.next()
+            parent, values = self.model.conditions[name]
+            tests = [self.compare(self.field_value(parent), "==", self.literal_value(value)) for value in values]
+            return tests[0] if len(tests) == 1 else f"({' || '.join(tests)})"
+
+        left = self.expression()
+        self.accept("IS")
+        negate = self.accept("NOT")
+        if self.peek_word() in ("POSITIVE", "NEGATIVE", "ZERO") and not self.relational_operator_ahead():
+            sign = self.next()[1]
+            operator = {"POSITIVE": ">", "NEGATIVE": "<", "ZERO": "=="}[sign]
+            result = self.compare(left, operator, Value("zero"))
+        elif self.peek_word() in ("NUMERIC", "ALPHABETIC", "ALPHABETIC-LOWER", "ALPHABETIC-UPPER"):
+            raise UnsupportedConstruct("class condition")
+        else:
+            operator = self.relational_operator()
+            right = self.expression()
+            result = self.compare(left, operator, right)
+        if self.peek_word() in ("OR", "AND") and self.abbreviated_condition_ahead():
+            raise UnsupportedConstruct("abbreviated combined condition")
+        return f"!({result})" if negate else result
+
+    def abbreviated_condition_ahead(self):
+        """Whether the next OR/AND continues with a bare operand, as in A = 1 OR 2"""
+        kind, value = self.peek(1)
+        if kind in ("str", "num"):
+            after = self.peek(2)
+            return after[0] not in ("op",) or after[1] in (")",)
+        return False
+
+    def relational_operator(self):
+        if self.peek()[0] == "op" and self.peek()[1] in ("=", ">", "<", ">=", "<="):
+            operator = self.next()[1]
+            return "==" if operator == "=" else operator
+        if self.accept("EQUAL"):
+            self.accept("TO")
+            return "=="
+        if self.accept("GREATER"):
+            self.accept("THAN")
+            if self.accept("OR"):
+                self.expect("EQUAL")
+                self.accept("TO")
+                return ">="
+            return ">"
+        if self.accept("LESS"):
+            self.accept("THAN")
+            if self.accept("OR"):
+                self.expect("EQUAL")
+                self.accept("TO")
+                return "<="
+            return "<"
+        raise UnsupportedConstruct("syntax", f"expected a relational operator near {self.peek()[1]}")
+
+    def compare(self, left, operator, right):
+        numeric_kinds = ("number", "zero")
+        if left.kind in numeric_kinds and right.kind in numeric_kinds:
+            if left.kind == right.kind == "zero":
+                return "true"
+            return self.emitter.compare_numbers(self.numeric(left).code, operator, self.numeric(right).code)
+        if "number" in (left.kind, right.kind):
+            raise UnsupportedConstruct("comparison of numeric and alphanumeric operands")
+        length = max((value.field.length if value.field is not None and value.kind == "text" else
+                      self.model.record_length(value.field) if value.kind == "group" else 1)
+                     for value in (left, right))
+        return self.emitter.compare_text(self.as_text(left, length), operator, self.as_text(right, length))
+
+
+def paragraph_tokens(index, paragraph, fixed_format):
+    """Tokens of a paragraph's statements, without its header"""
+    pieces = []
+    for line in index.lines[paragraph["start"]:paragraph["end"]]:
+        if fixed_format:
+            body = line.rstrip("\r\n")
+            indicator = body[6] if len(body) > 6 else " "
+            if indicator in "*/dD":
+                continue
+            if indicator == "-":
+                raise UnsupportedConstruct("continuation line")
+            code = body[7:72]
+        else:
+            code = line.rstrip("\r\n")
+        code = code.split("*>", 1)[0]
+        if code.strip():
+            pieces.append(code.strip())
+    text = " ".join(pieces)
+    header = (SECTION_HEADER if paragraph["isSection"] else PARAGRAPH_HEADER).match(text)
+    if header and not paragraph["name"].startswith("("):
+        text = text[header.end():]
+    if re.search(r"\bDECLARATIVES\b", text, re.IGNORECASE):
+        raise UnsupportedConstruct("DECLARATIVES")
+    return tokenize(text)
+
+
+class ProgramTranslation:
+    """Rule-based translation of one program, with per-paragraph results and coverage"""
+
+    def __init__(self, index, target_language):
+        self.index = index
+        self.target_language = SUPPORTED_TARGETS[target_language.upper()]
+        self.emitter = CSharpEmitter() if self.target_language == "C#" else JavaEmitter()
+        self.model = ProgramModel(index, self.emitter)
+        match = next((PROGRAM_ID.search(line) for line in index.lines if PROGRAM_ID.search(line)), None)
+        self.class_name = pascal_case(match.group(1)) if match else "ConvertedProgram"
+        self.paragraphs = []
+        self.unsupported = Counter(self.model.data_errors)
+        fixed_format = is_fixed_format(index.lines)
+        for paragraph in index.paragraphs:
+            self.paragraphs.append(self._translate_paragraph(paragraph, fixed_format))
+
+    def _translate_paragraph(self, paragraph, fixed_format):
+        result = {"name": paragraph["name"], "method": self.model.paragraph_methods[paragraph["name"]],
+                  "body": None, "statements": 0, "reason": None}
+        translator = None
+        try:
+            tokens = paragraph_tokens(self.index, paragraph, fixed_format)
+            translator = ParagraphTranslator(self.model, tokens)
+            result["body"] = translator.translate()
+            result["statements"] = translator.statements
+        except UnsupportedConstruct as e:
+            self.unsupported[e.construct] += 1
+            result["reason"] = str(e)
+            # Count the statements the paragraph has, translated or not
+            words = [value for kind, value in (translator.tokens if translator else []) if kind == "word"]
+            result["statements"] = max(1, sum(1 for word in words if word in VERBS))
+        return result
+
+    @property
+    def translated(self):
+        return [paragraph for paragraph in self.paragraphs if paragraph["body"] is not None]
+
+    @property
+    def complete(self):
+        """Whether the whole program is inside the subset, so no LLM conversion is needed"""
+        return self.model.data_supported and bool(self.paragraphs) and len(self.translated) == len(self.paragraphs)
+
+    @property
+    def hybrid(self):
+        """Whether some paragraphs, but not all, can be translated by rules"""
+        return self.model.data_supported and bool(self.translated) and not self.complete
+
+    @property
+    def mode(self):
+        return "rules" if self.complete else "hybrid" if self.hybrid else "llm"
+
+    def coverage(self):
+        statements = sum(paragraph["statements"] for paragraph in self.paragraphs)
+        translated_statements = sum(paragraph["statements"] for paragraph in self.translated) \
+            if self.model.data_supported else 0
+        return {
+            "mode": self.mode,
+            "targetLanguage": self.target_language,
+            "paragraphs": len(self.paragraphs),
+            "translatedParagraphs": len(self.translated) if self.model.data_supported else 0,
+            "statements": statements,
+            "translatedStatements": translated_statements,
+            "coverage": round(translated_statements / statements, 3) if statements else 0.0,
+            "dataItems": self.model.data_items,
+            "translatedDataItems": self.model.translated_items,
+            "unsupported": dict(self.unsupported.most_common()),
+            "llmParagraphs": [paragraph["name"] for paragraph in self.paragraphs
+                              if paragraph["body"] is None or not self.model.data_supported]
+        }
+
+    def _methods(self, paragraphs):
+        return [self.emitter.method(paragraph["method"], paragraph["body"]) for paragraph in paragraphs]
+
+    def _program(self, paragraphs):
+        fields, handles = self.model.declarations()
+        run_body = [f"{paragraph['method']}();" for paragraph in self.paragraphs]
+        close_handles = []
+        close = self.emitter.helper("close")
+        for file_info in self.model.files.values():
+            close_handles += [f"{close}({file_info['reader']});", f"{close}({file_info['writer']});"]
+        return self.emitter.program(
+            self.class_name, fields, handles, run_body,
+            self._methods(paragraphs) + self.model.group_methods(), close_handles
+        )
+
+    def program_code(self):
+        """The translated program; only meaningful when the translation is complete"""
+        return self._program(self.paragraphs)
+
+    def declarations_code(self):
+        """The program class with its fields, entry point and helpers but no paragraph methods"""
+        return self._program([])
+
+    def methods_code(self, names):
+        """The methods of the named paragraphs, or None if any of them is outside the subset"""
+        by_name = {paragraph["name"]: paragraph for paragraph in self.paragraphs}
+        selected = [by_name.get(name) for name in names]
+        if not selected or any(paragraph is None or paragraph["body"] is None for paragraph in selected):
+            return None
+        return "\n\n".join("\n".join(render(method)) for method in self._methods(selected)) + "\n"
+
+    def result(self):
+        """The conversion result of a program that is entirely inside the subset"""
+        return {
+            "convertedCode": self.program_code(),
+            "conversionNotes": f"Translated deterministically by the rule-based COBOL to {self.target_language} "
+                               f"translator. Numeric items are {self.emitter.number_type} values stored with their "
+                               f"PICTURE's digits and scale; STOP RUN and GOBACK end run().",
+            "potentialIssues": [],
+            "databaseUsed": False
+        }
+
+    def chunk_result(self, chunk, first_declarations):
+        """
+        Translates a conversion chunk by rules when it is inside the subset.
+
+        Returns:
+            dict: A conversion result shaped like the LLM's, or None if the chunk needs the LLM
+        """
+        if not self.model.data_supported or not isinstance(chunk, dict):
+            return None
+        if chunk.get("type") == "declarations":
+            code = self.declarations_code() if first_declarations else ""
+            notes = "Declarations translated by the rule-based translator"
+        else:
+            names = chunk.get("paragraphs") or []
+            texts = [self.index.text(paragraph["start"], paragraph["end"])
+                     for paragraph in self.index.paragraphs if paragraph["name"] in names]
+            # Pieces of a paragraph split for size cannot be translated on their own
+            if any(text.strip() and text.strip() not in chunk.get("content", "") for text in texts):
+                return None
+            code = self.methods_code(names)
+            if code is None:
+                return None
+            notes = f"Paragraphs {', '.join(names)} translated by the rule-based translator"
+        return {"convertedCode": code, "conversionNotes": notes, "potentialIssues": [], "databaseUsed": False,
+                "ruleTranslated": True}
+
+    def boundary_anchors(self):
+        """Paragraphs where translatable and untranslatable runs meet, so chunks never mix the two"""
+        anchors = set()
+        for previous, paragraph in zip(self.paragraphs, self.paragraphs[1:]):
+            if (previous["body"] is None) != (paragraph["body"] is None):
+                anchors.add(paragraph["name"])
+        return anchors
+
+
+def translate_program(index, target_language):
+    """
+    Translates the parts of a parsed COBOL program that are inside the rule-based subset.
+
+    Args:
+        index (CobolIndex): The parsed program
+        target_language (str): 'Java' or 'C#'
+
+    Returns:
+        ProgramTranslation: The translation and its coverage, or None for other target languages
+    """
+    if (target_language or "").upper() not in SUPPORTED_TARGETS:
+        return None
+    translation = ProgramTranslation(index, target_language)
+    coverage = translation.coverage()
+    logger.info(f"Rule-based translation: {coverage['translatedParagraphs']}/{coverage['paragraphs']} paragraphs, "
+                f"{coverage['coverage']:.0%} of statements ({coverage['mode']})")
+    return translation
@@ -0,0 +1,72 @@
+"""
+Module for serving the app in production.
+
+SERVER_MODE selects how requests are handled:
+    gevent    (default) one process runs every request on a greenlet; the
+              socket I/O of LLM calls yields to other requests, so hundreds of
+              conversions can wait on the LLM without a thread each
+    threaded  one OS thread per request, as with the Flask development server
+
+HOST and PORT set the listening address, SERVER_MAX_CONNECTIONS caps the
+requests handled at the same time in gevent mode and SERVER_SHUTDOWN_TIMEOUT
+is how long in-flight requests get to finish on SIGTERM.
+
+Example:
+    SERVER_MODE=gevent SERVER_MAX_CONNECTIONS=1000 PORT=5000 python serve.py
+"""
+import os
+
+SERVER_MODE = os.environ.get("SERVER_MODE", "gevent").lower()
+
+if SERVER_MODE == "gevent":
+    # Must run before anything imports socket, ssl, threading or queue
+    from gevent import monkey
+    monkey.patch_all()
+
+import logging
+import signal
+import threading
+
+logger = logging.getLogger(__name__)
+
+SERVER_MAX_CONNECTIONS = int(os.environ.get("SERVER_MAX_CONNECTIONS", 1000))
+SERVER_SHUTDOWN_TIMEOUT = float(os.environ.get("SERVER_SHUTDOWN_TIMEOUT", 30))
+
+
+def serve_gevent(app, host, port, max_connections=SERVER_MAX_CONNECTIONS):
+    """Serve the app from a gevent WSGI server with a bounded greenlet pool"""
+    import gevent
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+
+    server = WSGIServer((host, port), app, spawn=Pool(max_connections), log=None)
+    gevent.signal_handler(signal.SIGTERM, lambda: server.stop(timeout=SERVER_SHUTDOWN_TIMEOUT))
+    logger.info(f"Serving on {host}:{port} with gevent, up to {max_connections} concurrent requests")
+    server.serve_forever()
+
+
+def serve_threaded(app, host, port):
+    """Serve the app from a WSGI server that runs each request on its own thread"""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logger.info(f"Serving on {host}:{port} with a thread per request")
+    server.serve_forever()
+
+
+def main():
+    from app import app
+
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", 5000))
+    if SERVER_MODE == "gevent":
+        serve_gevent(app, host, port)
+    elif SERVER_MODE == "threaded":
+        serve_threaded(app, host, port)
+    else:
+        raise ValueError(f"Unknown SERVER_MODE {SERVER_MODE}, expected gevent or threaded")
+
+
+if __name__ == "__main__":
+    main()
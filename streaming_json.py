@@ -0,0 +1,183 @@
+"""
+Module for incrementally parsing a JSON object as it is streamed from the model.
+"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# Parser states
+START = "start"
+KEY_OR_END = "keyOrEnd"
+KEY = "key"
+COLON = "colon"
+VALUE = "value"
+STRING = "string"
+RAW = "raw"
+AFTER_VALUE = "afterValue"
+DONE = "done"
+
+
+class StreamingJSONParser:
+    """
+    Incremental parser for a flat JSON object such as the conversion reply
+    {"convertedCode": "...", "conversionNotes": "...", "potentialIssues": [...]}.
+
+    Top-level string values are decoded as their characters arrive and
+    reported through on_delta(key, text), so long fields like convertedCode
+    can be shown before the reply is complete. Other values (lists, numbers,
+    booleans, nested objects) are reported once they have been parsed whole.
+    Text before the opening brace, such as a markdown fence, is skipped.
+    """
+
+    def __init__(self, on_delta=None):
+        """
+        Args:
+            on_delta (callable): Optional callback, called as on_delta(key, text) with newly decoded string text
+        """
+        self.on_delta = on_delta
+        self.values = {}
+        self.state = START
+        self._key = []
+        self._current_key = None
+        self._string = []
+        self._raw = []
+        self._depth = 0
+        self._raw_in_string = False
+        self._raw_escape = False
+        self._escape = None
+        self._high_surrogate = None
+
+    @property
+    def complete(self):
+        """Whether the closing brace of the object has been seen"""
+        return self.state == DONE
+
+    @property
+    def open_field(self):
+        """The key whose value is being parsed, or None between values"""
+        return self._current_key if self.state in (STRING, RAW) else None
+
+    def result(self):
+        """Return the values parsed so far; a string still being streamed is included as received"""
+        values = dict(self.values)
+        if self.state == STRING:
+            values[self._current_key] = "".join(self._string)
+        return values
+
+    def feed(self, text):
+        """Consume the next piece of the streamed reply"""
+        delta = []
+        for char in text:
+            if self.state == STRING:
+                decoded = self._string_char(char)
+                if decoded:
+                    self._string.append(decoded)
+                    delta.append(decoded)
+                if self.state != STRING:
+                    self._report(delta)
+                    delta = []
+            else:
+                self._step(char)
+        self._report(delta)
+
+    def _report(self, delta):
+        if delta and self.on_delta is not None:
+            self.on_delta(self._current_key, "".join(delta))
+
+    def _string_char(self, char):
+        """Handle one character inside a string value and return the text it decodes to"""
+        if self._escape is not None:
+            self._escape += char
+            if self._escape[0] != "u":
+                self._escape = None
+                return ESCAPES.get(char, char)
+            if len(self._escape) < 5:
+                return ""
+            code = int(self._escape[1:], 16)
+            self._escape = None
+            if 0xD800 <= code < 0xDC00:
+                self._high_surrogate = code
+                return ""
+            if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            return chr(code)
+        if char == "\\":
+            self._escape = ""
+            return ""
+        if char == '"':
+            self.values[self._current_key] = "".join(self._string)
+            self._string = []
+            self.state = AFTER_VALUE
+            return ""
+        return char
+
+    def _step(self, char):
+        state = self.state
+        if state == START:
+            if char == "{":
+                self.state = KEY_OR_END
+        elif state == KEY_OR_END:
+            if char == '"':
+                self._key = []
+                self.state = KEY
+            elif char == "}":
+                self.state = DONE
+        elif state == KEY:
+            if char == '"' and not (self._key and self._key[-1] == "\\"):
+                self._current_key = json.loads('"' + "".join(self._key) + '"')
+                self.state = COLON
+            else:
+                self._key.append(char)
+        elif state == COLON:
+            if char == ":":
+                self.state = VALUE
+        elif state == VALUE:
+            if char.isspace():
+                return
+            if char == '"':
+                self._string = []
+                self.state = STRING
+                return
+            self._raw = [char]
+            self._depth = 1 if char in "{[" else 0
+            self._raw_in_string = False
+            self.state = RAW
+        elif state == RAW:
+            self._raw_step(char)
+        elif state == AFTER_VALUE:
+            if char == ",":
+                self.state = KEY_OR_END
+            elif char == "}":
+                self.state = DONE
+
+    def _raw_step(self, char):
+        """Collect a non-string value until the comma or brace that ends it"""
+        if self._raw_in_string:
+            if self._raw_escape:
+                self._raw_escape = False
+            elif char == "\\":
+                self._raw_escape = True
+            elif char == '"':
+                self._raw_in_string = False
+            self._raw.append(char)
+            return
+        if self._depth == 0 and char in ",}":
+            raw = "".join(self._raw).strip()
+            try:
+                self.values[self._current_key] = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning(f"Could not parse streamed value of '{self._current_key}'")
+                self.values[self._current_key] = raw
+            self.state = KEY_OR_END if char == "," else DONE
+            return
+        if char == '"':
+            self._raw_in_string = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+        self._raw.append(char)
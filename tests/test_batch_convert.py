@@ -0,0 +1,84 @@
+import io
+import tarfile
+
+import pytest
+
+from batch_convert import CopybookResolver, load_portfolio_from_manifest, load_portfolio_from_tar
+
+COPYBOOKS = {
+    "REC": "       01 :P:-REC.\n          05 :P:-AMT PIC 9(5).\n",
+    "ITEM": "       05 ITEM-CODE PIC X.\n       05 CODE PIC 9.\n",
+}
+
+
+def resolve(source):
+    return CopybookResolver(COPYBOOKS).resolve_program("PAYROLL", source)
+
+
+def test_copy_replacing_pseudo_text():
+    expanded, used, missing, unsupported = resolve("           COPY REC REPLACING ==:P:== BY ==WS==.\n")
+    assert "01 WS-REC." in expanded and "05 WS-AMT PIC 9(5)." in expanded
+    assert ":P:" not in expanded and "REPLACING" not in expanded
+    assert (used, missing, unsupported) == (["REC"], [], [])
+
+
+def test_copy_replacing_words_only_matches_whole_words():
+    expanded, _, _, _ = resolve("           COPY ITEM REPLACING CODE BY KIND.\n")
+    assert "05 ITEM-CODE PIC X." in expanded
+    assert "05 KIND PIC 9." in expanded
+
+
+def test_copy_statement_over_several_lines():
+    expanded, used, _, unsupported = resolve(
+        "000100     COPY ITEM\n"
+        "000200         REPLACING LEADING ==ITEM== BY ==LINE==\n"
+        "000300                   ==CODE== BY ==KIND==.\n"
+        "000400     PROCEDURE DIVISION.\n"
+    )
+    assert "05 LINE-CODE PIC X." in expanded and "05 KIND PIC 9." in expanded
+    assert "REPLACING" not in expanded
+    assert expanded.endswith("000400     PROCEDURE DIVISION.\n")
+    assert (used, unsupported) == (["ITEM"], [])
+
+
+def test_unsupported_copy_phrase_is_reported_and_left_unexpanded():
+    expanded, used, _, unsupported = resolve("           COPY REC SUPPRESS.\n")
+    assert expanded == "           COPY REC SUPPRESS.\n"
+    assert used == []
+    assert unsupported == ["COPY REC: SUPPRESS phrase"]
+
+
+def test_missing_copybook_and_copy_inside_a_literal():
+    expanded, used, missing, _ = resolve("           COPY NOPE.\n           DISPLAY 'COPY REC.'.\n")
+    assert missing == ["NOPE"]
+    assert used == []
+    assert "DISPLAY 'COPY REC.'." in expanded
+
+
+def write_tar(path, members):
+    with tarfile.open(path, "w") as archive:
+        for name, text in members.items():
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def test_tar_with_two_programs_of_the_same_name_is_rejected(tmp_path):
+    archive_path = tmp_path / "portfolio.tar"
+    write_tar(archive_path, {"billing/PAYROLL.cbl": "A", "hr/PAYROLL.cbl": "B", "copy/REC.cpy": "C"})
+    with pytest.raises(ValueError, match="Duplicate program PAYROLL: billing/PAYROLL.cbl and hr/PAYROLL.cbl"):
+        load_portfolio_from_tar(str(archive_path))
+
+
+def test_manifest_with_two_copybooks_of_the_same_name_is_rejected(tmp_path):
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "REC.cpy").write_text("01 REC.")
+    (tmp_path / "PAYROLL.cbl").write_text("PROCEDURE DIVISION.")
+    with pytest.raises(ValueError, match="Duplicate copybook REC"):
+        load_portfolio_from_manifest({"programs": ["PAYROLL.cbl"], "copybooks": ["a", "b"]}, str(tmp_path))
+
+    programs, copybooks = load_portfolio_from_manifest({"programs": ["PAYROLL.cbl"], "copybooks": ["a"]},
+                                                       str(tmp_path))
+    assert list(programs) == ["PAYROLL"] and list(copybooks) == ["REC"]
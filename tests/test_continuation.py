@@ -0,0 +1,43 @@
+from continuation import complete_reply
+
+
+def sender(replies):
+    requests = []
+
+    def send(messages, is_continuation, on_text):
+        requests.append((messages, is_continuation))
+        content, finish_reason = replies.pop(0)
+        if on_text is not None:
+            for i in range(0, len(content), 3):
+                on_text(content[i:i + 3])
+        return content, finish_reason
+
+    return send, requests
+
+
+def test_reply_cut_off_by_max_tokens_is_continued():
+    send, requests = sender([('{"code": "ab', "length"), ('c"}', "stop")])
+    content, finish_reason, continuations = complete_reply(send, [{"role": "user", "content": "x"}])
+    assert (content, finish_reason, continuations) == ('{"code": "abc"}', "stop", 1)
+    assert [is_continuation for _, is_continuation in requests] == [False, True]
+
+
+def test_invalid_reply_that_stopped_is_not_continued():
+    for finish_reason in ("stop", "content_filter"):
+        send, requests = sender([('{"code": "ab', finish_reason)])
+        assert complete_reply(send, [], max_continuations=3) == ('{"code": "ab', finish_reason, 0)
+        assert len(requests) == 1
+
+
+def test_interrupted_stream_is_continued_and_streamed_through_the_stitcher():
+    streamed = []
+    send, requests = sender([('{"code": "first line\\n', "interrupted"), ('"}', "stop")])
+    content, finish_reason, continuations = complete_reply(send, [], on_text=streamed.append)
+    assert (content, finish_reason, continuations) == ('{"code": "first line\\n"}', "stop", 1)
+    assert "".join(streamed) == content
+
+
+def test_continuations_are_capped():
+    send, requests = sender([("a", "length"), ("b", "length"), ("c", "length")])
+    content, finish_reason, continuations = complete_reply(send, [], max_continuations=2)
+    assert (content, finish_reason, continuations) == ("abc", "length", 2)
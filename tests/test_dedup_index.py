@@ -0,0 +1,62 @@
+from benchmark import generate_program
+from cobol_parser import parse_cobol
+from dedup_index import DedupIndex, canonicalize, fragment_fingerprint
+
+
+def fingerprint(code):
+    return fragment_fingerprint(code, target_language="Java")[0]
+
+
+def test_renamed_fragments_share_a_fingerprint():
+    assert fingerprint("           MOVE WS-AMT TO WS-TOTAL.") == fingerprint("           MOVE OT-PAY TO OT-SUM.")
+
+
+def test_picture_scale_changes_the_fingerprint():
+    assert fingerprint("       05 WS-AMT PIC 9(5)V99.") != fingerprint("       05 WS-AMT PIC 9(5)V9999.")
+    assert fingerprint("       05 WS-AMT PIC S9(5).") != fingerprint("       05 WS-AMT PIC 9(5).")
+    assert fingerprint("       05 WS-CODE PIC X.") != fingerprint("       05 WS-CODE PIC A.")
+
+
+def test_picture_clause_is_kept_verbatim():
+    (canonical,), identifiers = canonicalize("       05 WS-AMT PICTURE IS S9(7)V99 COMP-3.")
+    assert "PICTURE IS S9(7)V99" in canonical
+    assert identifiers == ["WS-AMT"]
+
+
+def test_intrinsic_function_changes_the_fingerprint():
+    assert fingerprint("           MOVE FUNCTION CURRENT-DATE TO WS-DATE.") != \
+        fingerprint("           MOVE FUNCTION UPPER-CASE TO WS-DATE.")
+
+
+def test_function_name_is_not_a_placeholder():
+    (canonical,), identifiers = canonicalize("           MOVE FUNCTION UPPER-CASE(WS-NAME) TO WS-OUT.")
+    assert "FUNCTION UPPER-CASE" in canonical
+    assert identifiers == ["WS-NAME", "WS-OUT"]
+
+
+def test_repeats_within_one_program_are_not_isolated(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"), min_tokens=10)
+    program = parse_cobol(generate_program("FIRST", 6))
+    assert index.isolation_anchors(program, "Java", "first") == set()
+
+
+def test_paragraphs_seen_in_another_program_are_isolated(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"), min_tokens=10)
+    index.isolation_anchors(parse_cobol(generate_program("FIRST", 6)), "Java", "first")
+    assert index.isolation_anchors(parse_cobol(generate_program("SECOND", 6)), "Java", "second")
+
+
+def test_stored_fragment_is_remapped_to_the_new_names(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"))
+    index.store("abc", ["WS-AMT", "WS-TOTAL"], {"convertedCode": "wsTotal = wsTotal.add(wsAmt);"})
+    result = index.lookup("abc", ["OT-PAY", "OT-SUM"])
+    assert result["convertedCode"] == "otSum = otSum.add(otPay);"
+
+
+def test_short_names_are_not_remapped(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"))
+    code = "for (int i = 0; i < x.intValue(); i++) { total = total.add(x); }"
+    index.store("abc", ["X", "TOTAL"], {"convertedCode": code})
+    assert index.lookup("abc", ["I", "TOTAL"]) is None
+    assert index.lookup("abc", ["X", "TOTAL"])["convertedCode"] == code
+    assert index.stats()["misses"] == 1
@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from deployment_pool import Deployment, DeploymentPool  # noqa: E402
+
+
+class FakeClient:
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def create_chat_completion(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"model": kwargs["model"]}
+
+    def stats(self):
+        return {}
+
+
+def test_models_lists_each_model_once():
+    pool = DeploymentPool([
+        Deployment("east", FakeClient(), "gpt-4o"),
+        Deployment("west", FakeClient(), "gpt-4o"),
+        Deployment("north", FakeClient(), "gpt-4o-mini"),
+    ])
+    assert pool.models() == ["gpt-4o", "gpt-4o-mini"]
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+
+def test_single_deployment_keeps_serving_after_failures():
+    client = FakeClient([ServiceUnavailable() for _ in range(5)])
+    pool = DeploymentPool([Deployment("only", client, "gpt-4o", failure_threshold=3, cooldown=30.0)])
+    for _ in range(5):
+        with pytest.raises(ServiceUnavailable):
+            pool.create_chat_completion(messages=[])
+    assert pool.create_chat_completion(messages=[]) == {"model": "gpt-4o"}
+    assert pool.stats()["deployments"]["only"]["circuit"] == "closed"
+
+
+def test_failing_deployment_opens_while_another_is_healthy():
+    failing = FakeClient([ServiceUnavailable() for _ in range(3)])
+    healthy = FakeClient()
+    east = Deployment("east", failing, "gpt-4o", failure_threshold=3, cooldown=30.0)
+    west = Deployment("west", healthy, "gpt-4o", weight=0.01, failure_threshold=3, cooldown=30.0)
+    pool = DeploymentPool([east, west])
+    for _ in range(3):
+        assert pool.create_chat_completion(messages=[]) == {"model": "gpt-4o"}
+    assert failing.calls == 3
+    assert pool.stats()["deployments"]["east"]["circuit"] == "open"
+
+    west.client = FakeClient([ServiceUnavailable() for _ in range(4)])
+    for _ in range(4):
+        with pytest.raises(ServiceUnavailable):
+            pool.create_chat_completion(messages=[])
+    assert pool.stats()["deployments"]["west"]["circuit"] == "closed"
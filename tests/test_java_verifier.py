@@ -0,0 +1,77 @@
+from java_verifier import verify_and_repair
+
+TESTS_PASSED = {"run": 1, "passed": 1, "failed": 0, "skipped": 0, "failures": []}
+NO_TESTS = {"run": 0, "passed": 0, "failed": 0, "skipped": 0, "failures": []}
+
+
+class FakeVerifier:
+    def __init__(self, reports):
+        self.reports = list(reports)
+        self.calls = []
+
+    def verify(self, code, unit_test_code=""):
+        self.calls.append((code, unit_test_code))
+        return self.reports.pop(0)
+
+
+def report(status, diagnostics=(), tests=NO_TESTS):
+    return {"status": status, "diagnostics": list(diagnostics), "tests": tests}
+
+
+def test_unit_tests_are_repaired_in_one_round():
+    verifier = FakeVerifier([
+        report("compile_error", [{"test": True, "line": 2, "message": "cannot find symbol"}]),
+        report("passed", tests=TESTS_PASSED)
+    ])
+    repairs = []
+
+    def repair(target, code, errors, program):
+        repairs.append((target, errors, program))
+        return "class PayrollTest { @Test void pays() {} }"
+
+    result = verify_and_repair(verifier, "class Payroll {}", "class PayrollTest {\n  broken\n}", repair)
+
+    assert [target for target, _, _ in repairs] == ["unitTests"]
+    assert repairs[0][1] == "line 2: cannot find symbol\n    broken"
+    assert repairs[0][2] == "class Payroll {}"
+    assert verifier.calls[1] == ("class Payroll {}", "class PayrollTest { @Test void pays() {} }")
+    assert result["unitTestCode"] == "class PayrollTest { @Test void pays() {} }"
+    assert result["code"] == "class Payroll {}"
+    assert result["report"]["status"] == "passed"
+    assert len(result["report"]["rounds"]) == 2
+    assert result["report"]["repairedUnitTests"] is True
+    assert result["report"]["repairedProgram"] is False
+    assert result["report"]["repairedChunks"] == []
+
+
+def test_compiler_errors_are_repaired_in_the_failing_chunk():
+    chunk_codes = ["int total;", "total = amount;"]
+    verifier = FakeVerifier([
+        report("compile_error", [{"line": 2, "message": "cannot find symbol: amount"}]),
+        report("passed")
+    ])
+    repairs = []
+
+    def repair(target, code, errors, program):
+        repairs.append((target, code, errors))
+        return "total = 0;"
+
+    result = verify_and_repair(
+        verifier, "\n".join(chunk_codes), "", repair, chunk_codes=chunk_codes, merge="\n".join
+    )
+
+    assert repairs == [(1, "total = amount;", "line 1: cannot find symbol: amount\n    total = amount;")]
+    assert result["chunkCodes"] == ["int total;", "total = 0;"]
+    assert result["code"] == "int total;\ntotal = 0;"
+    assert result["report"]["repairedChunks"] == [1]
+    assert result["report"]["repairedUnitTests"] is False
+
+
+def test_repair_stops_when_nothing_was_repaired():
+    verifier = FakeVerifier([report("compile_error", [{"line": 1, "message": "';' expected"}])])
+
+    result = verify_and_repair(verifier, "class Payroll {", "", lambda *args: None)
+
+    assert len(verifier.calls) == 1
+    assert result["report"]["status"] == "compile_error"
+    assert result["report"]["repairedProgram"] is False
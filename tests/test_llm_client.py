@@ -0,0 +1,54 @@
+import gc
+import types
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from llm_client import RateLimitedClient  # noqa: E402
+
+
+def chunk(text=None, total_tokens=None):
+    return types.SimpleNamespace(
+        choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=text))] if text else [],
+        usage=types.SimpleNamespace(total_tokens=total_tokens) if total_tokens else None
+    )
+
+
+class FakeOpenAI:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        return iter(self.chunks)
+
+
+def stream(client):
+    return client.create_chat_completion(messages=[{"role": "user", "content": "hi"}], max_tokens=100, stream=True)
+
+
+def test_stream_read_to_the_end_releases_its_slot_once():
+    client = RateLimitedClient(FakeOpenAI([chunk("a"), chunk("b"), chunk(total_tokens=12)]), tokens_per_minute=1000)
+    assert [c.choices[0].delta.content for c in stream(client) if c.choices] == ["a", "b"]
+    assert client.limiter.in_flight == 0
+    assert client.token_bucket.available == pytest.approx(1000 - 12, abs=1)
+
+
+def test_stream_that_is_never_read_releases_its_slot():
+    client = RateLimitedClient(FakeOpenAI([chunk("a")]))
+    held = stream(client)
+    assert client.limiter.in_flight == 1
+    del held
+    gc.collect()
+    assert client.limiter.in_flight == 0
+
+
+def test_closed_stream_releases_its_slot_and_ends():
+    client = RateLimitedClient(FakeOpenAI([chunk("a"), chunk("b")]))
+    held = stream(client)
+    next(held)
+    held.close()
+    held.close()
+    assert client.limiter.in_flight == 0
+    assert list(held) == []
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from llm_executor import run_chunk_schedule
+
+CHUNKS = [
+    {"type": "declarations", "content": "01 WS-TOTAL PIC 9(5)."},
+    {"type": "procedures", "content": "MAIN-PARA. ADD 1 TO WS-TOTAL."},
+    {"type": "declarations", "content": "01 WS-RATE PIC 9V99."},
+    {"type": "procedures", "content": "CALC-PARA. MULTIPLY WS-RATE BY WS-TOTAL."},
+]
+
+
+def test_procedure_chunks_wait_for_the_converted_declarations():
+    lock = threading.Lock()
+    order = []
+    calls = {}
+
+    def process_chunk(code, is_chunk=False, chunk_index=0, total_chunks=1, declarations=None):
+        with lock:
+            order.append(chunk_index)
+            calls[chunk_index] = declarations
+        return {"convertedCode": f"// chunk {chunk_index}"}
+
+    results = run_chunk_schedule(CHUNKS, process_chunk, max_workers=4)
+
+    assert sorted(order[:2]) == [0, 2] and sorted(order[2:]) == [1, 3]
+    assert calls[0] is None and calls[2] is None
+    assert calls[1] == calls[3] == "// chunk 0\n\n// chunk 2"
+    assert [result["convertedCode"] for result in results] == [f"// chunk {i}" for i in range(4)]
+
+
+def test_completed_declarations_are_passed_without_converting_them_again():
+    calls = {}
+
+    def process_chunk(code, is_chunk=False, chunk_index=0, total_chunks=1, declarations=None):
+        calls[chunk_index] = declarations
+        return {"convertedCode": f"// chunk {chunk_index}"}
+
+    seen = []
+    results = run_chunk_schedule(
+        CHUNKS, process_chunk,
+        on_result=lambda i, result: seen.append(i),
+        completed={0: {"convertedCode": "// reused 0"}}
+    )
+
+    assert 0 not in calls
+    assert calls[1] == "// reused 0\n\n// chunk 2"
+    assert results[0]["convertedCode"] == "// reused 0"
+    assert sorted(seen) == [0, 1, 2, 3]
+
+
+def test_a_failing_declaration_chunk_stops_the_procedure_chunks():
+    calls = []
+
+    def process_chunk(code, is_chunk=False, chunk_index=0, total_chunks=1, declarations=None):
+        calls.append(chunk_index)
+        if chunk_index == 2:
+            raise ValueError("bad declarations")
+        return {"convertedCode": ""}
+
+    with pytest.raises(ValueError, match="bad declarations"):
+        run_chunk_schedule(CHUNKS, process_chunk)
+    assert sorted(calls) == [0, 2]
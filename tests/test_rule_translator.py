@@ -0,0 +1,147 @@
+import shutil
+import subprocess
+
+import pytest
+
+from cobol_parser import parse_cobol
+from rule_translator import translate_program
+
+
+def cobol(data, procedure):
+    lines = ["IDENTIFICATION DIVISION.", "PROGRAM-ID. RULES-TEST.", "DATA DIVISION.", "WORKING-STORAGE SECTION."]
+    lines += data + ["PROCEDURE DIVISION."] + procedure
+    return "".join(f"       {line}\n" for line in lines)
+
+
+PROGRAM = cobol(
+    [
+        "01 WS-AMOUNT PIC 9(3)V99 VALUE 0.",
+        "01 WS-UNSIGNED PIC 9(3) VALUE 0.",
+        "01 WS-QUOTIENT PIC 9V99 VALUE 0.",
+        "01 WS-TRUNCATED PIC 9V99 VALUE 0.",
+        "01 WS-COUNT PIC 9(2) VALUE 0.",
+        "01 WS-SUM PIC 9(3) VALUE 0.",
+        "01 I1 PIC 9(3) VALUE 0.",
+        "01 TIMES2 PIC 9(3) VALUE 0.",
+        "01 WS-STATUS PIC X VALUE 'N'.",
+        "   88 WS-DONE VALUE 'Y'.",
+        "01 WS-NAME PIC X(5) VALUE SPACES.",
+    ],
+    [
+        "MAIN-PARA.",
+        "    MOVE 12345.678 TO WS-AMOUNT",
+        "    MOVE -5 TO WS-UNSIGNED",
+        "    DIVIDE 8 INTO 5 GIVING WS-QUOTIENT ROUNDED",
+        "    DIVIDE 8 INTO 5 GIVING WS-TRUNCATED",
+        "    PERFORM VARYING WS-COUNT FROM 1 BY 1 UNTIL WS-COUNT > 5",
+        "        ADD WS-COUNT TO WS-SUM",
+        "    END-PERFORM",
+        "    PERFORM 3 TIMES",
+        "        PERFORM 2 TIMES",
+        "            ADD 1 TO I1",
+        "            ADD 1 TO TIMES2",
+        "        END-PERFORM",
+        "    END-PERFORM",
+        "    MOVE 'ABCDEFG' TO WS-NAME",
+        "    SET WS-DONE TO TRUE",
+        "    PERFORM SHOW-PARA",
+        "    STOP RUN.",
+        "SHOW-PARA.",
+        "    DISPLAY WS-AMOUNT",
+        "    DISPLAY WS-UNSIGNED",
+        "    DISPLAY WS-QUOTIENT",
+        "    DISPLAY WS-TRUNCATED",
+        "    DISPLAY WS-SUM",
+        "    DISPLAY I1",
+        "    DISPLAY TIMES2",
+        "    DISPLAY WS-NAME",
+        "    IF WS-DONE",
+        "        DISPLAY 'DONE'",
+        "    END-IF.",
+    ]
+)
+EXPECTED_OUTPUT = ["34567", "005", "063", "062", "015", "006", "006", "ABCDE", "DONE"]
+
+
+def translate(source, target_language="Java"):
+    return translate_program(parse_cobol(source), target_language)
+
+
+def test_program_inside_the_subset_is_translated_completely():
+    for target_language in ("Java", "C#"):
+        coverage = translate(PROGRAM, target_language).coverage()
+        assert coverage["mode"] == "rules"
+        assert coverage["coverage"] == 1.0
+        assert coverage["unsupported"] == {}
+
+
+def test_java_stores_apply_the_picture():
+    code = translate(PROGRAM).program_code()
+    assert "wsAmount = store(new BigDecimal(\"12345.678\"), 3, 2, false, false);" in code
+    assert "wsQuotient = store(new BigDecimal(\"5\").divide(new BigDecimal(\"8\"), 18, RoundingMode.HALF_UP), " \
+           "1, 2, false, true);" in code
+    assert "wsTruncated = store(new BigDecimal(\"5\").divide(new BigDecimal(\"8\"), 18, RoundingMode.HALF_UP), " \
+           "1, 2, false, false);" in code
+    assert "wsName = fit(\"ABCDEFG\", 5);" in code
+
+
+def test_java_perform_varying_and_88_level():
+    code = translate(PROGRAM).program_code()
+    assert "wsCount = store(new BigDecimal(\"1\"), 2, 0, false, false);" in code
+    assert "while (!(wsCount.compareTo(new BigDecimal(\"5\")) > 0)) {" in code
+    assert "wsStatus = fit(\"Y\", 1);" in code
+    assert "if (compareText(wsStatus, \"Y\") == 0) {" in code
+
+
+def test_perform_times_locals_do_not_shadow_fields():
+    code = translate(PROGRAM).program_code()
+    assert "private BigDecimal i1 = new BigDecimal(\"0\");" in code
+    assert "private BigDecimal times2 = new BigDecimal(\"0\");" in code
+    assert "for (int i2 = 0; i2 < times3; i2++) {" in code
+    assert "for (int i = 0; i < times; i++) {" in code
+    assert "i1 = store(i1.add(new BigDecimal(\"1\")), 3, 0, false, false);" in code
+    assert "int i1 " not in code and "int times2 " not in code
+
+
+def test_locals_skip_names_taken_by_fields():
+    code = translate(cobol(
+        ["01 I PIC 9(3) VALUE 0.", "01 TIMES PIC 9(3) VALUE 0."],
+        ["MAIN-PARA.", "    PERFORM 3 TIMES", "        ADD 1 TO I", "    END-PERFORM."]
+    )).program_code()
+    assert "private BigDecimal i = " in code
+    assert "int times2 = new BigDecimal(\"3\").intValue();" in code
+    assert "for (int i2 = 0; i2 < times2; i2++) {" in code
+
+
+def test_csharp_emitter():
+    code = translate(PROGRAM, "C#").program_code()
+    assert "private decimal wsAmount = 0.00m;" in code
+    assert "wsQuotient = Store((5m / 8m), 1, 2, false, true);" in code
+    assert "private void MainPara()\n    {" in code
+    assert "for (int i = 0; i < times; i++)" in code
+    assert "Console.WriteLine(ToDisplay(wsAmount, 3, 2, false));" in code
+
+
+def test_unsupported_paragraph_is_left_to_the_llm():
+    translation = translate(cobol(
+        ["01 WS-CODE PIC 9 VALUE 1."],
+        ["MAIN-PARA.", "    PERFORM CHECK-PARA.", "CHECK-PARA.", "    EVALUATE WS-CODE", "        WHEN 1 CONTINUE",
+         "    END-EVALUATE."]
+    ))
+    coverage = translation.coverage()
+    assert coverage["mode"] == "hybrid"
+    assert coverage["llmParagraphs"] == ["CHECK-PARA"]
+    assert coverage["unsupported"] == {"EVALUATE": 1}
+
+
+@pytest.mark.skipif(shutil.which("dotnet") is None, reason="needs the .NET SDK")
+def test_csharp_translation_runs_like_the_cobol_program(tmp_path):
+    (tmp_path / "RulesTest.csproj").write_text(
+        "<Project Sdk=\"Microsoft.NET.Sdk\"><PropertyGroup><OutputType>Exe</OutputType>"
+        "<TargetFramework>net8.0</TargetFramework><ImplicitUsings>disable</ImplicitUsings>"
+        "</PropertyGroup></Project>"
+    )
+    (tmp_path / "Program.cs").write_text(translate(PROGRAM, "C#").program_code())
+    run = subprocess.run(["dotnet", "run"], cwd=tmp_path, capture_output=True, text=True, timeout=300)
+    assert run.returncode == 0, run.stdout + run.stderr
+    assert run.stdout.split() == EXPECTED_OUTPUT
@@ -0,0 +1,16 @@
+import sys
+import types
+
+import token_chunker
+
+
+def test_count_tokens_estimates_when_the_encoding_cannot_be_loaded(monkeypatch):
+    def get_encoding(name):
+        raise ConnectionError(f"cannot download {name}")
+
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=get_encoding))
+    monkeypatch.setattr(token_chunker, "_encoding", None)
+    monkeypatch.setattr(token_chunker, "_encoding_loaded", False)
+
+    assert token_chunker.get_encoding() is None
+    assert token_chunker.count_tokens("MOVE WS-AMT TO WS-TOTAL.") == int(24 / token_chunker.CHARS_PER_TOKEN) + 1
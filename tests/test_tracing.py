@@ -0,0 +1,14 @@
+from tracing import metric_label
+
+
+def test_metric_label_strips_trailing_chunk_number():
+    assert metric_label("code conversion chunk 12") == "code conversion chunk"
+
+
+def test_metric_label_strips_chunk_number_of_continuation():
+    assert metric_label("code conversion chunk 12 continuation") == "code conversion chunk continuation"
+    assert metric_label("code conversion chunk 3 continuation") == metric_label("code conversion chunk 40 continuation")
+
+
+def test_metric_label_keeps_labels_without_numbers():
+    assert metric_label("business requirements") == "business requirements"
@@ -0,0 +1,39 @@
+from warmup import Warmup
+
+
+def fail():
+    raise RuntimeError("no JDK")
+
+
+def test_failed_optional_step_does_not_block_readiness():
+    warmup = Warmup()
+    warmup.add("tokenizer", lambda: None)
+    warmup.add("javaVerifier", fail, required=False)
+    warmup.run()
+    assert warmup.ready
+    steps = warmup.stats()["steps"]
+    assert steps["javaVerifier"] == {"status": "failed", "error": "no JDK", "attempts": 1, "required": False}
+    assert steps["tokenizer"]["status"] == "done" and steps["tokenizer"]["required"] is True
+
+
+def test_failed_required_step_blocks_readiness():
+    warmup = Warmup()
+    warmup.add("stores", fail)
+    assert not warmup.ready
+    warmup.run()
+    assert not warmup.ready
+
+
+def test_step_is_retried_until_it_succeeds():
+    calls = []
+
+    def resume():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError("database is locked")
+
+    warmup = Warmup()
+    warmup.add("jobs", resume, required=False, attempts=3, retry_delay=0)
+    warmup.run()
+    assert warmup.results["jobs"]["status"] == "done" and warmup.results["jobs"]["attempts"] == 3
+    assert len(calls) == 3
@@ -0,0 +1,211 @@
+"""
+Module for splitting COBOL programs into chunks that fit a token budget.
+"""
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_ENCODING = os.environ.get("TOKENIZER_ENCODING", "cl100k_base")
+
+# Rough characters-per-token ratio used when no tokenizer is installed
+CHARS_PER_TOKEN = 3.5
+
+# Statements that can appear alone on a line but never start a paragraph
+NON_PARAGRAPH_WORDS = {
+    "EXIT", "GOBACK", "CONTINUE", "END-IF", "END-PERFORM", "END-EVALUATE", "END-READ",
+    "END-WRITE", "END-COMPUTE", "END-SEARCH", "END-CALL", "END-EXEC", "ELSE", "STOP", "RUN",
+}
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """
+    Return the tiktoken encoding, or None when tiktoken is not installed or its encoding cannot be loaded.
+
+    tiktoken is imported on first use rather than at import, since loading it
+    and its encoding is the slowest part of starting the app. The encoding is
+    downloaded on first use, which fails on offline hosts; token counts are
+    then estimated rather than failing every conversion.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+                except ImportError:
+                    logger.info("tiktoken is not installed, estimating token counts")
+                except Exception as e:
+                    logger.warning(f"Could not load the {TOKENIZER_ENCODING} encoding, estimating token counts: {str(e)}")
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    """
+    Counts the tokens in a piece of text.
+
+    Uses the local tiktoken tokenizer when it is installed and falls back to a
+    character-based estimate otherwise.
+
+    Args:
+        text (str): The text to measure
+
+    Returns:
+        int: The number of tokens
+    """
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def conversion_token_budget(context_window, max_output_tokens, prompt_overhead_tokens, output_expansion=2.0):
+    """
+    Computes how many source tokens a single conversion chunk may contain.
+
+    The chunk must fit in the context window next to the prompt template and
+    the reserved completion tokens. Its converted output, which is usually
+    larger than the COBOL it came from, must also fit in max_output_tokens.
+
+    Args:
+        context_window (int): The model's context window in tokens
+        max_output_tokens (int): The max_tokens value sent with the request
+        prompt_overhead_tokens (int): Tokens used by everything in the prompt except the source code
+        output_expansion (float): Expected ratio of converted-code tokens to source tokens
+
+    Returns:
+        int: The source-token budget per chunk
+    """
+    input_budget = context_window - max_output_tokens - prompt_overhead_tokens
+    output_budget = int(max_output_tokens / output_expansion)
+    return max(200, min(input_budget, output_budget))
+
+
+def output_token_budget(source_tokens, output_expansion=2.0, minimum=1000, maximum=16384, margin=1.25, overhead=300):
+    """
+    Picks the max_tokens value for converting a piece of source code.
+
+    The expected size of the converted code follows the size of the source, so
+    small chunks do not reserve (and get admission-controlled against) the
+    same completion budget as large ones. The margin and the fixed overhead
+    for notes and JSON framing leave room before a continuation is needed.
+
+    Args:
+        source_tokens (int): Tokens of the source code being converted
+        output_expansion (float): Expected ratio of converted-code tokens to source tokens
+        minimum (int): Lower bound on the budget
+        maximum (int): Upper bound on the budget, usually the model's completion limit
+        margin (float): Safety factor on the expected output size
+        overhead (int): Tokens reserved for the other fields of the reply
+
+    Returns:
+        int: The max_tokens value for the request
+    """
+    expected = int(source_tokens * output_expansion * margin) + overhead
+    return max(minimum, min(maximum, expected))
+
+
+def _code_area(line):
+    """Return a line without its fixed-format sequence area, if it has one"""
+    if len(line) > 7 and (line[:6].isdigit() or line[:6].strip() == "") and line[6] in " -*/D":
+        return line[7:72]
+    return line
+
+
+def _is_comment(line):
+    return (len(line) > 6 and line[6] in "*/") or line.lstrip().startswith("*>")
+
+
+def _starts_unit(line, in_procedures):
+    """Whether a line begins a new section, paragraph or top-level data item"""
+    if _is_comment(line):
+        return False
+    text = _code_area(line)
+    stripped = text.strip()
+    if not stripped:
+        return False
+    if re.match(r"^[A-Z0-9-]+\s+(DIVISION|SECTION)\b", stripped, re.IGNORECASE):
+        return True
+    if in_procedures:
+        match = re.match(r"^([A-Z0-9][A-Z0-9-]*)\s*\.\s*$", stripped, re.IGNORECASE)
+        return bool(match) and match.group(1).upper() not in NON_PARAGRAPH_WORDS
+    return bool(re.match(r"^(01|77|FD|SD)\s", stripped, re.IGNORECASE))
+
+
+def split_units(source_code, in_procedures):
+    """Split COBOL source into sections, paragraphs or top-level data items"""
+    units = []
+    current = []
+    for line in source_code.splitlines(keepends=True):
+        if current and _starts_unit(line, in_procedures):
+            units.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        units.append("".join(current))
+    return units
+
+
+def split_oversized_unit(unit, token_budget):
+    """Split a single unit that exceeds the budget at line boundaries"""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for line in unit.splitlines(keepends=True):
+        line_tokens = count_tokens(line)
+        if current and current_tokens + line_tokens > token_budget:
+            pieces.append("".join(current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def pack_units(units, token_budget, chunk_type):
+    """
+    Packs consecutive units into as few chunks as possible without exceeding the budget.
+
+    Args:
+        units (list): Source fragments in program order
+        token_budget (int): Maximum source tokens per chunk
+        chunk_type (str): 'declarations' or 'procedures'
+
+    Returns:
+        list: Chunk dicts with 'type', 'content' and 'tokens' keys
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    def flush():
+        if current:
+            chunks.append({"type": chunk_type, "content": "".join(current), "tokens": current_tokens})
+
+    for unit in units:
+        unit_tokens = count_tokens(unit)
+        if unit_tokens > token_budget:
+            flush()
+            current, current_tokens = [], 0
+            for piece in split_oversized_unit(unit, token_budget):
+                chunks.append({"type": chunk_type, "content": piece, "tokens": count_tokens(piece)})
+            continue
+        if current and current_tokens + unit_tokens > token_budget:
+            flush()
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    flush()
+    return chunks
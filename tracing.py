@@ -0,0 +1,306 @@
+"""
+Module for per-request tracing of pipeline stages and Prometheus-style metrics.
+
+Spans time a pipeline stage (prompt build, LLM call, JSON parse, chunk merge,
+test generation) and carry attributes such as token counts, retries and
+cache hits. Every span feeds the in-process metrics registry rendered on
+/metrics. When the OpenTelemetry API is installed and OTEL_TRACING_ENABLED is
+set, spans are also reported as OpenTelemetry spans.
+"""
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+OTEL_TRACING_ENABLED = os.environ.get("OTEL_TRACING_ENABLED", "").lower() in ("1", "true", "yes")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+_tracer = None
+
+
+def _get_tracer():
+    global _tracer
+    if _tracer is None and otel_trace is not None and OTEL_TRACING_ENABLED:
+        _tracer = otel_trace.get_tracer("cobol-converter")
+    return _tracer
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Counters and histograms rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(DURATION_BUCKETS, value)
+            if index < len(DURATION_BUCKETS):
+                histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def render(self):
+        """Return every metric in the Prometheus text format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, dict(value, buckets=list(value["buckets"]))) for key, value in self._histograms.items()
+            )
+        described = set()
+
+        def header(name):
+            if name in described or name not in self._help:
+                return
+            described.add(name)
+            kind, text = self._help[name]
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), histogram in histograms:
+            header(name)
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("cobol_stage_duration_seconds", "histogram", "Duration of pipeline stages")
+metrics.describe("cobol_llm_tokens_total", "counter", "Prompt and completion tokens reported by the LLM")
+metrics.describe("cobol_llm_retries_total", "counter", "Retried LLM requests")
+metrics.describe("cobol_llm_cache_total", "counter", "LLM response cache lookups by result")
+metrics.describe("cobol_json_fallback_total", "counter", "LLM replies that needed the JSON extraction fallback")
+metrics.describe("cobol_stage_errors_total", "counter", "Pipeline stages that raised an error")
+metrics.describe("cobol_rule_translations_total", "counter", "COBOL programs by rule-based translation mode")
+metrics.describe("cobol_rule_statements_total", "counter", "COBOL statements translated by rules or left to the LLM")
+metrics.describe("cobol_java_verifications_total", "counter", "Compile-and-test runs of converted Java by result")
+metrics.describe("cobol_java_repairs_total", "counter", "Converted Java chunks, programs and unit tests repaired from compiler errors")
+
+
+def metric_label(label):
+    """Strip per-chunk numbers from a call label so metric label values stay bounded"""
+    return re.sub(r"\s*\b\d+\b", "", label)
+
+
+class Trace:
+    """The spans recorded while handling one request."""
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """Return the spans as JSON-serialisable dicts, plus per-stage totals"""
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        for span in spans:
+            stage = stages.setdefault(span.name, {"count": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] = round(stage["seconds"] + span.duration, 4)
+        return {
+            "traceId": self.trace_id,
+            "name": self.name,
+            "seconds": round(time.perf_counter() - self.started, 4),
+            "stages": stages,
+            "spans": [span.as_dict(self.started) for span in spans]
+        }
+
+
+class Span:
+    """A timed pipeline stage with attributes."""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self._otel_span = None
+
+    def set(self, name, value):
+        self.attributes[name] = value
+        if self._otel_span is not None:
+            self._otel_span.set_attribute(name, value)
+
+    def increment(self, name, amount=1):
+        self.set(name, self.attributes.get(name, 0) + amount)
+
+    def as_dict(self, trace_started):
+        return {
+            "name": self.name,
+            "start": round(self.started - trace_started, 4),
+            "seconds": round(self.duration, 4),
+            **self.attributes
+        }
+
+
+@contextmanager
+def trace(name):
+    """
+    Starts a trace for one request; spans opened inside it, also on worker
+    threads started through run_concurrently, are recorded on it.
+
+    Yields:
+        Trace: The trace, whose summary() can be logged or returned
+    """
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        with span(name):
+            yield current
+    finally:
+        _current_trace.reset(token)
+        summary = current.summary()
+        logger.info(f"Trace {name} {current.trace_id}: {json.dumps(summary['stages'])}")
+        logger.debug(f"Trace {name} {current.trace_id} spans: {json.dumps(summary['spans'])}")
+
+
+def traced(name):
+    """Decorator that runs a function inside its own trace"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times a pipeline stage.
+
+    Args:
+        name (str): Stage name, used as the 'stage' metric label
+        **attributes: Initial span attributes
+
+    Yields:
+        Span: The span, whose attributes can be set while the stage runs
+    """
+    current = Span(name, attributes)
+    token = _current_span.set(current)
+    tracer = _get_tracer()
+    otel_context = tracer.start_as_current_span(name, attributes=attributes) if tracer is not None else None
+    if otel_context is not None:
+        current._otel_span = otel_context.__enter__()
+    error = None
+    try:
+        yield current
+    except Exception as e:
+        error = e
+        current.set("error", str(e))
+        metrics.inc("cobol_stage_errors_total", stage=name)
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.started
+        _current_span.reset(token)
+        metrics.observe("cobol_stage_duration_seconds", current.duration, stage=name)
+        active_trace = _current_trace.get()
+        if active_trace is not None:
+            active_trace.add(current)
+        if otel_context is not None:
+            if error is not None:
+                otel_context.__exit__(type(error), error, error.__traceback__)
+            else:
+                otel_context.__exit__(None, None, None)
+
+
+def current_span():
+    """Return the innermost open span of this context, or None"""
+    return _current_span.get()
+
+
+def record_llm_usage(label, usage):
+    """Record the token usage of a chat completion on the current span and the metrics"""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    active_span = current_span()
+    if active_span is not None:
+        active_span.set("promptTokens", prompt_tokens)
+        active_span.set("completionTokens", completion_tokens)
+    call = metric_label(label)
+    metrics.inc("cobol_llm_tokens_total", prompt_tokens, kind="prompt", call=call)
+    metrics.inc("cobol_llm_tokens_total", completion_tokens, kind="completion", call=call)
+
+
+def record_retry():
+    """Count a retried LLM request on the current span and the metrics"""
+    active_span = current_span()
+    if active_span is not None:
+        active_span.increment("retries")
+    metrics.inc("cobol_llm_retries_total")
+
+
+def record_cache_lookup(hit):
+    """Count an LLM response cache lookup on the current span and the metrics"""
+    active_span = current_span()
+    if active_span is not None:
+        active_span.set("cacheHit", hit)
+    metrics.inc("cobol_llm_cache_total", result="hit" if hit else "miss")
+
+
+def run_in_context(fn):
+    """Wrap a callable so it runs in a copy of the caller's tracing context on another thread"""
+    context = contextvars.copy_context()
+    return lambda: context.run(fn)
@@ -0,0 +1,229 @@
+"""
+Module for lazy loading and background warm-up of what the app needs on its first requests.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TARGET_LANGUAGES = ["Java", "C#"]
+
+ARTIFACT_FILE = "warmup.json"
+TOKENIZER_CACHE = "tiktoken"
+
+
+class LazyModule:
+    """
+    Stands in for a module that is imported on first attribute access.
+
+    Keeps slow imports (chunker, tokenizer, templates) off the startup path;
+    they are loaded by the warm-up thread or by the first request that needs them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.monotonic()
+                    self._module = importlib.import_module(self._name)
+                    logger.info(f"Loaded {self._name} in {time.monotonic() - started:.2f}s")
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+
+_UNSET = object()
+
+
+class LazyObject:
+    """
+    Stands in for an object that is built by factory() on first attribute access.
+
+    A factory may return None for a disabled component; callers then read the
+    value with load() instead of relying on attribute access.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = _UNSET
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._value is not _UNSET
+
+    def load(self):
+        if self._value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    self._value = self._factory()
+        return self._value
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+
+class Warmup:
+    """
+    Runs warm-up steps on a background thread and reports when they are done.
+
+    The app starts serving straight away; readiness is reported separately so a
+    load balancer only routes traffic to the replica once the steps have run.
+    Only required steps gate readiness: an optional step that fails (no JDK for
+    the verifier, a transient store error) is retried up to its attempts and
+    then reported as failed without keeping the replica out of rotation.
+    """
+
+    def __init__(self):
+        self.steps = []
+        self.results = {}
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    def add(self, name, fn, required=True, attempts=1, retry_delay=5.0):
+        """
+        Adds a warm-up step.
+
+        Args:
+            name (str): Step name reported by stats()
+            fn (callable): Runs the step; raising marks the attempt as failed
+            required (bool): Whether the replica is only ready once this step has succeeded
+            attempts (int): How many times to run the step before reporting it as failed
+            retry_delay (float): Seconds to wait between attempts
+        """
+        self.steps.append((name, fn, required, attempts, retry_delay))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def run(self):
+        for name, fn, required, attempts, retry_delay in self.steps:
+            started = time.monotonic()
+            for attempt in range(1, attempts + 1):
+                try:
+                    fn()
+                    self.results[name] = {"status": "done", "seconds": round(time.monotonic() - started, 3),
+                                          "attempts": attempt}
+                    break
+                except Exception as e:
+                    self.results[name] = {"status": "failed", "error": str(e), "attempts": attempt}
+                    if attempt < attempts:
+                        logger.warning(f"Warm-up step {name} failed (attempt {attempt}/{attempts}), "
+                                       f"retrying in {retry_delay}s: {str(e)}")
+                        time.sleep(retry_delay)
+                    elif required:
+                        logger.error(f"Warm-up step {name} failed: {str(e)}")
+                    else:
+                        logger.warning(f"Optional warm-up step {name} failed, serving without it: {str(e)}")
+        self.finished_at = time.time()
+        logger.info(f"Warm-up finished in {self.finished_at - self.started_at:.2f}s" if self.started_at
+                    else "Warm-up finished")
+
+    @property
+    def ready(self):
+        return self.finished_at is not None and all(
+            self.results.get(name, {}).get("status") == "done"
+            for name, _, required, _, _ in self.steps if required
+        )
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "finished": self.finished_at is not None,
+            "seconds": round(self.finished_at - self.started_at, 3)
+            if self.finished_at is not None and self.started_at is not None else None,
+            "steps": {
+                name: dict(self.results.get(name, {"status": "pending"}), required=required)
+                for name, _, required, _, _ in self.steps
+            }
+        }
+
+
+def use_warmup_artifact(directory):
+    """
+    Points the tokenizer at a pre-built warm-up artifact and returns its contents.
+
+    Must run before the tokenizer is first loaded, so tiktoken reads its
+    encoding from the artifact instead of downloading it.
+
+    Args:
+        directory (str): Directory written by build_warmup_artifact
+
+    Returns:
+        dict: The artifact contents, or an empty dict when there is no artifact
+    """
+    path = os.path.join(directory, ARTIFACT_FILE)
+    if not os.path.exists(path):
+        logger.info(f"No warm-up artifact in {directory}, warming up from source")
+        return {}
+    tokenizer_cache = os.path.join(directory, TOKENIZER_CACHE)
+    if os.path.isdir(tokenizer_cache):
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", tokenizer_cache)
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def build_warmup_artifact(directory):
+    """
+    Builds the warm-up artifact at image build time.
+
+    Downloads the tokenizer encoding into the artifact and renders the
+    database setup templates of every target language, so a starting replica
+    needs no network access and no template rendering.
+
+    Args:
+        directory (str): Directory to write the artifact to
+
+    Returns:
+        dict: The artifact contents
+    """
+    os.makedirs(directory, exist_ok=True)
+    os.environ["TIKTOKEN_CACHE_DIR"] = os.path.join(directory, TOKENIZER_CACHE)
+    os.makedirs(os.environ["TIKTOKEN_CACHE_DIR"], exist_ok=True)
+
+    from token_chunker import TOKENIZER_ENCODING, get_encoding
+    from db_templates import get_db_template
+
+    encoding = get_encoding()
+    artifact = {
+        "builtAt": time.time(),
+        "tokenizer": TOKENIZER_ENCODING if encoding is not None else None,
+        "dbTemplates": {language: get_db_template(language) for language in TARGET_LANGUAGES}
+    }
+    with open(os.path.join(directory, ARTIFACT_FILE), "w", encoding="utf-8") as handle:
+        json.dump(artifact, handle)
+    logger.info(f"Wrote warm-up artifact to {directory}")
+    return artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the warm-up artifact loaded by the app at startup")
+    parser.add_argument("directory", nargs="?", default=os.environ.get("WARMUP_ARTIFACT_DIR", os.path.join("data", "warmup")))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    build_warmup_artifact(args.directory)
+
+
+if __name__ == "__main__":
+    main()